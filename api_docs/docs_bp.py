@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, make_response
 from flask_restx import Api, Resource, fields
-from services.auth_service import login_user, register_user
+from services.auth_service import login_user, register_user, token_claims, refresh_claims
 from flask_jwt_extended import (
     set_access_cookies,
     set_refresh_cookies,
@@ -100,6 +100,25 @@ record_uuid_response = api.model(
     },
 )
 
+record_batch_item_result = api.model(
+    "RecordBatchItemResult",
+    {
+        "index": fields.Integer(description="Posición del record en la lista enviada", example=0),
+        "status": fields.Integer(description="Código HTTP del elemento", example=201),
+        "error": fields.String(description="Motivo si el elemento no se guardó"),
+    },
+)
+
+record_batch_response = api.model(
+    "RecordBatchResponse",
+    {
+        "message": fields.String(description="Mensaje de confirmación", example="Records processed"),
+        "saved": fields.Integer(description="Records guardados", example=3),
+        "failed": fields.Integer(description="Records rechazados", example=0),
+        "results": fields.List(fields.Nested(record_batch_item_result), description="Estado por record"),
+    },
+)
+
 ranking_player = api.model(
     "RankingPlayer", 
     {
@@ -163,8 +182,9 @@ class Register(Resource):
             data = request.get_json()
             new_user = register_user(data)
 
-            access_token = create_access_token(identity=new_user.uuid)
-            refresh_token = create_refresh_token(identity=new_user.uuid)
+            claims = token_claims(new_user)
+            access_token = create_access_token(identity=new_user.uuid, additional_claims=claims)
+            refresh_token = create_refresh_token(identity=new_user.uuid, additional_claims=claims)
 
             response = make_response(
                 {"msg": "User registered successfully", "user": new_user.to_dict()}
@@ -204,12 +224,15 @@ class Refresh(Resource):
     @api.doc(security="cookieAuth")
     def post(self):
         """Renovar token de acceso"""
-        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 
         try:
             verify_jwt_in_request(refresh=True)
             current_user = get_jwt_identity()
-            new_token = create_access_token(identity=current_user)
+            new_token = create_access_token(
+                identity=current_user,
+                additional_claims=refresh_claims(get_jwt(), current_user)
+            )
 
             response = make_response({"msg": "Token refreshed"})
             set_access_cookies(response, new_token)
@@ -226,16 +249,16 @@ class CurrentUser(Resource):
     @api.doc(security="cookieAuth")
     def get(self):
         """Obtener información del usuario actual"""
-        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-        from services.user_service import get_user_by_uuid
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+        from services.user_service import get_user_profile
 
         try:
             verify_jwt_in_request()
             current_user_uuid = get_jwt_identity()
-            user = get_user_by_uuid(current_user_uuid)
+            user = get_user_profile(current_user_uuid, get_jwt())
             if not user:
                 return {"msg": "user not found"}, 404
-            return user.to_dict(), 200
+            return user, 200
         except Exception as e:
             return {"msg": "Authentication required"}, 401
 
@@ -295,6 +318,63 @@ class CreateRecord(Resource):
             return {"error": "Authentication required"}, 401
 
 
+@records_ns.route("/create-records")
+class CreateRecords(Resource):
+    @api.expect([record_model])
+    @api.response(201, "Al menos un record creado", record_batch_response)
+    @api.response(400, "Ningún record válido", error_response)
+    @api.response(401, "No autorizado", error_response)
+    @api.doc(security="cookieAuth")
+    def post(self):
+        """Crear varios records en una sola transacción (estado por elemento)"""
+        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+        from services.record_service import create_records
+        from routes.record_routes import _validate_record_data
+        from config import Config
+
+        try:
+            verify_jwt_in_request()
+            current_user_uuid = get_jwt_identity()
+
+            data = request.get_json()
+            if isinstance(data, dict):
+                data = data.get('records')
+
+            if not data or not isinstance(data, list):
+                return {"error": "No records provided"}, 400
+            if len(data) > Config.RECORD_BATCH_MAX_ITEMS:
+                return {"error": f"Too many records. Maximum is {Config.RECORD_BATCH_MAX_ITEMS}"}, 400
+
+            results = []
+            valid = []
+            for index, item in enumerate(data):
+                if not isinstance(item, dict):
+                    results.append({"index": index, "status": 400, "error": "Record must be an object"})
+                    continue
+                invalid = _validate_record_data(item, current_user_uuid)
+                if invalid:
+                    error, status = invalid
+                    results.append({"index": index, "status": status, "error": error})
+                    continue
+                results.append({"index": index, "status": 201})
+                valid.append(item)
+
+            create_records(valid)
+
+            saved = len(valid)
+            return {
+                "message": "Records processed",
+                "saved": saved,
+                "failed": len(data) - saved,
+                "results": results
+            }, 201 if saved else 400
+
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception as e:
+            return {"error": "Authentication required"}, 401
+
+
 @records_ns.route("/ranking/<string:difficulty>/<int:level>/<string:user_id>")
 class LevelRanking(Resource):
     @api.response(200, "Ranking del nivel", ranking_response)
@@ -1,11 +1,17 @@
 import os
-from flask import Flask, redirect, request
+from flask import Flask, redirect
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from datetime import datetime
-from api_docs.docs_bp import docs_bp  # Esto ya funciona
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
-from db import db, init_app_with_binds
+from db import db, init_app_with_binds, warm_pools
+from db_routing import init_replica_routing
+from json_provider import OrjsonProvider
+from compression import init_compression
+from metrics import init_metrics
+from slow_query_log import init_slow_query_log
+from commands import register_commands
+from services.record_buffer import init_record_buffer
 
 
 # Importar rutas
@@ -13,56 +19,99 @@ from routes.user_routes import user_bp
 from routes.auth_routes import auth_bp
 from routes.record_routes import record_bp
 from routes.game_routes import game_bp
+from routes.admin_routes import admin_bp
 
 
-def create_app():
-    app = Flask(__name__)
-    app.config.from_object(Config)
-
-
-    # Configuración CORS basada en el entorno
+def cors_options():
+    """Opciones de CORS según el entorno (también las usa asgi.py)."""
     if os.environ.get("FLASK_ENV") == "production":
         # Para producción - más restrictivo
-        CORS(
-            app,
+        return dict(
             origins=["https://unravel-sql.vercel.app"],
             methods=["GET", "POST", "PUT", "DELETE"],
             allow_headers=["Content-Type", "Authorization"],
             supports_credentials=True,
         )
-    else:
-        # Para desarrollo - más permisivo
-        CORS(
-            app,
-            origins=[
-                "https://unravel-sql.vercel.app",
-                "http://localhost:3000",
-                "http://localhost:5173",
-                "http://localhost:5174",
-                "http://127.0.0.1:3000",
-                "http://127.0.0.1:5173",
-                "http://127.0.0.1:5174",
-            ],
-            methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-            supports_credentials=True,
-        )
+    # Para desarrollo - más permisivo
+    return dict(
+        origins=[
+            "https://unravel-sql.vercel.app",
+            "http://localhost:3000",
+            "http://localhost:5173",
+            "http://localhost:5174",
+            "http://127.0.0.1:3000",
+            "http://127.0.0.1:5173",
+            "http://127.0.0.1:5174",
+        ],
+        methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
+        supports_credentials=True,
+    )
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+
+    # jsonify / get_json con orjson (mismo formato que el proveedor por defecto)
+    app.json = OrjsonProvider(app)
+
+    # IP real del cliente detrás de PROXY_FIX_X_FOR proxies (rate limit por IP)
+    if Config.PROXY_FIX_X_FOR > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.PROXY_FIX_X_FOR, x_proto=Config.PROXY_FIX_X_FOR)
+
+    # Latencias, SQL por petición y esperas de los pools en /metrics. Primero,
+    # para que su after_request (el último en ejecutarse) lo cubra todo
+    init_metrics(app)
+
+    # Sentencias lentas con su plan EXPLAIN (SLOW_QUERY_THRESHOLD_MS)
+    init_slow_query_log(app)
+
+    # Configuración CORS basada en el entorno
+    CORS(app, **cors_options())
 
     # Inicializar aplicación con múltiples binds (PostgreSQL y MySQL)
     init_app_with_binds(app)
 
+    # Cookie de read-your-writes para la réplica (REPLICA_DATABASE_URL)
+    init_replica_routing(app)
+
+    # Abrir las conexiones de los pools en segundo plano (DB_POOL_WARM=true)
+    if Config.DB_POOL_WARM:
+        warm_pools(app)
+
+    # Compresión br/gzip de las respuestas grandes (COMPRESS_RESPONSES)
+    init_compression(app)
+
     # Inicializar JWT Manager
     jwt = JWTManager(app)
 
+    # Comandos de mantenimiento (flask backfill-record-best, ...)
+    register_commands(app)
+
+    # Ingesta write-behind de records (RECORD_WRITE_BEHIND=true)
+    init_record_buffer(app)
+
+    # Rankings en memoria: cargar los leaderboards al arrancar
+    if Config.RANKING_BACKEND == "memory":
+        from services.record_service import warm_leaderboard_engine
+        with app.app_context():
+            warm_leaderboard_engine()
+
     # Registrar blueprints
     app.register_blueprint(user_bp, url_prefix="/api/users")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(record_bp, url_prefix="/api/record")
     app.register_blueprint(game_bp, url_prefix="/api/game")
+    app.register_blueprint(admin_bp, url_prefix="/api/admin")
 
-    # Swagger solo en desarrollo
+    # Swagger y rutas de prueba solo en desarrollo. Import diferido: en
+    # producción no se cargan flask-restx ni jsonschema
     if os.environ.get("FLASK_ENV") != "production":
+        from api_docs.docs_bp import docs_bp
+        from routes.dev_routes import dev_bp
         app.register_blueprint(docs_bp, url_prefix="/api")  # Swagger en /api/docs/
+        app.register_blueprint(dev_bp, url_prefix="/api")
 
     @app.route("/")
     def index():
@@ -71,26 +120,6 @@ def create_app():
         else:
             return redirect("/api/docs/")
 
-    @app.route("/api/test-cors")
-    def test_cors():
-        return {
-            "message": "CORS test successful",
-            "origin": request.headers.get("Origin", "No Origin header"),
-            "user_agent": request.headers.get("User-Agent", "No User-Agent"),
-            "timestamp": datetime.now().isoformat(),
-        }
-
-    @app.route("/api/test-register", methods=["POST"])
-    def test_register():
-        origin = request.headers.get("Origin", "No Origin header")
-        return {
-            "message": "This endpoint would create a user (test only)",
-            "origin": origin,
-            "data_received": request.get_json() if request.is_json else "No JSON data",
-            "timestamp": datetime.now().isoformat(),
-            "note": "In production, only https://unravel-sql.vercel.app can access this",
-        }
-
     return app
 
 
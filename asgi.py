@@ -0,0 +1,244 @@
+"""
+Punto de entrada ASGI (alternativo a wsgi.py).
+
+validate-str y los rankings se sirven con rutas asíncronas sobre los
+engines de db_async (aiomysql/asyncpg): mientras MySQL o PostgreSQL
+responden, el worker sigue aceptando peticiones, así que un solo proceso
+mantiene cientos de consultas de jugador en vuelo (hasta el pool
+ASYNC_MYSQL_* y el governor). El resto de rutas son la app Flask de
+siempre, montada en ASGI_WSGI_THREADS hilos.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4 --no-proxy-headers
+
+Requiere requirements-asgi.txt. wsgi.py sigue funcionando igual.
+"""
+import os
+import time
+from contextlib import asynccontextmanager
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import NoAuthorizationError, WrongTokenError
+from jwt import ExpiredSignatureError
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.http import parse_accept_header, parse_etags
+from app import create_app, cors_options
+from compression import compress_for
+from config import Config
+from db_async import async_db
+from db_routing import STICKY_COOKIE
+from routes.record_routes import level_ranking_payload, global_ranking_payload
+from services.game_service import execute_sql_async
+from services.record_service import (
+    get_ranking_by_level_async, get_global_ranking_by_difficulty_async,
+    get_leaderboard_version_async, leaderboard_key
+)
+
+flask_app = create_app()
+async_db.init_app(flask_app)
+
+
+def json_response(request, payload, status=200, etag=None):
+    """Como jsonify + los after_request de la app Flask (compresión y ETag débil)."""
+    body = flask_app.json.dumps_bytes(payload, separators=(",", ":")) + b"\n"
+    headers = {"Vary": "Accept-Encoding"}
+    body, encoding = compress_for(body, parse_accept_header(request.headers.get("accept-encoding")))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if etag is not None:
+        headers["Cache-Control"] = "private, no-cache"
+        headers["ETag"] = f'W/"{etag}"' if encoding is not None else f'"{etag}"'
+    return Response(body, status_code=status, headers=headers, media_type="application/json")
+
+
+def _jwt_identity(request):
+    """
+    Identidad del access token, buscado como lo hace jwt_required (cookie y
+    luego cabecera Authorization). Lanza las mismas excepciones.
+    """
+    token = request.cookies.get(Config.JWT_ACCESS_COOKIE_NAME)
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+    if not token:
+        raise NoAuthorizationError("Missing JWT in cookies or headers")
+    with flask_app.app_context():
+        claims = decode_token(token)
+    if claims.get("type") != "access":
+        raise WrongTokenError("Only non-refresh tokens are allowed")
+    return claims.get(flask_app.config["JWT_IDENTITY_CLAIM"])
+
+
+def _jwt_error(request, error):
+    """Respuesta de Flask-JWT-Extended para un token ausente, caducado o inválido."""
+    if isinstance(error, ExpiredSignatureError):
+        return json_response(request, {"msg": "Token has expired"}, 401)
+    if isinstance(error, NoAuthorizationError):
+        return json_response(request, {"msg": str(error)}, 401)
+    return json_response(request, {"msg": str(error)}, 422)
+
+
+def _client_id(request):
+    """Como _client_id de game_routes: usuario del JWT si lo hay, si no la IP."""
+    try:
+        identity = _jwt_identity(request)
+    except Exception:
+        identity = None
+    if identity:
+        return f"user:{identity}"
+    return f"ip:{_remote_addr(request)}"
+
+
+def _remote_addr(request):
+    """
+    IP del cliente como la deja ProxyFix en la app Flask: con
+    PROXY_FIX_X_FOR = n, la n-ésima entrada de X-Forwarded-For empezando
+    por la derecha (la que añadió el proxy más externo de confianza).
+    """
+    hops = Config.PROXY_FIX_X_FOR
+    if hops > 0:
+        forwarded = [value.strip() for value in request.headers.get("x-forwarded-for", "").split(",")]
+        if len(forwarded) >= hops and forwarded[-hops]:
+            return forwarded[-hops]
+    return request.client.host if request.client else None
+
+
+def _use_replica(request):
+    """False si el cliente tiene la cookie de read-your-writes vigente."""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) <= time.time()
+    except ValueError:
+        return True
+
+
+async def _ranking_etag(key, use_replica):
+    """Como _ranking_etag de record_routes, con la versión leída en asíncrono."""
+    if Config.RANKING_BACKEND == "memory":
+        return None, None
+    version = await get_leaderboard_version_async(key, use_replica)
+    if version is None:
+        return None, None
+    return f"{leaderboard_key(key)}:{version}", version
+
+
+def _not_modified(request, etag):
+    if etag is None or not parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+        return None
+    return Response(status_code=304, headers={"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"})
+
+
+async def validate_str(request):
+    try:
+        data = flask_app.json.loads(await request.body())
+        if not data:
+            return json_response(request, {"msg": "No JSON data provided", "code": 400}, 400)
+
+        lstr = data.get('query')
+        decimal = data.get('decimal')
+
+        if not lstr:
+            return json_response(request, {"msg": "Query parameter is required", "code": 400}, 400)
+        if decimal is None:
+            return json_response(request, {"msg": "Decimal parameter is required", "code": 400}, 400)
+
+        result = await execute_sql_async(lstr, decimal, _client_id(request))
+        return json_response(request, result, result.get('code', 200))
+
+    except Exception as e:
+        return json_response(request, {"msg": f"Internal error: {str(e)}", "code": 500}, 500)
+
+
+async def ranking_by_level(request):
+    try:
+        _jwt_identity(request)
+    except Exception as e:
+        return _jwt_error(request, e)
+
+    difficulty = request.path_params["difficulty"]
+    level = request.path_params["level"]
+    user_id = request.path_params["user_id"]
+    try:
+        valid_difficulties = ['easy', 'medium', 'hard']
+        if difficulty not in valid_difficulties:
+            return json_response(request, {
+                "error": f"Invalid difficulty. Must be one of: {', '.join(valid_difficulties)}"
+            }, 400)
+        if level < 1:
+            return json_response(request, {"error": "Level must be >= 1"}, 400)
+
+        use_replica = _use_replica(request)
+        etag, version = await _ranking_etag(("level", difficulty, level), use_replica)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        ranking = await get_ranking_by_level_async(difficulty, level, user_id, version, use_replica)
+        if not ranking:
+            return json_response(request, {"error": "No ranking data available for this level"}, 404)
+
+        return json_response(request, level_ranking_payload(difficulty, level, ranking), 200, etag)
+
+    except Exception as e:
+        return json_response(request, {"error": f"Internal server error: {str(e)}"}, 500)
+
+
+async def global_ranking(request):
+    try:
+        difficulty = request.query_params.get('difficulty')
+        user_id = request.query_params.get('userId')
+
+        if difficulty not in {'easy', 'medium', 'hard'}:
+            return json_response(request, {"error": "Invalid or missing 'difficulty' (easy|medium|hard)"}, 400)
+        if not user_id:
+            return json_response(request, {"error": "Missing 'userId' query param"}, 400)
+
+        use_replica = _use_replica(request)
+        etag, version = await _ranking_etag(("global", difficulty), use_replica)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        data = await get_global_ranking_by_difficulty_async(difficulty, user_id, version, use_replica)
+        return json_response(request, global_ranking_payload(difficulty, data), 200, etag)
+
+    except Exception as e:
+        return json_response(request, {"error": f"Internal server error: {str(e)}"}, 500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await async_db.dispose()
+
+
+# Mismo CORS que la app Flask para las rutas asíncronas (OPTIONS para el preflight)
+_cors = cors_options()
+_route_middleware = [Middleware(
+    CORSMiddleware,
+    allow_origins=_cors["origins"],
+    allow_methods=_cors["methods"],
+    allow_headers=_cors["allow_headers"],
+    allow_credentials=_cors["supports_credentials"],
+)]
+
+app = Starlette(
+    routes=[
+        Route("/api/game/validate-str", validate_str, methods=["POST", "OPTIONS"], middleware=_route_middleware),
+        Route(
+            "/api/record/ranking/{difficulty}/{level:int}/{user_id}", ranking_by_level,
+            methods=["GET", "OPTIONS"], middleware=_route_middleware
+        ),
+        Route("/api/record/global-ranking", global_ranking, methods=["GET", "OPTIONS"], middleware=_route_middleware),
+        Mount("/", app=WSGIMiddleware(flask_app, workers=Config.ASGI_WSGI_THREADS)),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
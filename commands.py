@@ -0,0 +1,27 @@
+import click
+
+
+def register_commands(app):
+    """Registrar comandos de mantenimiento en el CLI de Flask (`flask <comando>`)"""
+
+    @app.cli.command("backfill-record-best")
+    def backfill_record_best():
+        """Reconstruye record_best y user_difficulty_total desde el historial de record."""
+        from services.record_service import rebuild_record_best
+
+        try:
+            total = rebuild_record_best()
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"record_best rebuilt: {total} rows")
+
+    @app.cli.command("build-game-sandbox")
+    def build_game_sandbox():
+        """Regenera desde MySQL la copia SQLite del dataset del juego (GAME_SQLITE_PATH)."""
+        from db import db
+        from services.game_service import game_sandbox
+
+        if not game_sandbox.path:
+            raise click.ClickException("GAME_SQLITE_PATH no está configurado")
+        game_sandbox.load(db.get_engine(bind='mysql'), rebuild=True)
+        click.echo(f"game sandbox rebuilt: {game_sandbox.tables} tables, {game_sandbox.rows} rows")
@@ -0,0 +1,83 @@
+import gzip
+from flask import request
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # Sin Brotli solo se ofrece gzip
+    brotli = None
+
+# Tipos que merece la pena comprimir (JSON de la API, HTML/CSS/JS de Swagger)
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+
+def _compressible(response):
+    mimetype = response.mimetype or ""
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def choose_encoding(accept_encodings):
+    """'br' o 'gzip' según el Accept-Encoding del cliente (a igual calidad, br), o None."""
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=Config.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def compress_for(body, accept_encodings):
+    """
+    (cuerpo, Content-Encoding) para un cliente: comprimido si llega a
+    COMPRESSION_MIN_BYTES y acepta br o gzip, si no (body, None).
+    """
+    if not Config.COMPRESS_RESPONSES or len(body) < Config.COMPRESSION_MIN_BYTES:
+        return body, None
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return body, None
+    return compress(body, encoding), encoding
+
+
+def init_compression(app):
+    """
+    Comprime con brotli o gzip las respuestas de texto/JSON de al menos
+    COMPRESSION_MIN_BYTES si el cliente lo acepta. El ETag pasa a débil:
+    el cuerpo ya no es byte a byte el mismo que el de la versión sin comprimir.
+    """
+    if not Config.COMPRESS_RESPONSES:
+        return
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add("Accept-Encoding")
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not _compressible(response)
+        ):
+            return response
+        body, encoding = compress_for(response.get_data(), request.accept_encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return response
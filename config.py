@@ -22,4 +22,128 @@ class Config:
     MYSQL_USER = os.environ.get('MYSQL_USER', 'dictamigos_dev')
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', 'Tbcytdg1bb#')
     MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE', 'unravel-sql-game-db')
+    # URL completa del bind mysql (p. ej. sqlite:///game.db o un MySQL local);
+    # si está definida se ignoran MYSQL_HOST/USER/PASSWORD/DATABASE
+    MYSQL_DATABASE_URL = os.environ.get('MYSQL_DATABASE_URL')
 
+    # Pools de conexiones por bind: POSTGRES_* (bind por defecto) y MYSQL_*
+    # (dataset del juego). Con DB_POOL_WARM los pools se llenan al arrancar
+    POSTGRES_POOL_SIZE = int(os.environ.get('POSTGRES_POOL_SIZE', 5))
+    POSTGRES_MAX_OVERFLOW = int(os.environ.get('POSTGRES_MAX_OVERFLOW', 10))
+    POSTGRES_POOL_TIMEOUT = float(os.environ.get('POSTGRES_POOL_TIMEOUT', 10))
+    POSTGRES_POOL_RECYCLE = int(os.environ.get('POSTGRES_POOL_RECYCLE', 1800))
+    POSTGRES_POOL_PRE_PING = os.environ.get('POSTGRES_POOL_PRE_PING', 'True').lower() == 'true'
+    MYSQL_POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE', 5))
+    MYSQL_MAX_OVERFLOW = int(os.environ.get('MYSQL_MAX_OVERFLOW', 5))
+    MYSQL_POOL_TIMEOUT = float(os.environ.get('MYSQL_POOL_TIMEOUT', 5))
+    # Por debajo del wait_timeout del servidor MySQL
+    MYSQL_POOL_RECYCLE = int(os.environ.get('MYSQL_POOL_RECYCLE', 1800))
+    MYSQL_POOL_PRE_PING = os.environ.get('MYSQL_POOL_PRE_PING', 'True').lower() == 'true'
+    DB_POOL_WARM = os.environ.get('DB_POOL_WARM', 'True').lower() == 'true'
+    # Conexiones máximas del despliegue (todos los workers de gunicorn) a cada
+    # servidor; gunicorn.conf.py reparte el presupuesto en los pools de cada
+    # worker. 0 = usar los *_POOL_SIZE / *_MAX_OVERFLOW de arriba
+    POSTGRES_CONNECTION_BUDGET = int(os.environ.get('POSTGRES_CONNECTION_BUDGET', 0))
+    MYSQL_CONNECTION_BUDGET = int(os.environ.get('MYSQL_CONNECTION_BUDGET', 0))
+
+    # Modo ASGI (asgi.py): validate-str y rankings con engines asíncronos
+    # (asyncpg/aiomysql). El pool MySQL asíncrono es más grande que el
+    # síncrono: una consulta en vuelo ya no ocupa un hilo. Las demás rutas
+    # (Flask) se sirven en ASGI_WSGI_THREADS hilos
+    ASYNC_MYSQL_POOL_SIZE = int(os.environ.get('ASYNC_MYSQL_POOL_SIZE', 20))
+    ASYNC_MYSQL_MAX_OVERFLOW = int(os.environ.get('ASYNC_MYSQL_MAX_OVERFLOW', 30))
+    ASYNC_MYSQL_POOL_TIMEOUT = float(os.environ.get('ASYNC_MYSQL_POOL_TIMEOUT', 10))
+    ASYNC_MYSQL_POOL_RECYCLE = int(os.environ.get('ASYNC_MYSQL_POOL_RECYCLE', 1800))
+    ASYNC_MYSQL_POOL_PRE_PING = os.environ.get('ASYNC_MYSQL_POOL_PRE_PING', 'True').lower() == 'true'
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+
+    # Réplica de lectura de PostgreSQL para rankings y perfil (opcional). Tras
+    # escribir, el cliente lee del primario durante REPLICA_STICKY_SECONDS
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+    # bcrypt: coste (los hashes con otro coste se rehacen al iniciar sesión) y
+    # ejecutor acotado; con la cola llena login/register responden 503.
+    # AUTH_HASH_WORKERS=0 usa un hilo por CPU
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    AUTH_HASH_WORKERS = int(os.environ.get('AUTH_HASH_WORKERS', 0))
+    AUTH_HASH_MAX_QUEUE = int(os.environ.get('AUTH_HASH_MAX_QUEUE', 16))
+    AUTH_RETRY_AFTER_SECONDS = int(os.environ.get('AUTH_RETRY_AFTER_SECONDS', 1))
+
+    # Perfiles de /api/users/me (por worker): con el TTL se vuelve a comprobar
+    # en la base de datos que el usuario existe, también con tokens con claims
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 4096))
+    IDENTITY_CACHE_TTL_SECONDS = int(os.environ.get('IDENTITY_CACHE_TTL_SECONDS', 60))
+
+    # Caché en proceso de los rankings (por worker)
+    RANKING_CACHE_TTL_SECONDS = int(os.environ.get('RANKING_CACHE_TTL_SECONDS', 30))
+    RANKING_CACHE_MAX_ENTRIES = int(os.environ.get('RANKING_CACHE_MAX_ENTRIES', 64))
+
+    # Backend de los rankings: 'sql' (consultas + caché) o 'memory' (motor en
+    # memoria cargado al arrancar); con 'memory' se vuelve a SQL si no carga
+    RANKING_BACKEND = os.environ.get('RANKING_BACKEND', 'sql').lower()
+    LEADERBOARD_RESYNC_SECONDS = int(os.environ.get('LEADERBOARD_RESYNC_SECONDS', 300))
+
+    # Máximo de records por petición en /api/record/create-records
+    RECORD_BATCH_MAX_ITEMS = int(os.environ.get('RECORD_BATCH_MAX_ITEMS', 100))
+
+    # Ingesta write-behind de records: create-record responde 202 y un hilo
+    # escribe en lotes; con RECORD_JOURNAL_PATH los records pendientes se
+    # guardan en disco y se reproducen al arrancar si el worker se cae
+    RECORD_WRITE_BEHIND = os.environ.get('RECORD_WRITE_BEHIND', 'False').lower() == 'true'
+    RECORD_BUFFER_MAX_SIZE = int(os.environ.get('RECORD_BUFFER_MAX_SIZE', 10000))
+    RECORD_FLUSH_BATCH_SIZE = int(os.environ.get('RECORD_FLUSH_BATCH_SIZE', 200))
+    RECORD_FLUSH_INTERVAL_SECONDS = float(os.environ.get('RECORD_FLUSH_INTERVAL_SECONDS', 1.0))
+    RECORD_JOURNAL_PATH = os.environ.get('RECORD_JOURNAL_PATH')
+    RECORD_JOURNAL_FSYNC = os.environ.get('RECORD_JOURNAL_FSYNC', 'True').lower() == 'true'
+
+    # Compresión de respuestas (br si está instalado Brotli, si no gzip) a
+    # partir de COMPRESSION_MIN_BYTES; por debajo no compensa
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'True').lower() == 'true'
+    COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+    # Caché de resultados de /api/game/validate-str (por worker); TTL 0 = sin expiración
+    VALIDATION_CACHE_MAX_ENTRIES = int(os.environ.get('VALIDATION_CACHE_MAX_ENTRIES', 2048))
+    VALIDATION_CACHE_TTL_SECONDS = int(os.environ.get('VALIDATION_CACHE_TTL_SECONDS', 0))
+
+    # Governor de consultas de jugador sobre el bind mysql: tiempo máximo por
+    # sentencia, consultas en curso por jugador (o IP) y en total; 0 = tamaño del pool
+    PLAYER_QUERY_TIMEOUT_MS = int(os.environ.get('PLAYER_QUERY_TIMEOUT_MS', 5000))
+    PLAYER_QUERY_MAX_PER_USER = int(os.environ.get('PLAYER_QUERY_MAX_PER_USER', 2))
+    PLAYER_QUERY_MAX_CONCURRENT = int(os.environ.get('PLAYER_QUERY_MAX_CONCURRENT', 0))
+
+    # Proxies inversos delante de la app (nginx, balanceador...): la IP del
+    # cliente se toma de X-Forwarded-For saltando ese número de proxies. Sin
+    # proxies (0) se usa la IP de la conexión y la cabecera se ignora
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    # Backend de las consultas de jugador: 'mysql' o 'sqlite' (copia local del
+    # dataset por worker, en memoria o en GAME_SQLITE_PATH con mmap; lo que
+    # SQLite no sepa ejecutar va a MySQL)
+    GAME_SQL_BACKEND = os.environ.get('GAME_SQL_BACKEND', 'mysql').lower()
+    GAME_SQLITE_PATH = os.environ.get('GAME_SQLITE_PATH')
+    GAME_SQLITE_MMAP_BYTES = int(os.environ.get('GAME_SQLITE_MMAP_BYTES', 256 * 1024 * 1024))
+
+    # Token para los endpoints de operación (/api/admin/...); sin token quedan desactivados
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+    # Métricas de Prometheus en GET /metrics (requiere prometheus_client). Con
+    # varios workers, gunicorn.conf.py define PROMETHEUS_MULTIPROC_DIR para
+    # agregarlas; con METRICS_TOKEN se pide "Authorization: Bearer <token>".
+    # En producción sin METRICS_TOKEN el endpoint queda desactivado
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Sentencias lentas de los dos binds (SLOW_QUERY_THRESHOLD_MS, 0 = desactivado):
+    # al log con parámetros y función de services/ que las lanzó, y a un buffer
+    # circular por worker (GET /api/slow-queries, solo fuera de producción).
+    # El plan EXPLAIN (ANALYZE en SELECT de PostgreSQL, salvo en producción)
+    # se captura en segundo plano y se escribe en el log, como mucho
+    # SLOW_QUERY_EXPLAINS_PER_MINUTE por minuto
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 500))
+    SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 200))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'True').lower() == 'true'
+    SLOW_QUERY_EXPLAINS_PER_MINUTE = int(os.environ.get('SLOW_QUERY_EXPLAINS_PER_MINUTE', 6))
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get('SLOW_QUERY_EXPLAIN_TIMEOUT_MS', 10000))
@@ -1,32 +1,156 @@
+import atexit
+import click
 import psycopg2
 import psycopg2.extras
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import make_url
+from db_pool import TimedQueuePool, instrument_engine, warm_pool
+from db_routing import RoutingSession
 import pymysql
+import threading
 
 
+class PooledConnection:
+    """
+    Conexión DBAPI prestada por el pool de un engine de Flask-SQLAlchemy.
+
+    cursor() sin argumentos devuelve cursores de diccionario (RealDictCursor
+    en psycopg2, DictCursor en PyMySQL), igual que las conexiones que abrían
+    antes get_connection y get_mysql_connection. close() devuelve la
+    conexión al pool; como context manager hace commit (o rollback si hay
+    excepción) y la devuelve.
+    """
+
+    def __init__(self, connection, dict_rows=True):
+        self._connection = connection
+        self._cursor_args = ()
+        self._cursor_kwargs = {}
+        if dict_rows:
+            driver_connection = connection.driver_connection
+            if isinstance(driver_connection, psycopg2.extensions.connection):
+                self._cursor_kwargs = {"cursor_factory": psycopg2.extras.RealDictCursor}
+            elif isinstance(driver_connection, pymysql.connections.Connection):
+                self._cursor_args = (pymysql.cursors.DictCursor,)
+
+    def cursor(self, *args, **kwargs):
+        if not args and not kwargs:
+            return self._connection.cursor(*self._cursor_args, **self._cursor_kwargs)
+        return self._connection.cursor(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._connection.commit()
+            else:
+                self._connection.rollback()
+        finally:
+            self._connection.close()
+
+
+def raw_connection(bind=None, dict_rows=True):
+    """
+    Conexión DBAPI del pool del bind indicado (None = PostgreSQL, 'mysql' =
+    dataset del juego). Usa los mismos engines que Flask-SQLAlchemy, así que
+    no abre sockets aparte; requiere contexto de aplicación.
+    """
+    return PooledConnection(db.engines[bind].raw_connection(), dict_rows=dict_rows)
+
 def get_connection():
-    return psycopg2.connect(
-        Config.DATABASE_URL,
-        cursor_factory=psycopg2.extras.RealDictCursor
-    )
+    return raw_connection()
 
 def get_mysql_connection():
-    return pymysql.connect(
-        host=Config.MYSQL_HOST,
-        user=Config.MYSQL_USER,
-        password=Config.MYSQL_PASSWORD,
-        database=Config.MYSQL_DATABASE,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return raw_connection('mysql')
+
+# RoutingSession: lecturas de @read_replica a la réplica si hay REPLICA_DATABASE_URL
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
-db = SQLAlchemy()
+def engine_options(prefix, url):
+    """
+    Opciones de engine para un bind a partir de Config (<prefix>_POOL_SIZE,
+    <prefix>_MAX_OVERFLOW, <prefix>_POOL_TIMEOUT, <prefix>_POOL_RECYCLE,
+    <prefix>_POOL_PRE_PING). SQLite en memoria conserva su pool propio.
+    """
+    options = {
+        "pool_pre_ping": getattr(Config, f"{prefix}_POOL_PRE_PING"),
+        "pool_recycle": getattr(Config, f"{prefix}_POOL_RECYCLE"),
+    }
+    if url:
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+            return options
+    options.update({
+        "poolclass": TimedQueuePool,
+        "pool_size": getattr(Config, f"{prefix}_POOL_SIZE"),
+        "max_overflow": getattr(Config, f"{prefix}_MAX_OVERFLOW"),
+        "pool_timeout": getattr(Config, f"{prefix}_POOL_TIMEOUT"),
+    })
+    return options
 
 def init_app_with_binds(app):
     """Inicializar la aplicación con múltiples binds de base de datos"""
     # Configurar binds para múltiples bases de datos
-    mysql_uri = f"mysql+pymysql://{Config.MYSQL_USER}:{Config.MYSQL_PASSWORD}@{Config.MYSQL_HOST}/{Config.MYSQL_DATABASE}"
+    mysql_uri = Config.MYSQL_DATABASE_URL or (
+        f"mysql+pymysql://{Config.MYSQL_USER}:{Config.MYSQL_PASSWORD}@{Config.MYSQL_HOST}/{Config.MYSQL_DATABASE}"
+    )
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options("POSTGRES", app.config.get('SQLALCHEMY_DATABASE_URI'))
     app.config['SQLALCHEMY_BINDS'] = {
-        'mysql': mysql_uri
+        'mysql': {"url": mysql_uri, **engine_options("MYSQL", mysql_uri)}
     }
-    db.init_app(app)
\ No newline at end of file
+    # Réplica de lectura de PostgreSQL (mismas opciones de pool que el primario)
+    if Config.REPLICA_DATABASE_URL:
+        app.config['SQLALCHEMY_BINDS']['replica'] = {
+            "url": Config.REPLICA_DATABASE_URL,
+            **engine_options("POSTGRES", Config.REPLICA_DATABASE_URL)
+        }
+    db.init_app(app)
+    # Migraciones (flask db ...) solo sobre el bind por defecto (PostgreSQL).
+    # Flask-Migrate importa alembic entero, así que solo se registra cuando
+    # la app la carga el CLI de Flask (hay contexto de click), no en gunicorn
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    # Métricas de los pools (GET /api/admin/pools)
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            instrument_engine(bind_key or "default", engine)
+
+    # Cerrar las conexiones de los pools al apagar el worker
+    atexit.register(dispose_engines, app)
+
+def dispose_engines(app, close=True):
+    """
+    Cierra las conexiones abiertas de todos los binds. Con close=False (en
+    un worker recién creado por fork) solo se olvidan las heredadas del
+    master, sin cerrar sockets que no son suyos.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+def warm_pools(app):
+    """
+    Abre en segundo plano las conexiones de cada pool al arrancar el worker.
+    Un bind inaccesible solo deja un aviso en el log.
+    """
+    def warm():
+        with app.app_context():
+            for bind_key, engine in db.engines.items():
+                name = bind_key or "default"
+                size = getattr(engine.pool, "size", None)
+                try:
+                    opened = warm_pool(engine, size() if callable(size) else 1)
+                    app.logger.info(f"Pool {name} warmed: {opened} connections")
+                except Exception as e:
+                    app.logger.warning(f"Could not warm pool {name}: {str(e)}")
+
+    thread = threading.Thread(target=warm, name="pool-warmup", daemon=True)
+    thread.start()
+    return thread
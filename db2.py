@@ -1,22 +1,14 @@
-import os
-from dotenv import load_dotenv
-import mysql.connector
-from mysql.connector import pooling
+from db import raw_connection
 
-load_dotenv()
-
-pool = pooling.MySQLConnectionPool(
-    pool_name=os.getenv("DB_POOL_NAME", "pool_app"),
-    pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
-    pool_reset_session=True,
-    host=os.getenv("DB_HOST", "127.0.0.1"),
-    port=int(os.getenv("DB_PORT", "3306")),
-    user=os.getenv("DB_USER", "root"),
-    password=os.getenv("DB_PASS", ""),
-    database=os.getenv("DB_NAME", "unravel_game"),
-    charset="utf8mb4",
-    collation="utf8mb4_unicode_ci",
-)
 
 def get_conn2():
-    return pool.get_connection()
\ No newline at end of file
+    """
+    Conexión al dataset del juego. Antes venía de un pool propio de
+    mysql.connector creado al importar; ahora se presta del pool del bind
+    mysql de Flask-SQLAlchemy (cursores de tuplas, como antes).
+
+    El destino es el de ese bind (MYSQL_DATABASE_URL o MYSQL_HOST/USER/
+    PASSWORD/DATABASE): DB_HOST, DB_PORT, DB_USER, DB_PASS, DB_NAME y
+    DB_POOL_* ya no se leen. Requiere contexto de aplicación.
+    """
+    return raw_connection('mysql', dict_rows=False)
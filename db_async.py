@@ -0,0 +1,87 @@
+import asyncio
+from sqlalchemy.engine import make_url
+from db import engine_options
+from db_pool import TimedAsyncQueuePool, instrument_engine
+
+# Driver asíncrono de cada backend de los binds
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Prefijo de Config con las opciones de pool de cada bind (ver engine_options)
+POOL_PREFIXES = {
+    None: "POSTGRES",
+    "replica": "POSTGRES",
+    "mysql": "ASYNC_MYSQL",
+}
+
+
+def async_url(url):
+    """URL de un bind con su driver asíncrono (postgresql -> postgresql+asyncpg, ...)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend}")
+    parsed = parsed.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == "postgresql" and "sslmode" in parsed.query:
+        # asyncpg recibe el modo SSL como 'ssl', no como 'sslmode' (psycopg2)
+        query = dict(parsed.query)
+        query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(query=query)
+    return parsed
+
+
+class AsyncDatabase:
+    """
+    Engines asíncronos (asyncpg / aiomysql) de los mismos binds que
+    Flask-SQLAlchemy, para las rutas nativas de asgi.py. Las URLs salen de la
+    configuración de la app ya inicializada con init_app_with_binds; el bind
+    mysql usa su propio pool (ASYNC_MYSQL_*), más grande que el síncrono,
+    porque una conexión esperando a MySQL ya no bloquea un hilo.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.engines = {}
+
+    def init_app(self, app):
+        # Import diferido: con wsgi.py (gunicorn) no se crean engines asíncronos
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        self.app = app
+        urls = {None: app.config["SQLALCHEMY_DATABASE_URI"]}
+        for bind_key, options in app.config.get("SQLALCHEMY_BINDS", {}).items():
+            urls[bind_key] = options["url"] if isinstance(options, dict) else options
+
+        for bind_key, url in urls.items():
+            options = engine_options(POOL_PREFIXES.get(bind_key, "POSTGRES"), url)
+            if "poolclass" in options:
+                options["poolclass"] = TimedAsyncQueuePool
+            engine = create_async_engine(async_url(url), **options)
+            instrument_engine(f"async_{bind_key or 'default'}", engine.sync_engine)
+            self.engines[bind_key] = engine
+
+    def read_engine(self, use_replica=True):
+        """Engine para lecturas de ranking: la réplica si la hay y se permite."""
+        if use_replica and "replica" in self.engines:
+            return self.engines["replica"]
+        return self.engines[None]
+
+    async def run_sync(self, fn, *args):
+        """
+        Ejecuta código síncrono (sesión de Flask-SQLAlchemy, sandbox SQLite,
+        backend de rankings en memoria) en un hilo con contexto de aplicación.
+        """
+        def call():
+            with self.app.app_context():
+                return fn(*args)
+        return await asyncio.to_thread(call)
+
+    async def dispose(self):
+        for engine in self.engines.values():
+            await engine.dispose()
+
+
+async_db = AsyncDatabase()
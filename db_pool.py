@@ -0,0 +1,170 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Contadores de un pool: esperas de checkout, conexiones en uso y conexiones abiertas."""
+
+    def __init__(self, name):
+        self.name = name
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        # Callback opcional on_wait(seconds, timed_out) (métricas de Prometheus)
+        self.on_wait = None
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+        if self.on_wait is not None:
+            self.on_wait(seconds, timed_out)
+
+    def add(self, attr, amount=1):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + amount)
+
+    def snapshot(self, pool):
+        with self._lock:
+            checkouts = self.checkouts
+            return {
+                "size": pool.size() if callable(getattr(pool, "size", None)) else None,
+                "inUse": self.in_use,
+                "idle": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+                "checkouts": checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "waitAvgMs": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "waitMaxMs": round(self.wait_max * 1000, 3),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout por una conexión libre.
+
+    Cuando el checkout abre una conexión nueva (pool por debajo de su tamaño
+    u overflow), el tiempo medido incluye también el connect. Solo cuenta
+    como timeout el agotamiento del pool (TimeoutError de SQLAlchemy); los
+    fallos al conectar no se registran como espera.
+    """
+
+    stats = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.stats is not None:
+                self.stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.stats is not None:
+            self.stats.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() cambia el pool por uno nuevo: conservar sus contadores
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool para los engines asíncronos (db_async)."""
+
+
+_pool_stats = {}
+_instrumented = {}
+_instrument_hooks = []
+
+
+def on_instrument(hook):
+    """
+    Llama a hook(name, engine, stats) con cada engine instrumentado: los que
+    ya lo están y los que se instrumenten después (engines de db_async).
+    """
+    if hook in _instrument_hooks:
+        return
+    _instrument_hooks.append(hook)
+    for name, engine in list(_instrumented.items()):
+        hook(name, engine, _pool_stats[name])
+
+
+def instrument_engine(name, engine):
+    """Registra los eventos del pool del engine y devuelve sus PoolStats."""
+    pool = engine.pool
+    if name in _pool_stats and getattr(pool, "stats", None) is _pool_stats[name]:
+        return _pool_stats[name]
+    stats = _pool_stats[name] = PoolStats(name)
+    if isinstance(pool, TimedQueuePool):
+        pool.stats = stats
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.add("connects")
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.add("checkouts")
+        stats.add("in_use")
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.add("in_use", -1)
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.add("invalidations")
+
+    _instrumented[name] = engine
+    for hook in _instrument_hooks:
+        hook(name, engine, stats)
+    return stats
+
+
+def get_pool_stats(engines):
+    """Estado de los pools instrumentados: {bind: {...}}."""
+    return {
+        name: _pool_stats[name].snapshot(engine.pool)
+        for name, engine in engines.items()
+        if name in _pool_stats
+    }
+
+
+def budget_pool_size(budget, workers, concurrency):
+    """
+    pool_size por worker para que `workers` procesos no abran más de
+    `budget` conexiones a un servidor. Un worker no usa más conexiones que
+    peticiones simultáneas (`concurrency`) más una para los hilos de fondo
+    (write-behind, warm-up). Sin max_overflow, así el límite es estricto.
+    """
+    per_worker = max(1, budget // max(1, workers))
+    return min(per_worker, concurrency + 1)
+
+
+def warm_pool(engine, connections):
+    """
+    Abre `connections` conexiones (todas abiertas a la vez, para que no se
+    reutilice la misma) y las devuelve al pool; así las primeras peticiones
+    tras un despliegue no pagan el connect.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
@@ -0,0 +1,122 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from config import Config
+
+# Clave de Session.info: True = lecturas a la réplica, False = forzar primario
+USE_REPLICA = "use_replica"
+# Clave de Session.info: la sesión ya escribió, todo lo demás va al primario
+WROTE = "wrote_primary"
+# Cookie con el instante (epoch) hasta el que el cliente lee del primario
+STICKY_COOKIE = "primary_reads_until"
+
+
+class RoutingSession(Session):
+    """
+    Session de Flask-SQLAlchemy que manda los SELECT del bind por defecto a
+    la réplica (bind 'replica') cuando la función en curso lo permite
+    (@read_replica) y la sesión no ha escrito nada. Escrituras, flushes,
+    SELECT ... FOR UPDATE y SQL en texto van siempre al primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return engine
+        if clause is not None and not isinstance(clause, Select):
+            self.info[WROTE] = True
+        if (
+            self.info.get(USE_REPLICA)
+            and not self.info.get(WROTE)
+            and not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        ):
+            engines = self._db.engines
+            if "replica" in engines and engine is engines.get(None):
+                return engines["replica"]
+        return engine
+
+
+def _sticky_to_primary():
+    """El cliente escribió hace poco: leer del primario para que vea sus cambios."""
+    if not has_request_context():
+        return False
+    if g.get("primary_write"):
+        return True
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_replica(fn):
+    """
+    Las lecturas de la función decorada pueden ir a la réplica, salvo que el
+    cliente tenga la cookie de read-your-writes o no haya réplica configurada.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        from db import db
+
+        session = db.session()
+        if (
+            USE_REPLICA in session.info
+            or "replica" not in db.engines
+            or _sticky_to_primary()
+        ):
+            return fn(*args, **kwargs)
+        session.info[USE_REPLICA] = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.info.pop(USE_REPLICA, None)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Fuerza el primario dentro del bloque, aunque se esté en @read_replica."""
+    from db import db
+
+    session = db.session()
+    previous = session.info.get(USE_REPLICA)
+    session.info[USE_REPLICA] = False
+    try:
+        yield
+    finally:
+        if previous is None:
+            session.info.pop(USE_REPLICA, None)
+        else:
+            session.info[USE_REPLICA] = previous
+
+
+def mark_primary_write():
+    """
+    Registra que la petición escribió en el primario; la respuesta lleva la
+    cookie STICKY_COOKIE durante REPLICA_STICKY_SECONDS.
+    """
+    if has_request_context():
+        g.primary_write = True
+
+
+def init_replica_routing(app):
+    """Pone la cookie de read-your-writes en las respuestas que escribieron."""
+    if not Config.REPLICA_DATABASE_URL:
+        return
+
+    @app.after_request
+    def set_sticky_cookie(response):
+        if g.get("primary_write"):
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(int(time.time() + Config.REPLICA_STICKY_SECONDS)),
+                max_age=Config.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                secure=Config.JWT_COOKIE_SECURE,
+                samesite=Config.JWT_COOKIE_SAMESITE
+            )
+        return response
@@ -0,0 +1,147 @@
+"""
+Perfil de producción de gunicorn (se carga solo al lanzar gunicorn desde
+la raíz del proyecto):
+
+    gunicorn wsgi:app
+    GUNICORN_PROFILE=gevent WEB_CONCURRENCY=4 gunicorn wsgi:app
+
+Perfiles (GUNICORN_PROFILE):
+    gthread  workers con GUNICORN_THREADS hilos cada uno (por defecto)
+    gevent   workers gevent con GUNICORN_WORKER_CONNECTIONS peticiones
+             simultáneas; psycopg2 y bcrypt se adaptan en post_fork
+
+Con POSTGRES_CONNECTION_BUDGET / MYSQL_CONNECTION_BUDGET el pool de cada
+worker se dimensiona para que todos juntos no pasen de ese número de
+conexiones (ver db_pool.budget_pool_size).
+
+Con preload_app (GUNICORN_PRELOAD, por defecto activo) la app se importa
+una vez en el master: los workers comparten esas páginas y arrancan antes.
+El master cierra sus conexiones antes de hacer fork y cada worker rehace lo
+que no sobrevive a un fork (pools, hilo write-behind, ejecutor de bcrypt).
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+profile = os.environ.get("GUNICORN_PROFILE", "gthread").lower()
+if profile not in ("gthread", "gevent"):
+    raise ValueError(f"Unknown GUNICORN_PROFILE: {profile} (gthread|gevent)")
+
+if profile == "gevent":
+    # Antes de importar la app con preload_app, para que sockets, hilos y
+    # locks que cree sean los de gevent
+    from gevent import monkey
+    monkey.patch_all()
+
+    import psycopg2.extensions
+    import psycopg2.extras
+    # psycopg2 es C: sin este callback bloquearía el hub durante cada consulta
+    psycopg2.extensions.set_wait_callback(psycopg2.extras.wait_select)
+
+from config import Config
+from db_pool import budget_pool_size
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = profile
+cpus = multiprocessing.cpu_count()
+if profile == "gevent":
+    workers = int(os.environ.get("WEB_CONCURRENCY", cpus))
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+    concurrency = worker_connections
+else:
+    workers = int(os.environ.get("WEB_CONCURRENCY", cpus * 2))
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+    concurrency = threads
+
+# Reciclar workers de forma escalonada para que no se reinicien todos a la vez
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# El hilo write-behind vacía su cola al apagar el worker
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True").lower() == "true"
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+# Presupuesto global de conexiones -> pool por worker. Se aplica sobre
+# Config antes de que se cree la app (en el master con preload_app, o en
+# cada worker, que hereda este módulo). La réplica usa los mismos valores
+# que el primario (POSTGRES_*).
+if Config.POSTGRES_CONNECTION_BUDGET:
+    Config.POSTGRES_POOL_SIZE = budget_pool_size(Config.POSTGRES_CONNECTION_BUDGET, workers, concurrency)
+    Config.POSTGRES_MAX_OVERFLOW = 0
+if Config.MYSQL_CONNECTION_BUDGET:
+    Config.MYSQL_POOL_SIZE = budget_pool_size(Config.MYSQL_CONNECTION_BUDGET, workers, concurrency)
+    Config.MYSQL_MAX_OVERFLOW = 0
+
+# Con preload_app los pools se llenan en cada worker (post_fork), no en el master
+warm_pools_after_fork = preload_app and Config.DB_POOL_WARM
+if preload_app:
+    Config.DB_POOL_WARM = False
+
+# Métricas de Prometheus (metrics.py): cada worker escribe las suyas en un
+# directorio compartido y /metrics las agrega. prometheus_client lo lee al
+# importarse, así que se fija antes de cargar la app; se vacía al arrancar
+# para no sumar los ficheros de una ejecución anterior
+if Config.METRICS_ENABLED:
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"unravel-metrics-{os.getpid()}")
+    )
+    os.makedirs(metrics_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(stale)
+
+
+def on_starting(server):
+    server.log.info(
+        f"Profile {profile}: {workers} workers x {concurrency} concurrent requests, "
+        f"pools per worker: postgres {Config.POSTGRES_POOL_SIZE}+{Config.POSTGRES_MAX_OVERFLOW}, "
+        f"mysql {Config.MYSQL_POOL_SIZE}+{Config.MYSQL_MAX_OVERFLOW}"
+    )
+    for name, budget, size, overflow in (
+        ("postgres", Config.POSTGRES_CONNECTION_BUDGET, Config.POSTGRES_POOL_SIZE, Config.POSTGRES_MAX_OVERFLOW),
+        ("mysql", Config.MYSQL_CONNECTION_BUDGET, Config.MYSQL_POOL_SIZE, Config.MYSQL_MAX_OVERFLOW),
+    ):
+        if budget and workers * (size + overflow) > budget:
+            server.log.warning(
+                f"{name} connection budget {budget} is below one connection per worker ({workers} workers)"
+            )
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from db import dispose_engines
+    from services.record_buffer import record_buffer
+
+    # El master no debe llevarse conexiones abiertas ni el hilo write-behind
+    # a los workers; cada worker arranca el suyo en post_fork
+    dispose_engines(server.app.wsgi())
+    record_buffer.stop()
+
+
+def post_fork(server, worker):
+    if profile == "gevent":
+        # bcrypt en hilos del sistema: en un greenlet bloquearía el worker
+        from gevent.threadpool import ThreadPoolExecutor
+        from services.password_pool import PasswordPool
+        PasswordPool.executor_class = ThreadPoolExecutor
+
+    if not preload_app:
+        # El worker crea la app después del fork: create_app lo inicializa todo
+        return
+
+    from db import dispose_engines, warm_pools
+    from services.auth_service import password_pool
+    from services.record_buffer import record_buffer
+
+    app = server.app.wsgi()
+    dispose_engines(app, close=False)
+    password_pool.reset()
+    record_buffer.after_fork()
+    if warm_pools_after_fork:
+        warm_pools(app)
@@ -0,0 +1,70 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el json de la librería estándar
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask (jsonify, request.get_json) sobre orjson.
+
+    La salida es la misma que con el proveedor por defecto: las fechas
+    siguen saliendo en formato HTTP (orjson las pasa a `default`), Decimal
+    como texto y las claves ordenadas. Lo que orjson no admite (argumentos
+    de json.dumps sin equivalente, enteros de más de 64 bits...) se
+    serializa con el json de la librería estándar.
+    """
+
+    # Argumentos de json.dumps que tienen equivalente en orjson
+    SUPPORTED_KWARGS = {"default", "sort_keys", "indent", "separators", "ensure_ascii"}
+
+    def _orjson_option(self, kwargs):
+        """Opciones de orjson para los kwargs, o None si hay que usar la librería estándar."""
+        if orjson is None or not kwargs.keys() <= self.SUPPORTED_KWARGS:
+            return None
+        indent = kwargs.get("indent")
+        if indent not in (None, 2):
+            return None
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, **kwargs):
+        kwargs.setdefault("default", self.default)
+        option = self._orjson_option(kwargs)
+        if option is not None:
+            try:
+                return orjson.dumps(obj, default=kwargs["default"], option=option)
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # Mismo mensaje de error que el proveedor por defecto
+                pass
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # Como DefaultJSONProvider.response, pero sin pasar por str
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args["indent"] = 2
+        else:
+            dump_args["separators"] = (",", ":")
+        return self._app.response_class(
+            self.dumps_bytes(obj, **dump_args) + b"\n", mimetype=self.mimetype
+        )
+
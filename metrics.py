@@ -0,0 +1,152 @@
+import hmac
+import os
+import time
+import weakref
+from flask import Response, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from config import Config
+from db_pool import on_instrument
+
+try:
+    import prometheus_client
+except ImportError:  # Sin prometheus_client no hay /metrics
+    prometheus_client = None
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SQL_STATEMENTS_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# Las métricas se registran una vez por proceso (create_app puede llamarse
+# varias veces). Con PROMETHEUS_MULTIPROC_DIR cada worker escribe sus valores
+# en ficheros de ese directorio y /metrics los agrega (ver gunicorn.conf.py)
+if prometheus_client is not None:
+    REQUEST_SECONDS = prometheus_client.Histogram(
+        "http_request_duration_seconds", "Request latency by Flask endpoint and status",
+        ["method", "endpoint", "status"], buckets=REQUEST_BUCKETS
+    )
+    REQUEST_SQL_STATEMENTS = prometheus_client.Histogram(
+        "http_request_sql_statements", "SQL statements per request by bind",
+        ["endpoint", "bind"], buckets=SQL_STATEMENTS_BUCKETS
+    )
+    REQUEST_SQL_SECONDS = prometheus_client.Histogram(
+        "http_request_sql_seconds", "SQL time per request by bind",
+        ["endpoint", "bind"], buckets=SQL_SECONDS_BUCKETS
+    )
+    STATEMENT_SECONDS = prometheus_client.Histogram(
+        "db_statement_duration_seconds", "SQL statement latency by bind (requests and background work)",
+        ["bind"], buckets=SQL_SECONDS_BUCKETS
+    )
+    POOL_WAIT_SECONDS = prometheus_client.Histogram(
+        "db_pool_wait_seconds", "Checkout time by bind (queue wait, plus connect time for new connections)",
+        ["bind"], buckets=POOL_WAIT_BUCKETS
+    )
+    POOL_TIMEOUTS = prometheus_client.Counter(
+        "db_pool_timeouts", "Checkouts that gave up waiting for a connection by bind", ["bind"]
+    )
+
+# Engine -> (bind, histograma de sentencias de ese bind)
+_engine_binds = weakref.WeakKeyDictionary()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # En el contexto de ejecución y no en conn.info: si la sentencia falla
+    # no queda nada pendiente en la conexión
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    bind, statement_seconds = _engine_binds.get(conn.engine, (None, None))
+    if bind is None:
+        return
+    statement_seconds.observe(elapsed)
+    # Totales de la petición en curso; el hilo write-behind y las rutas
+    # asíncronas de asgi.py no tienen contexto de petición
+    if has_request_context():
+        totals = g.setdefault("sql_metrics", {})
+        count, seconds = totals.get(bind, (0, 0.0))
+        totals[bind] = (count + 1, seconds + elapsed)
+
+
+def _instrument(bind, engine, stats):
+    """Hook de db_pool.on_instrument: sentencias y esperas del pool de cada engine."""
+    _engine_binds[engine] = (bind, STATEMENT_SECONDS.labels(bind))
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    wait_seconds = POOL_WAIT_SECONDS.labels(bind)
+    timeouts = POOL_TIMEOUTS.labels(bind)
+
+    def on_wait(seconds, timed_out):
+        wait_seconds.observe(seconds)
+        if timed_out:
+            timeouts.inc()
+
+    stats.on_wait = on_wait
+
+
+def _registry():
+    """Registro a exponer: el del proceso o, con varios workers, el agregado de todos."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def init_metrics(app):
+    """
+    Histogramas de latencia por endpoint y código, sentencias SQL y tiempo
+    de SQL por petición y bind, y espera de los pools, en GET /metrics
+    (formato de texto de Prometheus). Con METRICS_TOKEN el endpoint pide
+    "Authorization: Bearer <token>"; en producción, sin token no se activa
+    (igual que los endpoints de /api/admin).
+    """
+    if not Config.METRICS_ENABLED:
+        return
+    if os.environ.get("FLASK_ENV") == "production" and not Config.METRICS_TOKEN:
+        app.logger.info("METRICS_TOKEN not set; /metrics disabled in production")
+        return
+    if prometheus_client is None:
+        app.logger.warning("METRICS_ENABLED but prometheus_client is not installed; /metrics disabled")
+        return
+
+    # Engines ya instrumentados por init_app_with_binds y los que vengan después
+    on_instrument(_instrument)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop("request_started", None)
+        endpoint = request.endpoint or "unmatched"
+        if started is None or endpoint == "metrics":
+            return response
+        REQUEST_SECONDS.labels(request.method, endpoint, str(response.status_code)).observe(
+            time.perf_counter() - started
+        )
+        for bind, (count, seconds) in g.pop("sql_metrics", {}).items():
+            REQUEST_SQL_STATEMENTS.labels(endpoint, bind).observe(count)
+            REQUEST_SQL_SECONDS.labels(endpoint, bind).observe(seconds)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        if Config.METRICS_TOKEN:
+            expected = f"Bearer {Config.METRICS_TOKEN}"
+            if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+                return jsonify({"msg": "Forbidden"}), 403
+        return Response(
+            prometheus_client.generate_latest(_registry()),
+            content_type=prometheus_client.CONTENT_TYPE_LATEST
+        )
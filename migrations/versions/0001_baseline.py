@@ -0,0 +1,47 @@
+"""baseline: user and record tables
+
+Revision ID: 0001_baseline
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Esquema existente antes de usar migraciones. En bases ya creadas:
+    #   flask db stamp 0001_baseline
+    op.create_table(
+        'user',
+        sa.Column('uuid', sa.String(), nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=False),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('createdAt', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('uuid'),
+        sa.UniqueConstraint('username', name='user_username_key')
+    )
+    op.create_table(
+        'record',
+        sa.Column('uuid', sa.String(), nullable=False),
+        sa.Column('time', sa.Integer(), nullable=False),
+        sa.Column('level', sa.Integer(), nullable=False),
+        sa.Column('difficulty', sa.String(length=50), nullable=False),
+        sa.Column('errorCount', sa.Integer(), nullable=False),
+        sa.Column('createdAt', sa.DateTime(), nullable=False),
+        sa.Column('idUser', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['idUser'], ['user.uuid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('uuid')
+    )
+
+
+def downgrade():
+    op.drop_table('record')
+    op.drop_table('user')
@@ -0,0 +1,50 @@
+"""record_best: best mark per (idUser, difficulty, level)
+
+Revision ID: 0002_record_best
+Revises: 0001_baseline
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_record_best'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'record_best',
+        sa.Column('idUser', sa.String(), nullable=False),
+        sa.Column('difficulty', sa.String(length=50), nullable=False),
+        sa.Column('level', sa.Integer(), nullable=False),
+        sa.Column('bestTime', sa.Integer(), nullable=False),
+        sa.Column('minErrors', sa.Integer(), nullable=False),
+        sa.Column('updatedAt', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['idUser'], ['user.uuid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('idUser', 'difficulty', 'level'),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_record_best_board', 'record_best',
+        ['difficulty', 'level', 'bestTime', 'minErrors'],
+        unique=False, if_not_exists=True
+    )
+
+    # Backfill desde el historial (equivalente a `flask backfill-record-best`)
+    op.execute(sa.text('DELETE FROM record_best'))
+    op.execute(sa.text(
+        'INSERT INTO record_best ("idUser", difficulty, level, "bestTime", "minErrors", "updatedAt") '
+        'SELECT "idUser", difficulty, level, MIN(time), MIN("errorCount"), MAX("createdAt") '
+        'FROM record WHERE time > 0 '
+        'GROUP BY "idUser", difficulty, level'
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_record_best_board', table_name='record_best')
+    op.drop_table('record_best')
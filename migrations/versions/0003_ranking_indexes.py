@@ -0,0 +1,51 @@
+"""covering indexes for ranking queries and username lookup
+
+Revision ID: 0003_ranking_indexes
+Revises: 0002_record_best
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_ranking_indexes'
+down_revision = '0002_record_best'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY no puede ir dentro de una transacción; en PostgreSQL así no
+    # se bloquean las escrituras sobre record mientras se construye el índice
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_record_board_covering', 'record',
+            ['difficulty', 'level', 'idUser', 'time', 'errorCount'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_record_user_board', 'record',
+            ['idUser', 'difficulty', 'level'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_user_username', 'user', ['username'],
+            unique=True, if_not_exists=True, postgresql_concurrently=True
+        )
+
+    # ix_user_username ya garantiza la unicidad; la restricción original
+    # solo duplicaba el índice
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.text('ALTER TABLE "user" DROP CONSTRAINT IF EXISTS user_username_key'))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(sa.text(
+            'ALTER TABLE "user" ADD CONSTRAINT user_username_key UNIQUE (username)'
+        ))
+    op.drop_index('ix_user_username', table_name='user')
+    op.drop_index('ix_record_user_board', table_name='record')
+    op.drop_index('ix_record_board_covering', table_name='record')
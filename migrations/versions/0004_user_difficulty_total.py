@@ -0,0 +1,54 @@
+"""user_difficulty_total: per-user totals for the global ranking
+
+Revision ID: 0004_user_difficulty_total
+Revises: 0003_ranking_indexes
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_user_difficulty_total'
+down_revision = '0003_ranking_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_difficulty_total',
+        sa.Column('idUser', sa.String(), nullable=False),
+        sa.Column('difficulty', sa.String(length=50), nullable=False),
+        sa.Column('totalTime', sa.Integer(), nullable=False),
+        sa.Column('totalErrors', sa.Integer(), nullable=False),
+        sa.Column('levelsCompleted', sa.Integer(), nullable=False),
+        sa.Column('updatedAt', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['idUser'], ['user.uuid'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('idUser', 'difficulty'),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_user_difficulty_total_board', 'user_difficulty_total',
+        ['difficulty', 'totalTime', 'totalErrors', 'idUser'],
+        unique=False,
+        postgresql_where=sa.text('"levelsCompleted" >= 4'),
+        sqlite_where=sa.text('"levelsCompleted" >= 4'),
+        if_not_exists=True
+    )
+
+    # Backfill desde record_best
+    op.execute(sa.text('DELETE FROM user_difficulty_total'))
+    op.execute(sa.text(
+        'INSERT INTO user_difficulty_total '
+        '("idUser", difficulty, "totalTime", "totalErrors", "levelsCompleted", "updatedAt") '
+        'SELECT "idUser", difficulty, SUM("bestTime"), SUM("minErrors"), COUNT(level), MAX("updatedAt") '
+        'FROM record_best '
+        'GROUP BY "idUser", difficulty'
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_user_difficulty_total_board', table_name='user_difficulty_total')
+    op.drop_table('user_difficulty_total')
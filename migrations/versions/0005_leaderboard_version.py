@@ -0,0 +1,31 @@
+"""leaderboard_version: per-leaderboard version counter for ranking ETags
+
+Revision ID: 0005_leaderboard_version
+Revises: 0004_user_difficulty_total
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_leaderboard_version'
+down_revision = '0004_user_difficulty_total'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'leaderboard_version',
+        sa.Column('key', sa.String(length=100), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updatedAt', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('leaderboard_version')
@@ -0,0 +1,14 @@
+from db import db
+from datetime import datetime
+
+class LeaderboardVersion(db.Model):
+    """
+    Versión de cada leaderboard ("level:<dificultad>:<nivel>" y
+    "global:<dificultad>"). Se incrementa en la misma transacción en la que
+    mejora una marca y sirve de ETag a los endpoints de ranking.
+    """
+    __tablename__ = "leaderboard_version"
+
+    key = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updatedAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
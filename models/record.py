@@ -4,6 +4,11 @@ import uuid
 
 class Record(db.Model):
     __tablename__ = "record"
+    __table_args__ = (
+        # Filtros y agrupaciones de los rankings y del backfill de record_best
+        db.Index("ix_record_board_covering", "difficulty", "level", "idUser", "time", "errorCount"),
+        db.Index("ix_record_user_board", "idUser", "difficulty", "level"),
+    )
 
     uuid = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
     time = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,32 @@
+from db import db
+from datetime import datetime
+
+class RecordBest(db.Model):
+    """
+    Mejor marca de cada usuario por (dificultad, nivel).
+
+    Se mantiene desde create_record en la misma transacción que el insert en
+    `record`, así que los rankings leen una fila por jugador en lugar de
+    agrupar todos los intentos.
+    """
+    __tablename__ = "record_best"
+    __table_args__ = (
+        db.Index("ix_record_best_board", "difficulty", "level", "bestTime", "minErrors"),
+    )
+
+    idUser = db.Column(db.String, db.ForeignKey('user.uuid', ondelete='CASCADE'), primary_key=True)
+    difficulty = db.Column(db.String(50), primary_key=True)
+    level = db.Column(db.Integer, primary_key=True)
+    bestTime = db.Column(db.Integer, nullable=False)
+    minErrors = db.Column(db.Integer, nullable=False)
+    updatedAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "idUser": self.idUser,
+            "difficulty": self.difficulty,
+            "level": self.level,
+            "bestTime": self.bestTime,
+            "minErrors": self.minErrors,
+            "updatedAt": self.updatedAt.isoformat()
+        }
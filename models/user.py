@@ -6,7 +6,7 @@ class User(db.Model):
     __tablename__ = "user"
 
     uuid = db.Column(db.String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    username = db.Column(db.String(255), unique=True, nullable=False)
+    username = db.Column(db.String(255), unique=True, index=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
     createdAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
@@ -0,0 +1,40 @@
+from db import db
+from datetime import datetime
+
+# Niveles que hay que completar en una dificultad para entrar en el ranking global
+GLOBAL_MIN_LEVELS = 4
+
+class UserDifficultyTotal(db.Model):
+    """
+    Suma de las mejores marcas de un usuario en una dificultad.
+
+    Se recalcula desde record_best solo cuando create_record mejora una marca
+    del usuario, así el ranking global es un recorrido del índice parcial de
+    los usuarios que ya completaron GLOBAL_MIN_LEVELS niveles.
+    """
+    __tablename__ = "user_difficulty_total"
+    __table_args__ = (
+        db.Index(
+            "ix_user_difficulty_total_board",
+            "difficulty", "totalTime", "totalErrors", "idUser",
+            postgresql_where=db.text(f'"levelsCompleted" >= {GLOBAL_MIN_LEVELS}'),
+            sqlite_where=db.text(f'"levelsCompleted" >= {GLOBAL_MIN_LEVELS}')
+        ),
+    )
+
+    idUser = db.Column(db.String, db.ForeignKey('user.uuid', ondelete='CASCADE'), primary_key=True)
+    difficulty = db.Column(db.String(50), primary_key=True)
+    totalTime = db.Column(db.Integer, nullable=False)
+    totalErrors = db.Column(db.Integer, nullable=False)
+    levelsCompleted = db.Column(db.Integer, nullable=False)
+    updatedAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "idUser": self.idUser,
+            "difficulty": self.difficulty,
+            "totalTime": self.totalTime,
+            "totalErrors": self.totalErrors,
+            "levelsCompleted": self.levelsCompleted,
+            "updatedAt": self.updatedAt.isoformat()
+        }
@@ -0,0 +1,74 @@
+import hmac
+from functools import wraps
+from flask import Blueprint, request, jsonify
+from config import Config
+from db import db
+from db_async import async_db
+from db_pool import get_pool_stats
+from services.auth_service import password_pool
+from services.game_service import (
+    get_validation_cache_stats, clear_validation_cache, get_query_governor, get_async_query_governor
+)
+
+admin_bp = Blueprint("admin", __name__)
+
+def admin_required(fn):
+    """
+    Protege endpoints de operación con la cabecera X-Admin-Token.
+    Si ADMIN_TOKEN no está configurado los endpoints no existen (404).
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return jsonify({"msg": "Not found"}), 404
+        token = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(token, Config.ADMIN_TOKEN):
+            return jsonify({"msg": "Forbidden"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+@admin_bp.route("/validation-cache", methods=["GET"])
+@admin_required
+def validation_cache_stats():
+    """Aciertos, fallos y tamaño de la caché de validación de este worker."""
+    return jsonify(get_validation_cache_stats()), 200
+
+@admin_bp.route("/validation-cache", methods=["DELETE"])
+@admin_required
+def flush_validation_cache():
+    """
+    Vacía la caché de validación de este worker (tras recargar el dataset).
+    Para vaciar todos los workers: recarga de gunicorn (kill -HUP al master).
+    """
+    flushed = clear_validation_cache()
+    return jsonify({"msg": "Validation cache flushed", "flushed": flushed}), 200
+
+@admin_bp.route("/player-queries", methods=["GET"])
+@admin_required
+def player_query_stats():
+    """
+    Consultas de jugador en curso y rechazadas (429) en este worker; con
+    asgi.py, las de las rutas asíncronas van en "async".
+    """
+    stats = get_query_governor().stats()
+    if async_db.engines:
+        stats["async"] = get_async_query_governor().stats()
+    return jsonify(stats), 200
+
+@admin_bp.route("/pools", methods=["GET"])
+@admin_required
+def pool_stats():
+    """Conexiones en uso, libres y espera de checkout de cada pool en este worker."""
+    engines = {bind_key or "default": engine for bind_key, engine in db.engines.items()}
+    # Engines asíncronos de asgi.py (async_default, async_mysql, ...)
+    engines.update({
+        f"async_{bind_key or 'default'}": engine.sync_engine
+        for bind_key, engine in async_db.engines.items()
+    })
+    return jsonify(get_pool_stats(engines)), 200
+
+@admin_bp.route("/auth-pool", methods=["GET"])
+@admin_required
+def auth_pool_stats():
+    """Operaciones de bcrypt pendientes y rechazadas (503) en este worker."""
+    return jsonify(password_pool.stats()), 200
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, make_response
-from services.auth_service import login_user, register_user
+from services.auth_service import login_user, register_user, token_claims, refresh_claims
+from services.password_pool import PasswordPoolBusy
 from flask_jwt_extended import (
     create_refresh_token,
     set_access_cookies,
@@ -7,12 +8,19 @@ from flask_jwt_extended import (
     jwt_required,
     unset_jwt_cookies,
     get_jwt_identity,
+    get_jwt,
     create_access_token,
 )
 
 auth_bp = Blueprint("auth_bp", __name__)
 
 
+def _busy_response(e):
+    response = make_response(jsonify({"msg": str(e)}), 503)
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
 @auth_bp.route("/register", methods=["POST"])
 def register():
     try:
@@ -20,8 +28,9 @@ def register():
         new_user = register_user(data)
 
         # Crear tokens para el nuevo usuario
-        access_token = create_access_token(identity=new_user.uuid)
-        refresh_token = create_refresh_token(identity=new_user.uuid)
+        claims = token_claims(new_user)
+        access_token = create_access_token(identity=new_user.uuid, additional_claims=claims)
+        refresh_token = create_refresh_token(identity=new_user.uuid, additional_claims=claims)
 
         response = make_response(
             jsonify({
@@ -38,6 +47,8 @@ def register():
 
         return response, 201
 
+    except PasswordPoolBusy as e:
+        return _busy_response(e)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -67,6 +78,8 @@ def login():
 
         return response, 200
 
+    except PasswordPoolBusy as e:
+        return _busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
@@ -90,7 +103,10 @@ def logout_with_token():
 @jwt_required(refresh=True)
 def refresh():
     current_user = get_jwt_identity()
-    new_token = create_access_token(identity=current_user)
+    new_token = create_access_token(
+        identity=current_user,
+        additional_claims=refresh_claims(get_jwt(), current_user)
+    )
 
     response = make_response(jsonify({
         "msg": "Token refreshed",
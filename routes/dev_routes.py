@@ -0,0 +1,46 @@
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from slow_query_log import slow_query_log
+
+# Rutas de prueba y diagnóstico: solo se registran fuera de producción
+dev_bp = Blueprint("dev_bp", __name__)
+
+
+@dev_bp.route("/test-cors")
+def test_cors():
+    return {
+        "message": "CORS test successful",
+        "origin": request.headers.get("Origin", "No Origin header"),
+        "user_agent": request.headers.get("User-Agent", "No User-Agent"),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+@dev_bp.route("/test-register", methods=["POST"])
+def test_register():
+    origin = request.headers.get("Origin", "No Origin header")
+    return {
+        "message": "This endpoint would create a user (test only)",
+        "origin": origin,
+        "data_received": request.get_json() if request.is_json else "No JSON data",
+        "timestamp": datetime.now().isoformat(),
+        "note": "In production, only https://unravel-sql.vercel.app can access this",
+    }
+
+
+@dev_bp.route("/slow-queries")
+def slow_queries():
+    """Sentencias lentas de este worker, de la más reciente a la más antigua (?limit=, ?bind=)."""
+    limit = request.args.get("limit", type=int)
+    bind = request.args.get("bind")
+    return jsonify({
+        "enabled": slow_query_log.enabled,
+        "thresholdMs": slow_query_log.threshold * 1000,
+        "entries": slow_query_log.entries(limit, bind),
+    })
+
+
+@dev_bp.route("/slow-queries", methods=["DELETE"])
+def clear_slow_queries():
+    slow_query_log.clear()
+    return jsonify({"msg": "Slow query log cleared"})
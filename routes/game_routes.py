@@ -1,8 +1,20 @@
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from services.game_service import execute_sql
 
 game_bp = Blueprint("game", __name__)
 
+def _client_id():
+    """Identidad para el límite por jugador: usuario del JWT si lo hay, si no la IP."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if identity:
+        return f"user:{identity}"
+    return f"ip:{request.remote_addr}"
+
 @game_bp.route("/validate-str", methods=["POST"])
 def validate_str():
     try:
@@ -19,7 +31,7 @@ def validate_str():
             return jsonify({"msg": "Decimal parameter is required", "code": 400}), 400
             
         lstr = lstr.lower()
-        result = execute_sql(lstr, decimal)
+        result = execute_sql(lstr, decimal, _client_id())
         return jsonify(result), result.get('code', 200)
         
     except Exception as e:
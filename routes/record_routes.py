@@ -1,9 +1,124 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from services.record_service import create_record, get_ranking_by_level, get_global_ranking_by_difficulty
+from config import Config
+from services.record_service import (
+    create_record, create_records, get_ranking_by_level, get_global_ranking_by_difficulty,
+    get_leaderboard_version, leaderboard_key
+)
+from services.record_buffer import record_buffer
+from db_routing import mark_primary_write
 
 record_bp = Blueprint('record', __name__)
 
+def _ranking_etag(key):
+    """
+    (etag, versión) de un leaderboard a partir de leaderboard_version.
+    Sin ETag con el backend en memoria, que puede ir por detrás de la base
+    de datos hasta su resync, ni si la versión no se puede leer.
+    """
+    if Config.RANKING_BACKEND == "memory":
+        return None, None
+    version = get_leaderboard_version(key)
+    if version is None:
+        return None, None
+    return f"{leaderboard_key(key)}:{version}", version
+
+def _with_cache_headers(response, etag):
+    # El cliente puede guardar la respuesta pero debe revalidarla siempre
+    response.headers["Cache-Control"] = "private, no-cache"
+    if etag is not None:
+        response.set_etag(etag)
+    return response
+
+def _not_modified(etag):
+    """
+    Respuesta 304 si el If-None-Match del cliente coincide, si no None.
+    Comparación débil: con compresión el ETag que recibe el cliente es W/"...".
+    """
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    return _with_cache_headers(make_response("", 304), etag)
+
+def level_ranking_payload(difficulty, level, ranking):
+    """Cuerpo de /ranking/<difficulty>/<level>/<user_id> (también lo usa asgi.py)."""
+    if ranking['totalPlayers'] == 0:
+        return {
+            "level": level,
+            "difficulty": difficulty,
+            "top5": [],
+            "currentUser": None,
+            "totalPlayers": 0,
+            "message": "No players have completed this level yet"
+        }
+    return ranking
+
+def global_ranking_payload(difficulty, data):
+    """Cuerpo de /global-ranking con el formato del ranking por nivel (también lo usa asgi.py)."""
+    top_formatted = []
+    for item in data.get("top3", []):
+        top_formatted.append({
+            "username": item["username"],
+            "time": item["totalTime"],               
+            "errorCount": item["totalErrors"],       
+            "position": item["rank"],               
+            "isCurrentUser": bool(item["isCurrentUser"])
+        })
+
+    me = data.get("currentUser")
+    current_user_formatted = None
+    if me:
+        current_user_formatted = {
+            "username": me["username"],
+            "time": me["totalTime"],
+            "errorCount": me["totalErrors"],
+            "position": me["rank"],
+            "isCurrentUser": True
+        }
+    
+    return {
+        "currentUser": current_user_formatted,
+        "difficulty": difficulty,
+        "level": None,          
+        "top5": top_formatted,   
+        "totalPlayers": data.get("count", 0)
+    }
+
+def _validate_record_data(data, current_user_uuid):
+    """
+    Valida un record recibido del cliente y convierte sus campos numéricos.
+
+    Returns:
+        None si es válido, o (mensaje de error, código HTTP)
+    """
+    # Validar campos requeridos
+    required_fields = ['time', 'level', 'difficulty', 'errorCount', 'idUser']
+    for field in required_fields:
+        if field not in data:
+            return f"Missing required field: {field}", 400
+    
+    # Validar que el idUser coincida con el usuario autenticado
+    if data['idUser'] != current_user_uuid:
+        return "User ID mismatch", 403
+    
+    # Validar dificultades permitidas
+    valid_difficulties = ['easy', 'medium', 'hard']
+    if data['difficulty'] not in valid_difficulties:
+        return f"Invalid difficulty. Must be one of: {', '.join(valid_difficulties)}", 400
+    
+    # Validar que los valores numéricos sean correctos
+    try:
+        data['time'] = int(data['time'])
+        data['level'] = int(data['level'])
+        data['errorCount'] = int(data['errorCount'])
+    except (ValueError, TypeError):
+        return "time, level, and errorCount must be valid integers", 400
+    
+    # Validar que los valores sean positivos o cero
+    if data['time'] < 0 or data['level'] < 1 or data['errorCount'] < 0:
+        return "time and errorCount must be >= 0, level must be >= 1", 400
+
+    return None
+
 @record_bp.route('/create-record', methods=['POST'])
 @jwt_required()
 def create_new_record():
@@ -19,6 +134,7 @@ def create_new_record():
         
     Returns:
         201: {"message": "Record saved successfully"} si se crea exitosamente
+        202: {"message": "Record accepted"} en modo write-behind
         400: Error en los datos
         403: User ID mismatch
     """
@@ -32,34 +148,16 @@ def create_new_record():
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        # Validar campos requeridos
-        required_fields = ['time', 'level', 'difficulty', 'errorCount', 'idUser']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
+        invalid = _validate_record_data(data, current_user_uuid)
+        if invalid:
+            error, status = invalid
+            return jsonify({"error": error}), status
         
-        # Validar que el idUser coincida con el usuario autenticado
-        if data['idUser'] != current_user_uuid:
-            return jsonify({"error": "User ID mismatch"}), 403
-        
-        # Validar dificultades permitidas
-        valid_difficulties = ['easy', 'medium', 'hard']
-        if data['difficulty'] not in valid_difficulties:
-            return jsonify({
-                "error": f"Invalid difficulty. Must be one of: {', '.join(valid_difficulties)}"
-            }), 400
-        
-        # Validar que los valores numéricos sean correctos
-        try:
-            data['time'] = int(data['time'])
-            data['level'] = int(data['level'])
-            data['errorCount'] = int(data['errorCount'])
-        except (ValueError, TypeError):
-            return jsonify({"error": "time, level, and errorCount must be valid integers"}), 400
-        
-        # Validar que los valores sean positivos o cero
-        if data['time'] < 0 or data['level'] < 1 or data['errorCount'] < 0:
-            return jsonify({"error": "time and errorCount must be >= 0, level must be >= 1"}), 400
+        # Modo write-behind: se escribe en segundo plano; si el buffer está
+        # lleno se guarda de forma síncrona como siempre
+        if record_buffer.enabled and record_buffer.submit(data):
+            mark_primary_write()
+            return jsonify({"message": "Record accepted"}), 202
         
         # Crear el record
         new_record = create_record(data)
@@ -72,6 +170,64 @@ def create_new_record():
     except Exception as e:
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+@record_bp.route('/create-records', methods=['POST'])
+@jwt_required()
+def create_new_records():
+    """
+    Crea varios records del usuario actual en una sola transacción.
+    
+    Body JSON:
+        Lista de records (mismo formato que /create-record), o bien
+        {"records": [...]}. Como máximo RECORD_BATCH_MAX_ITEMS elementos.
+        
+    Returns:
+        201: Al menos un record guardado; estado por elemento en "results"
+        400: Ningún record válido o error en los datos
+    """
+    try:
+        current_user_uuid = get_jwt_identity()
+        
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get('records')
+        
+        if not data or not isinstance(data, list):
+            return jsonify({"error": "No records provided"}), 400
+        if len(data) > Config.RECORD_BATCH_MAX_ITEMS:
+            return jsonify({
+                "error": f"Too many records. Maximum is {Config.RECORD_BATCH_MAX_ITEMS}"
+            }), 400
+        
+        # Validar todos con las mismas reglas que /create-record
+        results = []
+        valid = []
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                results.append({"index": index, "status": 400, "error": "Record must be an object"})
+                continue
+            invalid = _validate_record_data(item, current_user_uuid)
+            if invalid:
+                error, status = invalid
+                results.append({"index": index, "status": status, "error": error})
+                continue
+            results.append({"index": index, "status": 201})
+            valid.append(item)
+        
+        create_records(valid)
+        
+        saved = len(valid)
+        return jsonify({
+            "message": "Records processed",
+            "saved": saved,
+            "failed": len(data) - saved,
+            "results": results
+        }), 201 if saved else 400
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
 @record_bp.route('/ranking/<difficulty>/<int:level>/<user_id>', methods=['GET'])
 @jwt_required()
 def get_level_ranking(difficulty, level, user_id):
@@ -100,23 +256,19 @@ def get_level_ranking(difficulty, level, user_id):
         if level < 1:
             return jsonify({"error": "Level must be >= 1"}), 400
         
+        # 304 antes de cualquier consulta de ranking si no cambió
+        etag, version = _ranking_etag(("level", difficulty, level))
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        
         # Obtener el ranking con el user_id especificado
-        ranking = get_ranking_by_level(difficulty, level, user_id)
+        ranking = get_ranking_by_level(difficulty, level, user_id, version)
         
         if not ranking:
             return jsonify({"error": "No ranking data available for this level"}), 404
         
-        if ranking['totalPlayers'] == 0:
-            return jsonify({
-                "level": level,
-                "difficulty": difficulty,
-                "top5": [],
-                "currentUser": None,
-                "totalPlayers": 0,
-                "message": "No players have completed this level yet"
-            }), 200
-        
-        return jsonify(ranking), 200
+        return _with_cache_headers(jsonify(level_ranking_payload(difficulty, level, ranking)), etag), 200
         
     except Exception as e:
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
@@ -143,37 +295,14 @@ def global_ranking():
         if not user_id:
             return jsonify({"error": "Missing 'userId' query param"}), 400
 
-        data = get_global_ranking_by_difficulty(difficulty, user_id)
-
-
-        top_formatted = []
-        for item in data.get("top3", []):
-            top_formatted.append({
-                "username": item["username"],
-                "time": item["totalTime"],               
-                "errorCount": item["totalErrors"],       
-                "position": item["rank"],               
-                "isCurrentUser": bool(item["isCurrentUser"])
-            })
-
-        me = data.get("currentUser")
-        current_user_formatted = None
-        if me:
-            current_user_formatted = {
-                "username": me["username"],
-                "time": me["totalTime"],
-                "errorCount": me["totalErrors"],
-                "position": me["rank"],
-                "isCurrentUser": True
-            }
-        
-        return jsonify({
-            "currentUser": current_user_formatted,
-            "difficulty": difficulty,
-            "level": None,          
-            "top5": top_formatted,   
-            "totalPlayers": data.get("count", 0)
-        }), 200
+        etag, version = _ranking_etag(("global", difficulty))
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+
+        data = get_global_ranking_by_difficulty(difficulty, user_id, version)
+
+        return _with_cache_headers(jsonify(global_ranking_payload(difficulty, data)), etag), 200
 
     except Exception as e:
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
\ No newline at end of file
@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from services.user_service import get_user_by_uuid  # suponiendo que existe
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from services.user_service import get_user_profile
 
 user_bp = Blueprint("user_bp", __name__)
 
@@ -8,7 +8,8 @@ user_bp = Blueprint("user_bp", __name__)
 @jwt_required()
 def me():
     current_user_uuid = get_jwt_identity()
-    user = get_user_by_uuid(current_user_uuid)
+    # Los tokens llevan username y createdAt como claims: sin consulta a la base de datos
+    user = get_user_profile(current_user_uuid, get_jwt())
     if not user:
         return jsonify({"msg": "user not found"}), 404
-    return jsonify(user.to_dict()), 200
+    return jsonify(user), 200
@@ -0,0 +1,146 @@
+"""
+Compara la serialización de respuestas típicas con el proveedor JSON por
+defecto de Flask y con OrjsonProvider, y los bytes que se enviarían sin
+comprimir, con gzip y con brotli (con los niveles de Config).
+
+    python scripts/bench_json.py --iterations 20000
+
+Las respuestas por debajo de COMPRESSION_MIN_BYTES se envían sin comprimir;
+la columna "sent" muestra lo que recibiría un cliente que acepta br.
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from compression import brotli, compress
+from config import Config
+from json_provider import OrjsonProvider
+
+
+def level_ranking_payload():
+    top = [
+        {
+            "position": position,
+            "username": f"player_{position:04d}",
+            "time": 40 + position * 3,
+            "errorCount": position % 4,
+            "isCurrentUser": position == 3,
+        }
+        for position in range(1, 6)
+    ]
+    return {
+        "level": 2,
+        "difficulty": "medium",
+        "top5": top,
+        "currentUser": dict(top[2]),
+        "totalPlayers": 18234,
+    }
+
+
+def global_ranking_payload():
+    top = [
+        {
+            "username": f"player_{position:04d}",
+            "time": 400 + position * 17,
+            "errorCount": position * 2,
+            "position": position,
+            "isCurrentUser": False,
+        }
+        for position in range(1, 4)
+    ]
+    return {
+        "currentUser": {
+            "username": "player_0812",
+            "time": 1890,
+            "errorCount": 31,
+            "position": 812,
+            "isCurrentUser": True,
+        },
+        "difficulty": "hard",
+        "level": None,
+        "top5": top,
+        "totalPlayers": 5120,
+    }
+
+
+def batch_payload(items):
+    results = []
+    for index in range(items):
+        if index % 10 == 9:
+            results.append({"index": index, "status": 400, "error": "time, level, and errorCount must be valid integers"})
+        else:
+            results.append({"index": index, "status": 201})
+    failed = sum(1 for item in results if item["status"] != 201)
+    return {
+        "message": "Records processed",
+        "saved": items - failed,
+        "failed": failed,
+        "results": results,
+    }
+
+
+def profile_payload():
+    return {
+        "uuid": str(uuid.uuid4()),
+        "username": "player_0812",
+        "createdAt": "2025-03-14T09:26:53",
+    }
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--batch-items", type=int, default=Config.RECORD_BATCH_MAX_ITEMS)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    stdlib_provider = DefaultJSONProvider(app)
+    orjson_provider = OrjsonProvider(app)
+
+    payloads = [
+        ("level ranking", level_ranking_payload()),
+        ("global ranking", global_ranking_payload()),
+        ("user profile", profile_payload()),
+        (f"batch x{args.batch_items}", batch_payload(args.batch_items)),
+    ]
+
+    print(f"iterations: {args.iterations}, min bytes to compress: {Config.COMPRESSION_MIN_BYTES}, "
+          f"gzip level {Config.COMPRESSION_GZIP_LEVEL}, brotli quality {Config.COMPRESSION_BROTLI_QUALITY}"
+          f"{'' if brotli is not None else ' (Brotli not installed)'}")
+    print(f"{'payload':<16} {'stdlib us':>10} {'orjson us':>10} {'speedup':>8} "
+          f"{'raw B':>7} {'gzip B':>7} {'br B':>7} {'sent B':>7}")
+
+    with app.app_context():
+        for name, payload in payloads:
+            stdlib_time = time_per_call(lambda: stdlib_provider.response(payload), args.iterations)
+            orjson_time = time_per_call(lambda: orjson_provider.response(payload), args.iterations)
+
+            body = orjson_provider.response(payload).get_data()
+            gzip_size = len(gzip.compress(body, compresslevel=Config.COMPRESSION_GZIP_LEVEL, mtime=0))
+            br_size = len(compress(body, "br")) if brotli is not None else None
+            if len(body) < Config.COMPRESSION_MIN_BYTES:
+                sent = len(body)
+            else:
+                sent = br_size if br_size is not None else gzip_size
+
+            print(f"{name:<16} {stdlib_time * 1e6:>10.1f} {orjson_time * 1e6:>10.1f} "
+                  f"{stdlib_time / orjson_time:>7.1f}x {len(body):>7} {gzip_size:>7} "
+                  f"{br_size if br_size is not None else '-':>7} {sent:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Mide la latencia de /api/auth/login con varios clientes concurrentes y
+reporta p50/p99, peticiones por segundo y códigos de respuesta (los 503 son
+rechazos del pool de bcrypt).
+
+Contra un servidor en marcha (el usuario se registra si no existe):
+
+    python scripts/bench_login.py --url http://localhost:5000 --concurrency 32 --requests 500
+
+Sin --url se usa la app en proceso con un SQLite temporal:
+
+    BCRYPT_ROUNDS=10 python scripts/bench_login.py --concurrency 16
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    # Rango más cercano
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def http_client(url):
+    import requests
+
+    session_local = threading.local()
+
+    def post(path, payload):
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        response = session.post(url.rstrip("/") + path, json=payload, timeout=60)
+        return response.status_code
+
+    return post
+
+
+def local_client():
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_login.db")
+    os.environ.setdefault("DB_POOL_WARM", "false")
+    from app import create_app
+    from db import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all(bind_key=None)
+
+    def post(path, payload):
+        with app.test_client() as client:
+            return client.post(path, json=payload).status_code
+
+    return post
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="servidor a medir; sin él, app en proceso")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--username", default="bench_login_user")
+    parser.add_argument("--password", default="bench-password")
+    args = parser.parse_args()
+
+    post = http_client(args.url) if args.url else local_client()
+    credentials = {"username": args.username, "password": args.password}
+    post("/api/auth/register", credentials)
+
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    remaining = iter(range(args.requests))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            status = post("/api/auth/login", credentials)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    print(f"requests:    {len(latencies)} in {wall:.2f}s ({len(latencies) / wall:.1f} req/s), concurrency {args.concurrency}")
+    print(f"status:      {dict(sorted(statuses.items()))}")
+    print(f"p50:         {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"p99:         {percentile(latencies, 99) * 1000:.1f} ms")
+    print(f"mean:        {statistics.mean(latencies) * 1000:.1f} ms" if latencies else "mean:        -")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Mide el arranque en frío de la app (import de app.py + create_app) en
+intérpretes nuevos y falla si pasa del presupuesto o si en producción se
+cargan módulos que solo hacen falta en desarrollo o en el CLI.
+
+    python scripts/bench_startup.py --runs 7 --budget-ms 900
+    python scripts/bench_startup.py --env development --top 20
+
+Cada ejecución es un proceso aparte (mediana de --runs). El desglose por
+módulo sale de `python -X importtime -c "import app"`. Sale con código 1 si
+se supera el presupuesto, para usarlo en CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Presupuesto por defecto (mediana de import + create_app en producción)
+DEFAULT_BUDGET_MS = 800
+
+# No deben importarse al arrancar en producción: Swagger (flask-restx,
+# jsonschema), migraciones (alembic, solo con `flask db`) y los engines
+# asíncronos (solo asgi.py)
+PRODUCTION_FORBIDDEN = (
+    "api_docs.docs_bp",
+    "routes.dev_routes",
+    "flask_restx",
+    "jsonschema",
+    "flask_migrate",
+    "alembic",
+    "sqlalchemy.ext.asyncio",
+)
+
+STARTUP_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_ms": (created - imported) * 1000,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def child_env(flask_env):
+    env = dict(os.environ, FLASK_ENV=flask_env, DB_POOL_WARM="false")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def measure_startup(env):
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_CODE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_imports(env):
+    """Tiempo acumulado (us) de cada import directo de app.py, según -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    direct = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Tras '|' va un espacio más dos por nivel: 3 = import directo de app.py
+        if len(name) - len(name.lstrip()) == 3:
+            direct.append((int(cumulative), name.strip()))
+        elif name.strip() == "app":
+            # app es la última línea de su árbol: todo lo anterior es suyo
+            return int(cumulative), sorted(direct, reverse=True)
+        elif len(name) - len(name.lstrip()) == 1:
+            direct = []
+    raise RuntimeError("app not found in -X importtime output")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--env", default="production", help="FLASK_ENV de la app medida")
+    parser.add_argument("--top", type=int, default=10, help="imports directos de app.py más lentos")
+    args = parser.parse_args()
+
+    env = child_env(args.env)
+    # Una ejecución previa para compilar los .pyc (no cuenta)
+    measure_startup(env)
+    runs = [measure_startup(env) for _ in range(args.runs)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    create_ms = statistics.median(run["create_ms"] for run in runs)
+    total_ms = statistics.median(run["import_ms"] + run["create_ms"] for run in runs)
+
+    app_us, direct = measure_imports(env)
+    print(f"FLASK_ENV={args.env}, {args.runs} runs, modules loaded: {len(runs[-1]['modules'])}")
+    print(f"import app: {import_ms:.0f} ms (importtime {app_us / 1000:.0f} ms), "
+          f"create_app: {create_ms:.0f} ms, total: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"{'cumulative ms':>14}  direct import of app.py")
+    for cumulative, name in direct[:args.top]:
+        print(f"{cumulative / 1000:>14.1f}  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"startup {total_ms:.0f} ms over budget {args.budget_ms:.0f} ms")
+    if args.env == "production":
+        loaded = set(runs[-1]["modules"])
+        unexpected = [name for name in PRODUCTION_FORBIDDEN if name in loaded]
+        if unexpected:
+            failures.append(f"loaded in production: {', '.join(unexpected)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
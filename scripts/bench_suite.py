@@ -0,0 +1,439 @@
+"""
+Suite de benchmarks sin servicios externos: crea la app con bases locales
+para los dos binds, siembra usuarios y records sintéticos a la escala pedida
+y mide login, create-record, ranking por nivel, ranking global y
+validate-str (req/s y p50/p95/p99). El resultado es JSON para comparar
+ejecuciones en el tiempo.
+
+    python scripts/bench_suite.py --scale 100k --output results/100k.json
+    python scripts/bench_suite.py --scale 100k --compare results/100k.json
+
+Por defecto los dos binds son SQLite en --workdir (temporal si no se da).
+Con servidores locales (sin contenedores):
+
+    python scripts/bench_suite.py --scale 10m --workdir /var/tmp/bench \\
+        --database-url postgresql://postgres@127.0.0.1:5432/unravel_bench \\
+        --mysql-url mysql+pymysql://root@127.0.0.1/unravel_game
+
+La siembra es determinista (--seed) y solo se hace si la tabla user está
+vacía; --reseed borra las tablas de la app del bind por defecto y vuelve a
+sembrar, así que no lo uses contra una base con datos reales. En el bind
+mysql se crea la tabla `complaints` (dataset sintético del juego) si no
+existe. El resto de la configuración sale del entorno (BCRYPT_ROUNDS,
+RANKING_BACKEND, RECORD_WRITE_BEHIND, GAME_SQL_BACKEND...) y se guarda en
+el JSON junto con los resultados.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# Escalas predefinidas: intentos (records) y usuarios que los generan
+SCALES = {
+    "1k": {"users": 200, "records": 1_000},
+    "100k": {"users": 10_000, "records": 100_000},
+    "10m": {"users": 500_000, "records": 10_000_000},
+}
+
+SCENARIOS = ("login", "level-ranking", "global-ranking", "validate-str", "create-record")
+DIFFICULTIES = ("easy", "medium", "hard")
+BOROUGHS = ("BROOKLYN", "QUEENS", "MANHATTAN", "BRONX", "STATEN ISLAND")
+OFFENSES = ("PETIT LARCENY", "GRAND LARCENY", "HARASSMENT", "ASSAULT 3", "ROBBERY", "BURGLARY", "FELONY ASSAULT")
+
+# Consultas de jugador de validate-str ({n} cambia en cada petición para no
+# medir solo la caché de validación) y el nivel con el que se envían. Ningún
+# nivel es de los que execute_sql resuelve con expresiones regulares (1.1,
+# 1.2, 1.3, 2.1): todas se ejecutan en el bind mysql y, con los ids 1..N de
+# complaints, cumplen la regla de su nivel (200)
+VALIDATION_QUERIES = (
+    ("select * from complaints where id >= {n} and boro is not null", 2.2),
+    ("select boro, count(*) as total from complaints where id >= {n} group by boro order by total desc", 2.2),
+    ("select * from complaints where id >= {n} order by cmplnt_date desc", 2.3),
+    ("select * from complaints where id = {n}", 3.2),
+    ("select * from complaints where id in ({n}, {n} + 1)", 4.2),
+)
+
+# Códigos esperados por escenario: el resto se cuentan como "unexpected"
+EXPECTED_STATUS = {
+    "validate-str": {200},
+}
+
+SEED_BATCH_SIZE = 10_000
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    # Rango más cercano
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def configure_environment(args):
+    """Variables que Config lee al importarse: hay que fijarlas antes de importar la app."""
+    workdir = args.workdir or tempfile.mkdtemp(prefix="bench_suite_")
+    os.makedirs(workdir, exist_ok=True)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    os.environ["MYSQL_DATABASE_URL"] = args.mysql_url or f"sqlite:///{os.path.join(workdir, 'game.db')}"
+    os.environ["FLASK_ENV"] = "production"
+    os.environ.setdefault("DB_POOL_WARM", "false")
+    return workdir
+
+
+def seeded_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def seed_app_data(db, args, rng, log):
+    """Usuarios y records sintéticos en el bind por defecto; record_best y totales con el backfill."""
+    from sqlalchemy import func, insert, select
+    from models.user import User
+    from models.record import Record
+    from services.auth_service import _hashpw
+    from services.record_service import rebuild_record_best
+    from config import Config
+
+    if args.reseed:
+        db.drop_all(bind_key=None)
+    db.create_all(bind_key=None)
+    if db.session.scalar(select(func.count()).select_from(User)):
+        log("default bind already seeded, reusing it (--reseed to rebuild)")
+        return False
+
+    # Un solo hash para todos: sembrar no cuesta un bcrypt por usuario
+    password_hash = _hashpw(args.password, Config.BCRYPT_ROUNDS)
+    created = datetime(2025, 1, 1)
+    user_ids = []
+    for start in range(0, args.users, SEED_BATCH_SIZE):
+        batch = []
+        for index in range(start, min(start + SEED_BATCH_SIZE, args.users)):
+            user_id = seeded_uuid(rng)
+            user_ids.append(user_id)
+            batch.append({
+                "uuid": user_id,
+                "username": f"bench_{index:07d}",
+                "password": password_hash,
+                "createdAt": created + timedelta(seconds=index),
+            })
+        db.session.execute(insert(User), batch)
+        db.session.commit()
+    log(f"seeded {args.users} users")
+
+    # Unos pocos jugadores acumulan muchos intentos (como en el juego real)
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(user_ids))]
+    for start in range(0, args.records, SEED_BATCH_SIZE):
+        count = min(SEED_BATCH_SIZE, args.records - start)
+        players = rng.choices(user_ids, weights=weights, k=count)
+        batch = [{
+            "uuid": seeded_uuid(rng),
+            "time": rng.randint(20, 900),
+            "level": rng.randint(1, args.levels),
+            "difficulty": rng.choice(DIFFICULTIES),
+            "errorCount": rng.randint(0, 12),
+            "createdAt": created + timedelta(seconds=start + offset),
+            "idUser": player,
+        } for offset, player in enumerate(players)]
+        db.session.execute(insert(Record), batch)
+        db.session.commit()
+        if (start // SEED_BATCH_SIZE) % 50 == 49:
+            log(f"seeded {start + count}/{args.records} records")
+    log(f"seeded {args.records} records")
+
+    bests = rebuild_record_best()
+    log(f"record_best rebuilt: {bests} rows")
+    return True
+
+
+def seed_game_data(db, args, rng, log):
+    """Tabla `complaints` del bind mysql (dataset sintético para validate-str)."""
+    from sqlalchemy import Column, Date, Integer, MetaData, Numeric, String, Table, func, insert, select
+
+    metadata = MetaData()
+    complaints = Table(
+        "complaints", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("boro", String(20)),
+        Column("ofns_desc", String(100)),
+        Column("cmplnt_date", Date),
+        Column("amount", Numeric(10, 2)),
+    )
+    engine = db.engines["mysql"]
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        if connection.scalar(select(func.count()).select_from(complaints)):
+            log("mysql bind already has complaints, reusing it")
+            return
+        start_date = datetime(2020, 1, 1).date()
+        for start in range(0, args.game_rows, SEED_BATCH_SIZE):
+            connection.execute(insert(complaints), [{
+                "id": index + 1,
+                "boro": rng.choice(BOROUGHS),
+                "ofns_desc": rng.choice(OFFENSES),
+                "cmplnt_date": start_date + timedelta(days=rng.randint(0, 1500)),
+                "amount": round(rng.uniform(0, 5000), 2),
+            } for index in range(start, min(start + SEED_BATCH_SIZE, args.game_rows))])
+    log(f"seeded {args.game_rows} complaints")
+
+
+def active_players(db, args, rng):
+    """Jugadores que hacen las peticiones, con su access token (sin pasar por bcrypt)."""
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import select
+    from models.user import User
+    from services.auth_service import token_claims
+
+    users = db.session.scalars(select(User).order_by(User.username).limit(args.active_users * 4)).all()
+    players = []
+    for user in rng.sample(users, min(args.active_users, len(users))):
+        token = create_access_token(identity=user.uuid, additional_claims=token_claims(user))
+        players.append({"uuid": user.uuid, "username": user.username, "token": token})
+    return players
+
+
+def scenario_requests(args, players):
+    """Escenario -> función que hace una petición con un test client y un rng."""
+    def auth(player):
+        return {"Authorization": f"Bearer {player['token']}"}
+
+    def login(client, rng):
+        player = rng.choice(players)
+        return client.post("/api/auth/login", json={"username": player["username"], "password": args.password})
+
+    def level_ranking(client, rng):
+        player = rng.choice(players)
+        difficulty, level = rng.choice(DIFFICULTIES), rng.randint(1, args.levels)
+        return client.get(f"/api/record/ranking/{difficulty}/{level}/{player['uuid']}", headers=auth(player))
+
+    def global_ranking(client, rng):
+        player = rng.choice(players)
+        return client.get(
+            "/api/record/global-ranking",
+            query_string={"difficulty": rng.choice(DIFFICULTIES), "userId": player["uuid"]},
+            headers=auth(player)
+        )
+
+    def validate_str(client, rng):
+        player = rng.choice(players)
+        query, decimal = rng.choice(VALIDATION_QUERIES)
+        return client.post(
+            "/api/game/validate-str",
+            json={"query": query.format(n=rng.randint(1, max(1, args.game_rows - 1))), "decimal": decimal},
+            headers=auth(player)
+        )
+
+    def create_record(client, rng):
+        player = rng.choice(players)
+        return client.post("/api/record/create-record", json={
+            "time": rng.randint(20, 900),
+            "level": rng.randint(1, args.levels),
+            "difficulty": rng.choice(DIFFICULTIES),
+            "errorCount": rng.randint(0, 12),
+            "idUser": player["uuid"],
+        }, headers=auth(player))
+
+    return {
+        "login": login,
+        "level-ranking": level_ranking,
+        "global-ranking": global_ranking,
+        "validate-str": validate_str,
+        "create-record": create_record,
+    }
+
+
+def run_scenario(app, request, args, seed, expected=None):
+    """
+    Lanza --requests peticiones (más --warmup sin medir) desde --concurrency
+    hilos. Con `expected`, cuenta las respuestas con otro código.
+    """
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    remaining = iter(range(args.warmup + args.requests))
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        client = app.test_client()
+        while True:
+            with lock:
+                number = next(remaining, None)
+            if number is None:
+                return
+            start = time.perf_counter()
+            status = request(client, rng).status_code
+            elapsed = time.perf_counter() - start
+            if number < args.warmup:
+                continue
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=worker, args=(seed * 1000 + index,)) for index in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status >= 500)
+    unexpected = sum(count for status, count in statuses.items() if expected and status not in expected)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "unexpected": unexpected,
+        "status": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else 0.0,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(results, baseline, out):
+    print(f"{'scenario':<15} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  status", file=out)
+    for name, result in results.items():
+        line = (f"{name:<15} {result['throughput_rps']:>9.1f} {result['p50_ms']:>9.2f} "
+                f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}  {result['status']}")
+        previous = (baseline or {}).get(name)
+        if previous:
+            def delta(key):
+                return (result[key] / previous[key] - 1) * 100 if previous[key] else 0.0
+            line += (f"  vs baseline: req/s {delta('throughput_rps'):+.0f}%, "
+                     f"p50 {delta('p50_ms'):+.0f}%, p99 {delta('p99_ms'):+.0f}%")
+        print(line, file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="1k", help="usuarios y records a sembrar")
+    parser.add_argument("--users", type=int, help="sustituye al valor de --scale")
+    parser.add_argument("--records", type=int, help="sustituye al valor de --scale")
+    parser.add_argument("--levels", type=int, default=6, help="niveles por dificultad")
+    parser.add_argument("--game-rows", type=int, default=50_000, help="filas de complaints en el bind mysql")
+    parser.add_argument("--workdir", help="directorio de los SQLite (se reutiliza entre ejecuciones)")
+    parser.add_argument("--database-url", help="bind por defecto (por defecto SQLite en --workdir)")
+    parser.add_argument("--mysql-url", help="bind mysql (por defecto SQLite en --workdir)")
+    parser.add_argument("--reseed", action="store_true", help="borrar y volver a sembrar el bind por defecto")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=300, help="peticiones medidas por escenario")
+    parser.add_argument("--warmup", type=int, default=20, help="peticiones previas sin medir")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--active-users", type=int, default=500, help="jugadores que hacen las peticiones")
+    parser.add_argument("--output", default="-", help="fichero JSON de resultados (- = stdout)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para mostrar diferencias")
+    args = parser.parse_args()
+    args.users = args.users or SCALES[args.scale]["users"]
+    args.records = args.records if args.records is not None else SCALES[args.scale]["records"]
+    scenarios = args.scenarios.split(",")
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    def log(message):
+        print(message, file=sys.stderr, flush=True)
+
+    workdir = configure_environment(args)
+    from app import create_app
+    from config import Config
+    from db import db
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    seed_started = time.perf_counter()
+    with app.app_context():
+        seeded = seed_app_data(db, args, rng, log)
+        seed_game_data(db, args, rng, log)
+        players = active_players(db, args, rng)
+        backends = {"default_bind": db.engines[None].dialect.name, "mysql_bind": db.engines["mysql"].dialect.name}
+    seed_seconds = time.perf_counter() - seed_started
+    if not players:
+        raise SystemExit("no users to run the scenarios with")
+
+    requests = scenario_requests(args, players)
+    results = {}
+    for index, name in enumerate(scenarios):
+        log(f"running {name}...")
+        results[name] = run_scenario(app, requests[name], args, args.seed + index, EXPECTED_STATUS.get(name))
+        if results[name]["unexpected"]:
+            log(f"WARNING: {name} got {results[name]['unexpected']} responses outside "
+                f"{sorted(EXPECTED_STATUS[name])}: {results[name]['status']}")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "setup": {
+            "scale": args.scale,
+            "users": args.users,
+            "records": args.records,
+            "levels": args.levels,
+            "game_rows": args.game_rows,
+            "seed": args.seed,
+            "seeded_now": seeded,
+            "seed_seconds": round(seed_seconds, 2),
+            "workdir": workdir,
+            **backends,
+        },
+        "run": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "active_users": len(players),
+        },
+        "config": {
+            "BCRYPT_ROUNDS": Config.BCRYPT_ROUNDS,
+            "RANKING_BACKEND": Config.RANKING_BACKEND,
+            "RECORD_WRITE_BEHIND": Config.RECORD_WRITE_BEHIND,
+            "GAME_SQL_BACKEND": Config.GAME_SQL_BACKEND,
+            "COMPRESS_RESPONSES": Config.COMPRESS_RESPONSES,
+        },
+        "results": results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f).get("results")
+    print_summary(results, baseline, sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        log(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Prueba de carga de los perfiles de servidor sobre los endpoints de ranking
+y de validación: arranca gunicorn (gunicorn.conf.py) con cada perfil, lanza
+las peticiones con varios clientes concurrentes y reporta req/s, p50/p99 y
+códigos de respuesta por perfil y endpoint.
+
+    python scripts/load_test.py --profiles gthread,gevent,asgi --workers 2 --concurrency 64
+
+El entorno (DATABASE_URL, MYSQL_*, *_CONNECTION_BUDGET...) se pasa tal cual
+al servidor. Contra un servidor ya en marcha:
+
+    python scripts/load_test.py --url http://localhost:5000
+
+La validación manda consultas distintas ("select <n>") para no medir solo
+la caché de validación, y la carga se reparte entre --users cuentas para no
+chocar con el límite de consultas en vuelo por jugador del governor.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import subprocess
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Perfil -> comando (el puerto se añade al arrancar)
+PROFILES = {
+    "gthread": ["gunicorn", "wsgi:app"],
+    "gevent": ["gunicorn", "wsgi:app"],
+    "asgi": ["uvicorn", "asgi:app", "--no-access-log"],
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    # Rango más cercano
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Client:
+    """Conexión HTTP keep-alive (una por cliente concurrente)."""
+
+    def __init__(self, url, timeout=60):
+        parsed = urlparse(url)
+        self.host, self.port, self.timeout = parsed.hostname, parsed.port, timeout
+        self.connection = None
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+
+
+def start_server(profile, port, workers):
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), GUNICORN_ACCESS_LOG="/dev/null")
+    command = list(PROFILES[profile])
+    if profile == "asgi":
+        command += ["--port", str(port), "--workers", str(workers)]
+    else:
+        env["GUNICORN_PROFILE"] = profile
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{profile} server exited with code {process.returncode}")
+        try:
+            Client(url, timeout=1).request("GET", "/")
+            return process, url
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"{profile} server did not start")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def login(url, username, password):
+    client = Client(url)
+    credentials = {"username": username, "password": password}
+    client.request("POST", "/api/auth/register", credentials)
+    status, body = client.request("POST", "/api/auth/login", credentials)
+    if status != 200:
+        raise RuntimeError(f"Login failed ({status}): {body[:200]!r}")
+    body = json.loads(body)
+    return body["access_token"], body["user"]["uuid"]
+
+
+def scenarios(difficulty, level):
+    """Endpoint -> petición (cliente, token, uuid del usuario)."""
+    counter = iter(range(10 ** 9))
+
+    def headers(token):
+        return {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip, br"}
+
+    return {
+        "level-ranking": lambda client, token, user_uuid: client.request(
+            "GET", f"/api/record/ranking/{difficulty}/{level}/{user_uuid}", headers=headers(token)
+        ),
+        "global-ranking": lambda client, token, user_uuid: client.request(
+            "GET", "/api/record/global-ranking?" + urlencode({"difficulty": difficulty, "userId": user_uuid}),
+            headers=headers(token)
+        ),
+        "validate-str": lambda client, token, user_uuid: client.request(
+            "POST", "/api/game/validate-str", {"query": f"select {next(counter)}", "decimal": 1.4},
+            headers(token)
+        ),
+    }
+
+
+def run(url, call, users, total, concurrency):
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    remaining = iter(range(total))
+
+    def worker(token, user_uuid):
+        client = Client(url)
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            start = time.perf_counter()
+            try:
+                status, _ = call(client, token, user_uuid)
+            except (OSError, http.client.HTTPException):
+                status = "conn-error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=worker, args=users[index % len(users)]) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="gthread,gevent", help=f"de {', '.join(PROFILES)}")
+    parser.add_argument("--url", help="servidor ya en marcha (ignora --profiles)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000, help="por endpoint")
+    parser.add_argument("--endpoints", default="level-ranking,global-ranking,validate-str")
+    parser.add_argument("--difficulty", default="easy")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--users", type=int, default=8, help="cuentas entre las que se reparte la carga")
+    parser.add_argument("--username", default="load_test_user", help="prefijo de las cuentas")
+    parser.add_argument("--password", default="load-test-password")
+    args = parser.parse_args()
+
+    targets = [("url", args.url)] if args.url else [(name, None) for name in args.profiles.split(",")]
+    print(f"{'profile':<9} {'endpoint':<15} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}  status")
+    for profile, url in targets:
+        process = None
+        if url is None:
+            process, url = start_server(profile, args.port, args.workers)
+        try:
+            users = [login(url, f"{args.username}_{index}", args.password) for index in range(args.users)]
+            calls = scenarios(args.difficulty, args.level)
+            for endpoint in args.endpoints.split(","):
+                latencies, statuses, wall = run(url, calls[endpoint], users, args.requests, args.concurrency)
+                print(f"{profile:<9} {endpoint:<15} {len(latencies) / wall:>8.1f} "
+                      f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f}  "
+                      f"{dict(sorted(statuses.items(), key=str))}")
+        finally:
+            if process is not None:
+                stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,60 @@
 from models.user import User
 from db import db
+from db_routing import mark_primary_write
+from config import Config
+from services.password_pool import PasswordPool, default_workers
 from datetime import datetime, timezone
 import uuid
 import bcrypt
+from flask import current_app
 from flask_jwt_extended import create_access_token, create_refresh_token
 
+# bcrypt fuera del hilo de la petición, con admisión acotada (503 si está lleno)
+password_pool = PasswordPool(
+    max_workers=Config.AUTH_HASH_WORKERS or default_workers(),
+    max_queue=Config.AUTH_HASH_MAX_QUEUE,
+    retry_after=Config.AUTH_RETRY_AFTER_SECONDS
+)
+
+def _hashpw(plain_pwd: str, rounds: int) -> str:
+    return bcrypt.hashpw(plain_pwd.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+def _checkpw(plain_pwd: str, hashed_pwd: str) -> bool:
+    return bcrypt.checkpw(plain_pwd.encode('utf-8'), hashed_pwd.encode('utf-8'))
+
 def hash_password(plain_pwd: str) -> str:
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(plain_pwd.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    return password_pool.run(_hashpw, plain_pwd, Config.BCRYPT_ROUNDS)
 
 def check_password(plain_pwd: str, hashed_pwd: str) -> bool:
-    return bcrypt.checkpw(plain_pwd.encode('utf-8'), hashed_pwd.encode('utf-8'))
+    return password_pool.run(_checkpw, plain_pwd, hashed_pwd)
+
+def token_claims(user) -> dict:
+    """
+    Campos de /api/users/me que no cambian tras el registro; van como claims
+    adicionales en los JWT para que /me no consulte la base de datos.
+    """
+    return {
+        "username": user.username,
+        "createdAt": user.createdAt.isoformat()
+    }
+
+def refresh_claims(jwt_data: dict, user_uuid: str) -> dict:
+    """Claims para el access token renovado: los del refresh token o, en tokens antiguos, del perfil."""
+    if jwt_data.get("username") and jwt_data.get("createdAt"):
+        return {"username": jwt_data["username"], "createdAt": jwt_data["createdAt"]}
+    from services.user_service import get_user_profile
+
+    profile = get_user_profile(user_uuid)
+    if profile is None:
+        return {}
+    return {"username": profile["username"], "createdAt": profile["createdAt"]}
+
+def needs_rehash(hashed_pwd: str) -> bool:
+    """True si el hash se generó con un coste distinto de BCRYPT_ROUNDS ($2b$<coste>$...)."""
+    try:
+        return int(hashed_pwd.split('$')[2]) != Config.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
 
 def register_user(data):
     username = data.get("username")
@@ -31,6 +74,7 @@ def register_user(data):
     )
     db.session.add(new_user)
     db.session.commit()
+    mark_primary_write()
     return new_user
 
 def login_user(data):
@@ -43,9 +87,19 @@ def login_user(data):
     if not user or not check_password(password, user.password):
         return None
 
+    # Con la contraseña en claro a mano, actualizar el hash si cambió el coste
+    if needs_rehash(user.password):
+        try:
+            user.password = hash_password(password)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Could not rehash password for {user.uuid}: {str(e)}")
+
     # Crear ambos tokens
-    access_token = create_access_token(identity=user.uuid)
-    refresh_token = create_refresh_token(identity=user.uuid)
+    claims = token_claims(user)
+    access_token = create_access_token(identity=user.uuid, additional_claims=claims)
+    refresh_token = create_refresh_token(identity=user.uuid, additional_claims=claims)
     
     return {
         "access_token": access_token,
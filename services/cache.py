@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight:
+    """Recomputación en curso de una clave; los demás hilos esperan su resultado."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.stale = False
+        # (loop, future) de las corrutinas que esperan (get_or_compute_async)
+        self.waiters = []
+
+    def finish(self):
+        # Se llama con el lock de la caché tomado
+        self.done.set()
+        for loop, future in self.waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+        self.waiters.clear()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class TTLCache:
+    """
+    Caché en proceso acotada (LRU) con expiración opcional por entrada.
+
+    get_or_compute hace "single-flight": si varios hilos fallan la misma clave
+    a la vez, solo uno ejecuta `compute` y el resto espera y reutiliza el
+    resultado. Si la clave se invalida mientras se recalcula, el valor se
+    devuelve a quien lo pidió pero no se guarda.
+
+    Cada worker de gunicorn tiene su propia instancia; el TTL acota cuánto
+    tarda en verse un cambio hecho desde otro worker.
+    """
+
+    def __init__(self, max_entries=128, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._invalidated = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key):
+        # Se llama con el lock tomado
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key, value):
+        # Se llama con el lock tomado
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                    return value
+                flight = self._flights.get(key)
+                if flight is None:
+                    self.misses += 1
+                    flight = self._flights[key] = _Flight()
+                    leader = True
+                else:
+                    leader = False
+
+            if not leader:
+                # Otro hilo ya está recalculando: esperar y volver a mirar.
+                # Si el líder falló o su valor quedó invalidado, uno de los
+                # que esperan pasa a ser el nuevo líder.
+                flight.done.wait()
+                continue
+
+            try:
+                value = compute()
+                with self._lock:
+                    if not flight.stale:
+                        self._store(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+                    flight.finish()
+
+    async def get_or_compute_async(self, key, compute):
+        """
+        get_or_compute para asgi.py: `compute` devuelve una corrutina y quien
+        espera a otro cálculo de la misma clave (hilo o corrutina) cede el
+        event loop en lugar de bloquearlo.
+        """
+        while True:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                    return value
+                flight = self._flights.get(key)
+                if flight is None:
+                    self.misses += 1
+                    flight = self._flights[key] = _Flight()
+                    leader = True
+                else:
+                    leader = False
+                    loop = asyncio.get_running_loop()
+                    future = loop.create_future()
+                    flight.waiters.append((loop, future))
+
+            if not leader:
+                await future
+                continue
+
+            try:
+                value = await compute()
+                with self._lock:
+                    if not flight.stale:
+                        self._store(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+                    flight.finish()
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._invalidated[key] = time.monotonic()
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_entries:
+                self._invalidated.popitem(last=False)
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.stale = True
+
+    def invalidated_within(self, key, seconds):
+        """True si la clave se invalidó hace menos de `seconds` segundos."""
+        with self._lock:
+            invalidated_at = self._invalidated.get(key)
+        return invalidated_at is not None and time.monotonic() - invalidated_at < seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for flight in self._flights.values():
+                flight.stale = True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,345 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+import sqlparse
+from sqlparse import tokens as T
+from sqlalchemy import MetaData, String, create_engine, event, select
+from sqlalchemy.pool import QueuePool, StaticPool
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo worker en desarrollo)
+    fcntl = None
+
+# Filas por lote al copiar el dataset desde MySQL
+COPY_CHUNK_SIZE = 5000
+# Tras un fallo de carga no se reintenta hasta pasado este tiempo
+LOAD_RETRY_SECONDS = 60
+
+
+def _to_datetime(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    text_value = str(value).strip().replace("T", " ")
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text_value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _date_part(part):
+    def fn(value):
+        parsed = _to_datetime(value)
+        return None if parsed is None else getattr(parsed, part)
+    return fn
+
+
+_MYSQL_DATE_FORMAT = {
+    "%Y": "%Y", "%y": "%y", "%m": "%m", "%c": "%m", "%d": "%d", "%e": "%d",
+    "%H": "%H", "%k": "%H", "%i": "%M", "%s": "%S", "%S": "%S",
+    "%M": "%B", "%b": "%b", "%W": "%A", "%a": "%a", "%T": "%H:%M:%S", "%%": "%",
+}
+
+
+def _date_format(value, fmt):
+    parsed = _to_datetime(value)
+    if parsed is None or fmt is None:
+        return None
+    converted = re.sub(r"%.", lambda m: _MYSQL_DATE_FORMAT.get(m.group(0), m.group(0)), fmt)
+    return parsed.strftime(converted)
+
+
+def _datediff(first, second):
+    a, b = _to_datetime(first), _to_datetime(second)
+    if a is None or b is None:
+        return None
+    return (a.date() - b.date()).days
+
+
+def _concat(*args):
+    if any(arg is None for arg in args):
+        return None
+    return "".join(str(arg) for arg in args)
+
+
+def _concat_ws(separator, *args):
+    if separator is None:
+        return None
+    return str(separator).join(str(arg) for arg in args if arg is not None)
+
+
+def _locate(needle, haystack, start=1):
+    if needle is None or haystack is None:
+        return None
+    return str(haystack).find(str(needle), max(int(start), 1) - 1) + 1
+
+
+def _regexp(pattern, value):
+    if pattern is None or value is None:
+        return None
+    return 1 if re.search(pattern, str(value), re.IGNORECASE) else 0
+
+
+# Funciones de MySQL que usan los niveles y SQLite no trae (nombre, nº args, fn).
+# Los nombres de SQLite se resuelven sin distinguir mayúsculas.
+MYSQL_FUNCTIONS = [
+    ("concat", -1, _concat),
+    ("concat_ws", -1, _concat_ws),
+    ("if", 3, lambda cond, a, b: a if cond else b),
+    ("year", 1, _date_part("year")),
+    ("month", 1, _date_part("month")),
+    ("day", 1, _date_part("day")),
+    ("dayofmonth", 1, _date_part("day")),
+    ("hour", 1, _date_part("hour")),
+    ("minute", 1, _date_part("minute")),
+    ("dayofweek", 1, lambda v: None if _to_datetime(v) is None else (_to_datetime(v).isoweekday() % 7) + 1),
+    ("date_format", 2, _date_format),
+    ("datediff", 2, _datediff),
+    ("now", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    ("curdate", 0, lambda: date.today().isoformat()),
+    ("mysql_left", 2, lambda s, n: None if s is None or n is None else str(s)[:max(int(n), 0)]),
+    ("mysql_right", 2, lambda s, n: None if s is None or n is None else (str(s)[-int(n):] if int(n) > 0 else "")),
+    ("lcase", 1, lambda s: None if s is None else str(s).lower()),
+    ("ucase", 1, lambda s: None if s is None else str(s).upper()),
+    ("locate", -1, _locate),
+    ("truncate", 2, lambda x, d: None if x is None else math.trunc(float(x) * 10 ** int(d)) / 10 ** int(d)),
+    ("regexp", 2, _regexp),
+]
+
+
+# LEFT/RIGHT son palabras reservadas en SQLite (LEFT JOIN): las llamadas se
+# renombran a las funciones registradas
+RENAMED_FUNCTIONS = {"left": "mysql_left", "right": "mysql_right"}
+
+
+def translate_mysql(sql):
+    """Adapta a SQLite la sintaxis de MySQL que no entiende (sin tocar literales)."""
+    tokens = [token for statement in sqlparse.parse(sql) for token in statement.flatten()]
+    parts = []
+    for position, token in enumerate(tokens):
+        value = token.value
+        renamed = RENAMED_FUNCTIONS.get(value.lower())
+        if renamed and token.ttype not in T.Literal and token.ttype not in T.Comment:
+            following = next((t for t in tokens[position + 1:] if not t.is_whitespace), None)
+            if following is not None and following.value == "(":
+                value = renamed
+        parts.append(value)
+    return "".join(parts)
+
+
+def register_mysql_functions(dbapi_connection):
+    for name, num_args, fn in MYSQL_FUNCTIONS:
+        dbapi_connection.create_function(name, num_args, fn, deterministic=name not in ("now", "curdate"))
+
+
+def _sqlite_column_type(column_type):
+    """
+    Tipo genérico equivalente para SQLite. Los textos usan NOCASE porque las
+    colaciones *_ci de MySQL comparan sin distinguir mayúsculas.
+    """
+    try:
+        generic = column_type.as_generic()
+    except NotImplementedError:
+        generic = String()
+    if isinstance(generic, String):
+        return String(length=getattr(generic, "length", None), collation="NOCASE")
+    return generic
+
+
+def _lower_text(row, text_columns):
+    """
+    execute_sql pasa la consulta del jugador a minúsculas y MySQL compara
+    sin distinguir mayúsculas; guardar los textos en minúsculas da el mismo
+    resultado también con funciones (LEFT(boro, 1) = 'q'), donde NOCASE no
+    aplica. Solo se cuentan filas, así que el valor mostrado no importa.
+    """
+    values = dict(row)
+    for name in text_columns:
+        if isinstance(values.get(name), str):
+            values[name] = values[name].lower()
+    return values
+
+
+class GameSandbox:
+    """
+    Copia del dataset del juego en un SQLite local al proceso.
+
+    Se carga una vez por worker desde el bind mysql: las tablas se reflejan,
+    se recrean con tipos genéricos y se copian por lotes. Sin `path` la base
+    vive en memoria (shared cache, una conexión la mantiene viva); con `path`
+    se guarda en un fichero que se abre en solo lectura con mmap, de modo que
+    varios workers comparten las páginas; el primero la construye con
+    `<path>.lock` bloqueado y el resto espera y abre el fichero que deja (en
+    despliegue se puede construir antes con `flask build-game-sandbox`).
+
+    La carga no bloquea peticiones: ensure_loaded la lanza en un hilo y,
+    hasta que termina, devuelve None y las consultas van a MySQL.
+
+    Los textos se guardan en minúsculas (ver _lower_text). Las conexiones de
+    consulta tienen PRAGMA query_only y las funciones de
+    MySQL de MYSQL_FUNCTIONS; lo que SQLite no sepa ejecutar se vuelve a
+    lanzar contra MySQL desde game_service.
+    """
+
+    def __init__(self, path=None, mmap_bytes=0):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self.engine = None
+        self.loaded_at = None
+        self.tables = 0
+        self.rows = 0
+        self._failed_at = None
+        self._keeper = None
+        self._loader = None
+        self._lock = threading.Lock()
+
+    def ready(self):
+        return self.engine is not None
+
+    def ensure_loaded(self, source_engine, logger=None):
+        """
+        Devuelve el engine de la sandbox, o None si todavía no está disponible.
+        La primera llamada lanza la carga en un hilo aparte.
+        """
+        if self.engine is not None:
+            return self.engine
+        if self._failed_at is not None and time.monotonic() - self._failed_at < LOAD_RETRY_SECONDS:
+            return None
+        with self._lock:
+            # Tras un fork el hilo del master no existe en el worker
+            if self.engine is None and (self._loader is None or not self._loader.is_alive()):
+                self._loader = threading.Thread(
+                    target=self._load_in_background, args=(source_engine, logger),
+                    name="game-sandbox-load", daemon=True
+                )
+                self._loader.start()
+        return self.engine
+
+    def _load_in_background(self, source_engine, logger):
+        try:
+            self.load(source_engine)
+            self._failed_at = None
+        except Exception as e:
+            self._failed_at = time.monotonic()
+            if logger is not None:
+                logger.error(f"Could not load SQLite game sandbox: {str(e)}")
+            return
+        if logger is not None:
+            logger.info(f"SQLite game sandbox loaded: {self.tables} tables, {self.rows} rows")
+
+    def load(self, source_engine, rebuild=False):
+        if self.path:
+            # Un solo proceso copia el dataset; los demás esperan al lock y,
+            # al obtenerlo, ya encuentran el fichero
+            with open(f"{self.path}.lock", "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                if rebuild or not os.path.exists(self.path):
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    build = sqlite3.connect(tmp_path, check_same_thread=False)
+                    try:
+                        self._copy(source_engine, build)
+                    finally:
+                        build.close()
+                    os.replace(tmp_path, self.path)
+                else:
+                    self._count_existing()
+            engine = self._file_engine()
+        else:
+            uri = f"file:unravel_game_{os.getpid()}_{id(self)}?mode=memory&cache=shared"
+            keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._copy(source_engine, keeper)
+            keeper.execute("PRAGMA query_only = 1")
+            self._keeper = keeper
+            engine = self._memory_engine(uri)
+
+        old_engine, self.engine = self.engine, engine
+        self.loaded_at = time.monotonic()
+        if old_engine is not None:
+            old_engine.dispose()
+
+    def _copy(self, source_engine, target):
+        target_engine = create_engine("sqlite://", creator=lambda: target, poolclass=StaticPool)
+        source_metadata = MetaData()
+        source_metadata.reflect(bind=source_engine)
+
+        metadata = MetaData()
+        for table in source_metadata.sorted_tables:
+            copy = table.to_metadata(metadata)
+            for column in copy.columns:
+                column.type = _sqlite_column_type(column.type)
+                column.server_default = None
+                column.server_onupdate = None
+        metadata.create_all(target_engine)
+
+        tables = rows = 0
+        with source_engine.connect() as source, target_engine.begin() as destination:
+            for table in source_metadata.sorted_tables:
+                target_table = metadata.tables[table.key]
+                text_columns = [
+                    column.name for column in target_table.columns if isinstance(column.type, String)
+                ]
+                result = source.execution_options(stream_results=True).execute(select(table))
+                while True:
+                    chunk = result.mappings().fetchmany(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    destination.execute(
+                        target_table.insert(), [_lower_text(row, text_columns) for row in chunk]
+                    )
+                    rows += len(chunk)
+                tables += 1
+            destination.exec_driver_sql("ANALYZE")
+        self.tables, self.rows = tables, rows
+
+    def _count_existing(self):
+        with sqlite3.connect(f"file:{self.path}?mode=ro", uri=True) as conn:
+            names = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+            )]
+            self.tables = len(names)
+            self.rows = sum(conn.execute(f'SELECT count(*) FROM "{name}"').fetchone()[0] for name in names)
+
+    def _memory_engine(self, uri):
+        engine = create_engine(
+            "sqlite://",
+            creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False),
+            poolclass=QueuePool
+        )
+        event.listen(engine, "connect", self._on_connect)
+        return engine
+
+    def _file_engine(self):
+        engine = create_engine(
+            "sqlite://",
+            creator=lambda: sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False),
+            poolclass=QueuePool
+        )
+        event.listen(engine, "connect", self._on_connect)
+        return engine
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA query_only = 1")
+        if self.path and self.mmap_bytes:
+            dbapi_connection.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)}")
+        register_mysql_functions(dbapi_connection)
+
+    def stats(self):
+        return {
+            "ready": self.ready(),
+            "path": self.path or ":memory:",
+            "tables": self.tables,
+            "rows": self.rows,
+        }
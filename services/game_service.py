@@ -1,18 +1,58 @@
 import os
+from collections.abc import Hashable
 import re
 from typing import Any, Dict, List, Tuple
 from db import db
+from db_async import async_db
+from config import Config
+from services.cache import TTLCache
+from services.query_governor import QueryGovernor, QueryRejected
+from services.game_sandbox import GameSandbox, translate_mysql
+from flask import current_app
 from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+import sqlite3
+import threading
+import time
+import sqlparse
+from sqlparse import tokens as T
+from sqlparse.keywords import KEYWORDS, KEYWORDS_COMMON, KEYWORDS_MYSQL
 
+# Resultados de validación por (consulta canónica, decimal). El dataset NYPD
+# es de solo lectura, así que el resultado solo cambia si se recarga: en ese
+# caso hay que vaciarla (clear_validation_cache) o reiniciar los workers.
+validation_cache = TTLCache(
+    max_entries=Config.VALIDATION_CACHE_MAX_ENTRIES,
+    ttl=Config.VALIDATION_CACHE_TTL_SECONDS or None
+)
 
-def execute_sql(lstr: str, decimal: float):
+_PLAIN_IDENTIFIER = re.compile(r'^[a-z_][a-z0-9_$]*$')
+
+# ER_QUERY_TIMEOUT: MAX_EXECUTION_TIME superado
+MYSQL_QUERY_TIMEOUT_ERROR = 3024
+
+# Sentencias SQLite entre comprobaciones del límite de tiempo
+SQLITE_PROGRESS_STEPS = 10000
+
+_governor = None
+_governor_lock = threading.Lock()
+_async_governor = None
+
+# Copia local del dataset (GAME_SQL_BACKEND=sqlite); se carga al primer uso
+game_sandbox = GameSandbox(
+    path=Config.GAME_SQLITE_PATH,
+    mmap_bytes=Config.GAME_SQLITE_MMAP_BYTES
+)
+
+
+def execute_sql(lstr: str, decimal: float, client_id: str = None):
     
     lstr = lstr.lower()
-    print(lstr)
+    current_app.logger.debug(f"Player query: {lstr}")
     if(decimal in [1.1, 1.2, 1.3, 2.1]):
         return evaluate_stringQ(lstr, decimal);
     else:
-        return validate_sql_query(lstr, decimal);
+        return validate_sql_query(lstr, decimal, client_id);
 
 def evaluate_stringQ(lstr: str, decimal: float):
     #hay tres casos ['^create database (.*);', '{^show tables from (.*);', '^use (.*);']
@@ -45,50 +85,356 @@ def evaluate_stringQ(lstr: str, decimal: float):
             "code": 400
         }
 
-def validate_sql_query(sql_query: str, decimal: float):
+def _is_keyword(word: str) -> bool:
+    upper = word.upper()
+    return upper in KEYWORDS or upper in KEYWORDS_COMMON or upper in KEYWORDS_MYSQL
+
+def canonicalize_sql(sql_query: str) -> str:
+    """
+    Forma canónica de una consulta para usarla como clave de caché.
+
+    Normaliza mayúsculas de palabras clave, comentarios, espacios, comillas
+    innecesarias en identificadores (`tabla` -> tabla, salvo palabras
+    reservadas) y los ';' finales. Los literales de texto no se tocan.
+
+    Solo se quitan los espacios que no cambian cómo MySQL lee la consulta:
+    junto a comas, paréntesis y comparaciones, pero no entre dos operadores
+    (`a < > 1` no es `a <> 1`) ni antes de '(' (`count (*)` no es `count(*)`).
+    """
+    formatted = sqlparse.format(sql_query, keyword_case='lower', strip_comments=True)
+    parts = []
+    previous = None
+    space = False
+    for statement in sqlparse.parse(formatted):
+        for token in statement.flatten():
+            if token.is_whitespace:
+                space = True
+                continue
+            value = token.value
+            if token.ttype in T.Name and len(value) > 2 and value[0] in '`"' and value[-1] == value[0]:
+                inner = value[1:-1]
+                if _PLAIN_IDENTIFIER.match(inner) and not _is_keyword(inner):
+                    value = inner
+            if space and previous is not None and _keeps_space(previous, token):
+                parts.append(' ')
+            parts.append(value)
+            previous = token
+            space = False
+
+    return ''.join(parts).rstrip(';').strip()
+
+def _is_tight(token) -> bool:
+    return token.ttype in T.Punctuation or token.ttype in T.Operator.Comparison
+
+def _keeps_space(previous, token) -> bool:
+    """Si el espacio entre dos tokens puede cambiar la consulta (ver canonicalize_sql)."""
+    if token.value == '(':
+        return True
+    if previous.ttype in T.Operator and token.ttype in T.Operator:
+        return True
+    return not (_is_tight(previous) or _is_tight(token))
+
+def get_validation_cache_stats():
+    return validation_cache.stats()
+
+def clear_validation_cache():
+    """Vaciar la caché de validación (p. ej. después de recargar el dataset)."""
+    flushed = validation_cache.stats()["entries"]
+    validation_cache.clear()
+    return flushed
+
+def get_query_governor():
+    """
+    Governor de las consultas de jugador. Si PLAYER_QUERY_MAX_CONCURRENT es 0
+    el límite global es el tamaño del pool del bind mysql, para que las
+    validaciones nunca esperen una conexión.
+    """
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                max_concurrent = Config.PLAYER_QUERY_MAX_CONCURRENT
+                if not max_concurrent:
+                    pool_size = getattr(db.get_engine(bind='mysql').pool, 'size', None)
+                    max_concurrent = pool_size() if callable(pool_size) else 5
+                _governor = QueryGovernor(
+                    max_per_user=Config.PLAYER_QUERY_MAX_PER_USER,
+                    max_concurrent=max_concurrent
+                )
+    return _governor
+
+def get_async_query_governor():
+    """
+    Governor de execute_sql_async (asgi.py). Con PLAYER_QUERY_MAX_CONCURRENT
+    a 0 el límite global es lo que admite el pool MySQL asíncrono.
+    """
+    global _async_governor
+    if _async_governor is None:
+        _async_governor = QueryGovernor(
+            max_per_user=Config.PLAYER_QUERY_MAX_PER_USER,
+            max_concurrent=Config.PLAYER_QUERY_MAX_CONCURRENT
+            or Config.ASYNC_MYSQL_POOL_SIZE + Config.ASYNC_MYSQL_MAX_OVERFLOW
+        )
+    return _async_governor
+
+def _validation_key(sql_query: str, decimal: float):
+    """
+    Clave de validation_cache: (consulta canónica, decimal tal como llega).
+    El decimal no se convierte: la regla del nivel compara el valor recibido
+    (3.2 y "3.2" no siguen la misma regla) y uno no numérico también se evalúa.
+    """
+    if not isinstance(decimal, Hashable):
+        decimal = repr(decimal)
     try:
-        # Obtener el engine de MySQL y ejecutar la consulta
-        mysql_engine = db.get_engine(bind='mysql')
-        with mysql_engine.connect() as connection:
-            res = connection.execute(text(sql_query))
-            rows = res.fetchall()
-            row_count = len(rows)
-        
-        if(decimal in [3.2, 3.3, 3.4]):
-            if(row_count == 1):
-                return {
-                    "msg": "success",
-                    "code": 200
-                }
-            else:
-                return {
-                    "msg": "error",
-                    "code": 400
-                }
-        elif(decimal == 4.2):
-            if(row_count == 2):
-                return {
-                    "msg": "success",
-                    "code": 200
-                }
-            else:
-                return {
-                    "msg": "error",
-                    "code": 400
-                }
+        return (canonicalize_sql(sql_query), decimal)
+    except Exception:
+        return (sql_query, decimal)
+
+def validate_sql_query(sql_query: str, decimal: float, client_id: str = None):
+    try:
+        # Solo se cachean ejecuciones correctas; los errores de SQL y los
+        # rechazos del governor no
+        return validation_cache.get_or_compute(
+            _validation_key(sql_query, decimal),
+            lambda: _governed_evaluate(sql_query, decimal, client_id)
+        )
+    except QueryRejected as e:
+        return {
+            "msg": e.msg,
+            "code": e.code
+        }
+    except Exception as e:
+        return {
+            "msg": f"SQL Error: {str(e)}",
+            "code": 400
+        }
+
+def _governed_evaluate(sql_query: str, decimal: float, client_id: str = None):
+    with get_query_governor().slot(client_id or "anonymous"):
+        try:
+            return _evaluate_query(sql_query, decimal)
+        except OperationalError as e:
+            if _is_query_timeout(e):
+                raise _query_timeout()
+            raise
+
+def _is_query_timeout(error: OperationalError) -> bool:
+    """MySQL cortó la consulta por MAX_EXECUTION_TIME."""
+    return bool(error.orig is not None and error.orig.args and error.orig.args[0] == MYSQL_QUERY_TIMEOUT_ERROR)
+
+def _query_timeout():
+    return QueryRejected(
+        f"Query exceeded the time limit of {Config.PLAYER_QUERY_TIMEOUT_MS} ms", 408
+    )
+
+def _begin_player_transaction(connection, limit=None):
+    """
+    Sesión y transacción de solo lectura con límite de tiempo por sentencia.
+    En MySQL con MAX_EXECUTION_TIME (cubre los SELECT) y, con `limit`,
+    sql_select_limit: el servidor envía como mucho `limit` filas (salvo que
+    la consulta traiga su propio LIMIT, acotado igualmente por el tiempo).
+    En la sandbox SQLite la conexión ya es query_only y el límite de tiempo
+    lo pone un progress handler.
+    """
+    if connection.dialect.name == 'sqlite':
+        deadline = time.monotonic() + Config.PLAYER_QUERY_TIMEOUT_MS / 1000.0
+        connection.connection.dbapi_connection.set_progress_handler(
+            lambda: 1 if time.monotonic() > deadline else 0, SQLITE_PROGRESS_STEPS
+        )
+        return
+    if connection.dialect.name != 'mysql':
+        return
+    connection.execute(
+        text("SET SESSION MAX_EXECUTION_TIME = :ms, SESSION transaction_read_only = 1"),
+        {"ms": int(Config.PLAYER_QUERY_TIMEOUT_MS)}
+    )
+    if limit:
+        connection.execute(text("SET SESSION sql_select_limit = :rows"), {"rows": int(limit)})
+    connection.execute(text("START TRANSACTION READ ONLY"))
+
+def _end_player_transaction(connection):
+    """
+    Deshace lo de _begin_player_transaction antes de devolver la conexión al
+    pool: el límite de tiempo y el modo de solo lectura son de sesión y los
+    heredaría el siguiente que use la conexión (copia de la sandbox, EXPLAIN
+    del registro de consultas lentas, get_mysql_connection...).
+    """
+    if connection.dialect.name == 'sqlite':
+        connection.connection.dbapi_connection.set_progress_handler(None, 0)
+        return
+    if connection.dialect.name != 'mysql':
+        return
+    try:
+        connection.rollback()
+        connection.execute(text(
+            "SET SESSION MAX_EXECUTION_TIME = DEFAULT, SESSION transaction_read_only = DEFAULT, "
+            "SESSION sql_select_limit = DEFAULT"
+        ))
+    except Exception:
+        # Sin poder restaurar la sesión, la conexión no vuelve al pool
+        connection.invalidate()
+
+def _count_rows(engine, sql_query: str, limit: int) -> int:
+    """
+    Ejecuta la consulta del jugador y cuenta hasta `limit` filas.
+
+    En MySQL sql_select_limit corta el resultado en el servidor, así un
+    SELECT * sobre una tabla grande no se envía entero: al cerrar, el
+    SSCursor de PyMySQL tiene que leer del socket lo que quede, y solo queda
+    eso. El cursor de servidor (stream_results) evita además cargar en
+    memoria las filas de una consulta con su propio LIMIT grande. En SQLite
+    cerrar el cursor no lee el resto.
+    """
+    with engine.connect() as connection:
+        try:
+            _begin_player_transaction(connection, limit)
+            res = connection.execution_options(stream_results=True).execute(text(sql_query))
+            rows = res.fetchmany(limit)
+            res.close()
+        finally:
+            _end_player_transaction(connection)
+    return len(rows)
+
+def _player_row_count(sql_query: str, limit: int) -> int:
+    """
+    Con GAME_SQL_BACKEND=sqlite la consulta se ejecuta en la sandbox local;
+    si SQLite no la entiende (sintaxis o funciones solo de MySQL) o la
+    sandbox no está cargada, se ejecuta contra el bind mysql.
+    """
+    mysql_engine = db.get_engine(bind='mysql')
+    if Config.GAME_SQL_BACKEND == 'sqlite':
+        sandbox_engine = game_sandbox.ensure_loaded(mysql_engine, current_app.logger)
+        if sandbox_engine is not None:
+            try:
+                return _count_rows(sandbox_engine, translate_mysql(sql_query), limit)
+            except DBAPIError as e:
+                if not isinstance(e.orig, sqlite3.Error):
+                    raise
+                if 'interrupted' in str(e.orig):
+                    raise _query_timeout()
+                current_app.logger.debug(f"SQLite sandbox fallback to MySQL: {str(e.orig)}")
+    return _count_rows(mysql_engine, sql_query, limit)
+
+def _rows_needed(decimal: float) -> int:
+    """
+    Filas que hay que leer como máximo para decidir la regla del nivel:
+    "exactamente 1" necesita 2, "exactamente 2" necesita 3 y "> 0" necesita 1.
+    """
+    if(decimal in [3.2, 3.3, 3.4]):
+        return 2
+    elif(decimal == 4.2):
+        return 3
+    else:
+        return 1
+
+def _evaluate_query(sql_query: str, decimal: float):
+    """Ejecuta la consulta del jugador (hasta _rows_needed filas) y aplica la regla del nivel."""
+    return _level_result(_player_row_count(sql_query, _rows_needed(decimal)), decimal)
+
+def _level_result(row_count: int, decimal: float):
+    """Regla del nivel sobre el número de filas devueltas por la consulta del jugador."""
+    if(decimal in [3.2, 3.3, 3.4]):
+        if(row_count == 1):
+            return {
+                "msg": "success",
+                "code": 200
+            }
         else:
-            if(row_count > 0):
-                return {
-                    "msg": "success",
-                    "code": 200
-                }
-            else:
-                return {
-                    "msg": "error",
-                    "code": 400
-                }
+            return {
+                "msg": "error",
+                "code": 400
+            }
+    elif(decimal == 4.2):
+        if(row_count == 2):
+            return {
+                "msg": "success",
+                "code": 200
+            }
+        else:
+            return {
+                "msg": "error",
+                "code": 400
+            }
+    else:
+        if(row_count > 0):
+            return {
+                "msg": "success",
+                "code": 200
+            }
+        else:
+            return {
+                "msg": "error",
+                "code": 400
+            }
+
+async def execute_sql_async(lstr: str, decimal: float, client_id: str = None):
+    """
+    execute_sql para asgi.py: mismas reglas y misma validation_cache, pero
+    la consulta del jugador va por el engine aiomysql y, mientras MySQL
+    responde, el worker sigue atendiendo otras peticiones.
+    """
+    lstr = lstr.lower()
+    if(decimal in [1.1, 1.2, 1.3, 2.1]):
+        return evaluate_stringQ(lstr, decimal)
+    try:
+        return await validation_cache.get_or_compute_async(
+            _validation_key(lstr, decimal),
+            lambda: _governed_evaluate_async(lstr, decimal, client_id)
+        )
+    except QueryRejected as e:
+        return {
+            "msg": e.msg,
+            "code": e.code
+        }
     except Exception as e:
         return {
             "msg": f"SQL Error: {str(e)}",
             "code": 400
-        }
\ No newline at end of file
+        }
+
+async def _governed_evaluate_async(sql_query: str, decimal: float, client_id: str = None):
+    with get_async_query_governor().slot(client_id or "anonymous"):
+        limit = _rows_needed(decimal)
+        try:
+            if Config.GAME_SQL_BACKEND == 'sqlite':
+                # La sandbox es SQLite local (CPU, no red): en un hilo
+                row_count = await async_db.run_sync(_player_row_count, sql_query, limit)
+            else:
+                row_count = await _count_rows_async(async_db.engines['mysql'], sql_query, limit)
+        except OperationalError as e:
+            if _is_query_timeout(e):
+                raise _query_timeout()
+            raise
+    return _level_result(row_count, decimal)
+
+async def _count_rows_async(engine, sql_query: str, limit: int) -> int:
+    """
+    _count_rows sobre un engine asíncrono (cursor de servidor de aiomysql),
+    con los mismos límites: MAX_EXECUTION_TIME y sql_select_limit en MySQL
+    (al cerrar, aiomysql también lee el resto del resultado) y progress
+    handler en SQLite (aiosqlite).
+    """
+    async with engine.connect() as connection:
+        sqlite_connection = None
+        if connection.dialect.name == 'sqlite':
+            sqlite_connection = (await connection.get_raw_connection()).driver_connection
+            deadline = time.monotonic() + Config.PLAYER_QUERY_TIMEOUT_MS / 1000.0
+            await sqlite_connection.set_progress_handler(
+                lambda: 1 if time.monotonic() > deadline else 0, SQLITE_PROGRESS_STEPS
+            )
+        try:
+            if sqlite_connection is None:
+                await connection.run_sync(_begin_player_transaction, limit)
+            result = await connection.stream(text(sql_query))
+            rows = await result.fetchmany(limit)
+            await result.close()
+        except OperationalError as e:
+            if sqlite_connection is not None and 'interrupted' in str(e.orig):
+                raise _query_timeout()
+            raise
+        finally:
+            if sqlite_connection is not None:
+                await sqlite_connection.set_progress_handler(None, 0)
+            else:
+                await connection.run_sync(_end_player_transaction)
+    return len(rows)
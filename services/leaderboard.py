@@ -0,0 +1,220 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+
+class SortedLeaderboard:
+    """
+    Leaderboard ordenado por puntuación sobre un array con bisect.
+
+    Cada entrada es (score..., user_id): el user_id al final desempata igual
+    que el ROW_NUMBER de las consultas SQL. rank y top son O(log n) / O(k);
+    insertar o mover un jugador es una búsqueda O(log n) más un desplazamiento
+    de memoria del array, que en la práctica es muy barato.
+
+    No es thread-safe por sí solo; LeaderboardEngine serializa el acceso.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._by_user = {}
+
+    def load(self, entries):
+        """Carga masiva desde (user_id, score) sin ordenar."""
+        self._by_user = {user_id: tuple(score) + (user_id,) for user_id, score in entries}
+        self._keys = sorted(self._by_user.values())
+
+    def upsert(self, user_id, score):
+        old = self._by_user.get(user_id)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, old)]
+        key = tuple(score) + (user_id,)
+        self._by_user[user_id] = key
+        insort(self._keys, key)
+
+    def remove(self, user_id):
+        old = self._by_user.pop(user_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, old)]
+
+    def rank(self, user_id):
+        """Posición (1-based) del usuario o None si no está en el leaderboard."""
+        key = self._by_user.get(user_id)
+        if key is None:
+            return None
+        return bisect_left(self._keys, key) + 1
+
+    def score(self, user_id):
+        key = self._by_user.get(user_id)
+        return None if key is None else key[:-1]
+
+    def top(self, n):
+        """Lista de (posición, user_id, score) de los n primeros."""
+        return [
+            (i + 1, key[-1], key[:-1])
+            for i, key in enumerate(self._keys[:n])
+        ]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class LeaderboardEngine:
+    """
+    Leaderboards en memoria por (dificultad, nivel) y globales por dificultad.
+
+    Las claves de los boards son las mismas que usa ranking_cache:
+    ("level", difficulty, level) y ("global", difficulty). Las puntuaciones
+    son (bestTime, minErrors) por nivel y (total_time, total_errors) en el
+    global, donde solo entran los usuarios con al menos `global_min_levels`
+    niveles completados.
+
+    Se carga con `load` (al arrancar y cada `resync_seconds`, para recoger lo
+    escrito por otros workers) y se actualiza en sitio con `apply_best`.
+    """
+
+    def __init__(self, global_min_levels, resync_seconds=None):
+        self.global_min_levels = global_min_levels
+        self.resync_seconds = resync_seconds
+        self.loaded_at = None
+        self._boards = {}
+        self._bests = {}
+        self._usernames = {}
+        self._pending = None
+        self._lock = threading.RLock()
+        self._reloading = threading.Lock()
+
+    def ready(self):
+        return self.loaded_at is not None
+
+    def is_stale(self):
+        if self.loaded_at is None:
+            return True
+        if not self.resync_seconds:
+            return False
+        return time.monotonic() - self.loaded_at >= self.resync_seconds
+
+    def try_begin_reload(self):
+        """
+        Solo un hilo recarga a la vez; el resto sigue sirviendo lo que hay.
+
+        Las marcas aplicadas mientras se lee la base de datos se guardan y se
+        vuelven a aplicar sobre los boards nuevos, para no perderlas.
+        """
+        if not self._reloading.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._pending = []
+        return True
+
+    def end_reload(self):
+        with self._lock:
+            self._pending = None
+        self._reloading.release()
+
+    def load(self, bests, usernames):
+        """
+        Reconstruye todos los boards.
+
+        Args:
+            bests: iterable de (user_id, difficulty, level, best_time, min_errors)
+            usernames: dict user_id -> username
+        """
+        per_user = {}
+        for user_id, difficulty, level, best_time, min_errors in bests:
+            per_user.setdefault(difficulty, {}).setdefault(user_id, {})[level] = (best_time, min_errors)
+
+        boards = {}
+        level_entries = {}
+        for difficulty, users in per_user.items():
+            global_entries = []
+            for user_id, levels in users.items():
+                for level, score in levels.items():
+                    level_entries.setdefault(("level", difficulty, level), []).append((user_id, score))
+                total = self._total(levels)
+                if total is not None:
+                    global_entries.append((user_id, total))
+            board = SortedLeaderboard()
+            board.load(global_entries)
+            boards[("global", difficulty)] = board
+
+        for key, entries in level_entries.items():
+            board = SortedLeaderboard()
+            board.load(entries)
+            boards[key] = board
+
+        with self._lock:
+            self._boards = boards
+            self._bests = per_user
+            self._usernames = dict(usernames)
+            for args in self._pending or []:
+                self._apply(*args)
+            self.loaded_at = time.monotonic()
+
+    def _total(self, levels):
+        if len(levels) < self.global_min_levels:
+            return None
+        return (
+            sum(score[0] for score in levels.values()),
+            sum(score[1] for score in levels.values())
+        )
+
+    def _board(self, key):
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = SortedLeaderboard()
+        return board
+
+    def apply_best(self, user_id, username, difficulty, level, best_time, min_errors):
+        """Aplica una mejor marca nueva (ya confirmada en la base de datos)."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((user_id, username, difficulty, level, best_time, min_errors))
+            self._apply(user_id, username, difficulty, level, best_time, min_errors)
+
+    def _apply(self, user_id, username, difficulty, level, best_time, min_errors):
+        with self._lock:
+            if username is not None:
+                self._usernames[user_id] = username
+            levels = self._bests.setdefault(difficulty, {}).setdefault(user_id, {})
+            # Las marcas reaplicadas tras un load pueden ser peores que las que
+            # la recarga ya trajo de otro worker: tiempo y errores nunca empeoran
+            current = levels.get(level)
+            if current is not None:
+                best_time, min_errors = min(current[0], best_time), min(current[1], min_errors)
+                if (best_time, min_errors) == current:
+                    return
+            levels[level] = (best_time, min_errors)
+            self._board(("level", difficulty, level)).upsert(user_id, (best_time, min_errors))
+
+            total = self._total(levels)
+            if total is not None:
+                self._board(("global", difficulty)).upsert(user_id, total)
+
+    def levels_completed(self, difficulty, user_id):
+        with self._lock:
+            return len(self._bests.get(difficulty, {}).get(user_id, {}))
+
+    def knows_user(self, user_id):
+        with self._lock:
+            return user_id in self._usernames
+
+    def snapshot(self, key, top_n, user_id):
+        """
+        Devuelve (top, mine, total) de un board de una sola vez:
+        top es [(posición, user_id, username, score)], mine es
+        (posición, username, score) o None.
+        """
+        with self._lock:
+            board = self._boards.get(key)
+            if board is None:
+                return [], None, 0
+            top = [
+                (position, uid, self._usernames.get(uid), score)
+                for position, uid, score in board.top(top_n)
+            ]
+            position = board.rank(user_id)
+            mine = None
+            if position is not None:
+                mine = (position, self._usernames.get(user_id), board.score(user_id))
+            return top, mine, len(board)
@@ -0,0 +1,76 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PasswordPoolBusy(Exception):
+    """La cola de bcrypt está llena; el endpoint responde 503 con Retry-After."""
+
+    def __init__(self, retry_after):
+        super().__init__("Authentication service busy, try again shortly")
+        self.retry_after = retry_after
+
+
+class PasswordPool:
+    """
+    Ejecutor acotado para el trabajo de bcrypt (hashpw/checkpw).
+
+    bcrypt suelta el GIL, así que `max_workers` hilos usan hasta ese número
+    de núcleos sin bloquear el resto de peticiones del worker. Como mucho se
+    admiten `max_workers + max_queue` operaciones pendientes; por encima,
+    `run` lanza PasswordPoolBusy en lugar de encolar.
+
+    Con workers gevent, `executor_class` pasa a ser el ThreadPoolExecutor de
+    gevent (hilos del sistema), ver gunicorn.conf.py.
+    """
+
+    executor_class = ThreadPoolExecutor
+
+    def __init__(self, max_workers, max_queue, retry_after=1):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.rejected = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        # Se crea al primer uso (y de nuevo tras un fork)
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self.executor_class(
+                        max_workers=self.max_workers, thread_name_prefix="bcrypt"
+                    )
+        return self._executor
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordPoolBusy(self.retry_after)
+            self._pending += 1
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def reset(self):
+        """Descarta el ejecutor heredado de un fork; el siguiente run crea otro."""
+        self._executor = None
+        self._pending = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "maxWorkers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "rejected": self.rejected,
+            }
+
+
+def default_workers():
+    return max(1, os.cpu_count() or 1)
@@ -0,0 +1,64 @@
+import threading
+from contextlib import contextmanager
+
+
+class QueryRejected(Exception):
+    """Consulta de jugador rechazada por el governor (429) o por tiempo (408)."""
+
+    def __init__(self, msg, code):
+        super().__init__(msg)
+        self.msg = msg
+        self.code = code
+
+
+class QueryGovernor:
+    """
+    Límite de consultas de jugador en curso, por cliente y en total.
+
+    Nada espera en cola: si el cliente ya tiene `max_per_user` consultas
+    ejecutándose o el semáforo global (del tamaño del pool de MySQL) está
+    agotado, `slot` lanza QueryRejected con código 429 al momento.
+    """
+
+    def __init__(self, max_per_user, max_concurrent):
+        self.max_per_user = max_per_user
+        self.max_concurrent = max_concurrent
+        self.rejected = 0
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, client_id):
+        with self._lock:
+            if self._in_flight.get(client_id, 0) >= self.max_per_user:
+                self.rejected += 1
+                raise QueryRejected("Too many queries in progress for this player, try again shortly", 429)
+            self._in_flight[client_id] = self._in_flight.get(client_id, 0) + 1
+
+        try:
+            if not self._semaphore.acquire(blocking=False):
+                with self._lock:
+                    self.rejected += 1
+                raise QueryRejected("Server busy validating queries, try again shortly", 429)
+            try:
+                yield
+            finally:
+                self._semaphore.release()
+        finally:
+            with self._lock:
+                remaining = self._in_flight[client_id] - 1
+                if remaining:
+                    self._in_flight[client_id] = remaining
+                else:
+                    del self._in_flight[client_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "inFlight": sum(self._in_flight.values()),
+                "clients": len(self._in_flight),
+                "maxPerUser": self.max_per_user,
+                "maxConcurrent": self.max_concurrent,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,334 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from sqlalchemy import exc
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo worker en desarrollo)
+    fcntl = None
+
+
+def _is_transient(error):
+    """
+    Fallo de conexión o de pool: se reintenta el lote más tarde. El resto
+    (clave foránea, valor fuera de rango...) no se arregla reintentando.
+    create_records envuelve el error original en un ValueError.
+    """
+    cause = error.__cause__ or error.__context__ or error
+    if isinstance(cause, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError)):
+        return True
+    return bool(getattr(cause, "connection_invalidated", False))
+
+
+def _try_lock(fileobj):
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fileobj.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class RecordWriteBehind:
+    """
+    Buffer write-behind para la ingesta de records.
+
+    create-record encola el record ya validado y responde 202; un hilo en
+    segundo plano lo escribe en lotes con create_records cuando hay
+    `batch_size` records pendientes o pasan `flush_interval` segundos.
+
+    Con `journal_path`, cada record aceptado se añade antes a un journal local
+    (un fichero por worker, `<journal_path>.<pid>.log`). Al vaciar la cola el
+    journal se rota a `.flushing` y se borra cuando el lote está en la base de
+    datos. Al arrancar se reproducen los journals que ningún proceso vivo
+    tiene bloqueados; como cada record lleva su uuid desde que se acepta, la
+    reproducción es idempotente. Los journals huérfanos se reproducen al
+    arrancar cada worker (también tras un fork con preload_app).
+
+    Si la base de datos rechaza un lote por algo que no es transitorio, se
+    escribe record a record y los que fallan van al log y, con journal, a
+    `<journal_path>-deadletter.log`, para que un record inválido no bloquee
+    el resto. Los fallos de conexión reintentan el lote entero.
+
+    Los records encolados no aparecen en los rankings hasta que se escriben.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self.max_size = 0
+        self.batch_size = 0
+        self.flush_interval = 1.0
+        self.journal_path = None
+        self.journal_fsync = True
+        self._queue = deque()
+        self._failed = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._thread = None
+        self._journal = None
+        self._journal_seq = 0
+
+    def init_app(self, app, max_size, batch_size, flush_interval, journal_path=None, journal_fsync=True):
+        self.app = app
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.journal_fsync = journal_fsync
+        self.enabled = True
+
+        if self.journal_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+            self.replay_journals()
+            self._open_journal()
+
+        self.start()
+        atexit.register(self.stop)
+
+    def start(self):
+        """Arranca el hilo de escritura (también tras un fork del worker)."""
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="record-write-behind", daemon=True)
+        self._thread.start()
+
+    def after_fork(self):
+        """
+        En un worker creado por fork desde un master que ya cargó la app
+        (preload_app): lock, journal (por pid) e hilo de escritura propios.
+        El journal del master sigue siendo suyo.
+        """
+        if not self.enabled:
+            return
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue.clear()
+        self._failed = []
+        self._journal = None
+        if self.journal_path:
+            # Journals de workers caídos desde que el master cargó la app
+            self.replay_journals()
+            self._open_journal()
+        self.start()
+
+    # -- aceptación ---------------------------------------------------------
+
+    def submit(self, data):
+        """
+        Encola un record validado. Devuelve False si el buffer está lleno, en
+        cuyo caso el llamador debe escribirlo de forma síncrona.
+        """
+        record = {
+            "uuid": str(uuid.uuid4()),
+            "time": data['time'],
+            "level": data['level'],
+            "difficulty": data['difficulty'],
+            "errorCount": data['errorCount'],
+            "idUser": data['idUser'],
+            "createdAt": datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            pending = len(self._queue) + sum(len(batch) for batch, _ in self._failed)
+            if pending >= self.max_size:
+                return False
+            if self._journal is not None:
+                self._journal.write(json.dumps(record) + "\n")
+                self._journal.flush()
+                if self.journal_fsync:
+                    os.fsync(self._journal.fileno())
+            self._queue.append(record)
+            if len(self._queue) >= self.batch_size:
+                self._wakeup.notify()
+        return True
+
+    # -- journal ------------------------------------------------------------
+
+    def _journal_file(self):
+        return f"{self.journal_path}.{os.getpid()}.log"
+
+    def _open_journal(self):
+        # Se llama con el lock tomado (o antes de arrancar el hilo)
+        self._journal = open(self._journal_file(), "a", encoding="utf-8")
+        _try_lock(self._journal)
+
+    def _rotate_journal(self):
+        """
+        Aparta el journal actual para el lote que se va a escribir y abre otro.
+        Devuelve (fichero, ruta) del journal apartado, o None sin journal.
+        """
+        # Se llama con el lock tomado
+        if self._journal is None:
+            return None
+        self._journal_seq += 1
+        flushing_path = f"{self.journal_path}.{os.getpid()}.{self._journal_seq}.flushing"
+        os.replace(self._journal_file(), flushing_path)
+        # El descriptor sigue abierto (y bloqueado) hasta que el lote se escriba
+        flushing = (self._journal, flushing_path)
+        self._open_journal()
+        return flushing
+
+    def replay_journals(self):
+        """Escribe los records de journals huérfanos (de workers que ya no existen)."""
+        for path in sorted(glob.glob(f"{self.journal_path}.*")):
+            try:
+                fileobj = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                # Otro worker que arrancaba a la vez ya lo reprodujo
+                continue
+            with fileobj:
+                if not _try_lock(fileobj):
+                    continue
+                records = []
+                for line in fileobj:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Última línea a medio escribir cuando el worker murió
+                        continue
+                try:
+                    if records:
+                        self._write_batch(records)
+                except Exception as e:
+                    # Se queda en disco y se reintenta en el próximo arranque
+                    self.app.logger.error(f"Could not replay journal {path}: {str(e)}")
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            if records:
+                self.app.logger.info(f"Replayed {len(records)} records from {path}")
+
+    # -- escritura ----------------------------------------------------------
+
+    def _write(self, batch):
+        from services.record_service import create_records
+
+        for record in batch:
+            if isinstance(record.get("createdAt"), str):
+                record["createdAt"] = datetime.fromisoformat(record["createdAt"])
+        with self.app.app_context():
+            create_records(batch, ignore_duplicates=True)
+
+    def _write_batch(self, batch):
+        """
+        Escribe un lote. Si la base de datos lo rechaza por algo que no es
+        transitorio, escribe record a record y manda a dead-letter los que
+        fallan. Los errores transitorios se propagan para reintentar el lote.
+        """
+        try:
+            self._write(batch)
+            return
+        except Exception as e:
+            if _is_transient(e):
+                raise
+            self.app.logger.warning(
+                f"Write-behind batch rejected ({len(batch)} records), writing one by one: {str(e)}"
+            )
+        for record in batch:
+            try:
+                self._write([record])
+            except Exception as e:
+                if _is_transient(e):
+                    raise
+                self._dead_letter(record, e)
+
+    def _dead_letter(self, record, error):
+        line = json.dumps({"record": record, "error": str(error)}, default=str)
+        self.app.logger.error(f"Write-behind record dropped: {line}")
+        if self.journal_path:
+            with open(f"{self.journal_path}-deadletter.log", "a", encoding="utf-8") as fileobj:
+                fileobj.write(line + "\n")
+
+    def _flush_batch(self, batch, journal):
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            self.app.logger.error(f"Write-behind flush failed ({len(batch)} records): {str(e)}")
+            with self._lock:
+                self._failed.append((batch, journal))
+            return False
+        if journal is not None:
+            fileobj, path = journal
+            os.remove(path)
+            fileobj.close()
+        return True
+
+    def flush(self):
+        """Reintenta los lotes fallidos y escribe lo que haya en la cola."""
+        with self._lock:
+            retries, self._failed = self._failed, []
+        for position, (batch, journal) in enumerate(retries):
+            if not self._flush_batch(batch, journal):
+                # La base de datos sigue sin responder: conservar el resto
+                with self._lock:
+                    self._failed.extend(retries[position + 1:])
+                return
+
+        with self._lock:
+            if not self._queue:
+                return
+            batch = list(self._queue)
+            self._queue.clear()
+            journal = self._rotate_journal()
+        self._flush_batch(batch, journal)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._stopping and len(self._queue) < self.batch_size:
+                    self._wakeup.wait(self.flush_interval)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def stop(self):
+        """Escribe lo pendiente y detiene el hilo (al apagar el worker)."""
+        if not self.enabled or self._thread is None:
+            return
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        self._thread.join(timeout=30)
+        self._thread = None
+
+        with self._lock:
+            if self._journal is not None and not self._queue and not self._failed:
+                os.remove(self._journal.name)
+                self._journal.close()
+                self._journal = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "failed": sum(len(batch) for batch, _ in self._failed),
+                "maxSize": self.max_size,
+            }
+
+
+record_buffer = RecordWriteBehind()
+
+
+def init_record_buffer(app):
+    """Activa el modo write-behind si RECORD_WRITE_BEHIND está habilitado."""
+    config = app.config
+    if not config.get('RECORD_WRITE_BEHIND'):
+        return
+    record_buffer.init_app(
+        app,
+        max_size=config['RECORD_BUFFER_MAX_SIZE'],
+        batch_size=config['RECORD_FLUSH_BATCH_SIZE'],
+        flush_interval=config['RECORD_FLUSH_INTERVAL_SECONDS'],
+        journal_path=config.get('RECORD_JOURNAL_PATH'),
+        journal_fsync=config.get('RECORD_JOURNAL_FSYNC', True)
+    )
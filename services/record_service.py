@@ -1,7 +1,34 @@
 from models.record import Record
+from models.record_best import RecordBest
+from models.user_difficulty_total import UserDifficultyTotal, GLOBAL_MIN_LEVELS
 from models.user import User
+from models.leaderboard_version import LeaderboardVersion
 from db import db
-from sqlalchemy import func, desc,text
+from db_async import async_db
+from datetime import datetime
+import uuid
+from config import Config
+from flask import current_app
+from services.cache import TTLCache
+from services.leaderboard import LeaderboardEngine
+from db_routing import read_replica, primary_reads, mark_primary_write
+from sqlalchemy import func, desc, text, case, or_, select, delete, insert, inspect, tuple_
+
+LEVEL_TOP_N = 5
+GLOBAL_TOP_N = 3
+
+# Parte compartida de cada leaderboard (top N + total), por worker.
+# Claves: ("level", difficulty, level) y ("global", difficulty)
+ranking_cache = TTLCache(
+    max_entries=Config.RANKING_CACHE_MAX_ENTRIES,
+    ttl=Config.RANKING_CACHE_TTL_SECONDS
+)
+
+# Backend en memoria de los rankings (RANKING_BACKEND=memory)
+leaderboard_engine = LeaderboardEngine(
+    global_min_levels=GLOBAL_MIN_LEVELS,
+    resync_seconds=Config.LEADERBOARD_RESYNC_SECONDS
+)
 
 def create_record(data):
     
@@ -15,97 +42,715 @@ def create_record(data):
         )
         
         db.session.add(new_record)
+
+        # Mantener la mejor marca y los totales en la misma transacción que el insert
+        improved = _apply_bests([data])
+
         db.session.commit()
+        mark_primary_write()
+
+        # Solo cambian los leaderboards si el intento mejoró la marca
+        for args in improved:
+            _after_best_improved(*args)
         
         return new_record
     except Exception as e:
         db.session.rollback()
         raise ValueError(f"Error creating record: {str(e)}")
 
-def get_ranking_by_level(difficulty, level, current_user_uuid):
+def create_records(records, ignore_duplicates=False):
+    """
+    Inserta varios records ya validados en una sola transacción.
+
+    Los records van en un único INSERT masivo y las mejores marcas se
+    actualizan una vez por (usuario, dificultad, nivel) del lote.
+
+    Args:
+        records (list): dicts con time, level, difficulty, errorCount, idUser
+            y opcionalmente uuid y createdAt ya asignados
+        ignore_duplicates (bool): omitir los uuid que ya existan, para poder
+            reintentar un lote (p. ej. al reproducir el journal) sin duplicar
+
+    Returns:
+        list: UUIDs de los records, en el mismo orden
+    """
+    if not records:
+        return []
+
+    try:
+        now = datetime.utcnow()
+        rows = [
+            {
+                "uuid": data.get('uuid') or str(uuid.uuid4()),
+                "time": data['time'],
+                "level": data['level'],
+                "difficulty": data['difficulty'],
+                "errorCount": data['errorCount'],
+                "createdAt": data.get('createdAt') or now,
+                "idUser": data['idUser']
+            }
+            for data in records
+        ]
+        if ignore_duplicates:
+            stmt = _dialect_insert()(Record.__table__).on_conflict_do_nothing(
+                index_elements=[Record.__table__.c.uuid]
+            )
+        else:
+            stmt = insert(Record)
+        db.session.execute(stmt, rows)
+
+        improved = _apply_bests(rows)
+
+        db.session.commit()
+        mark_primary_write()
+
+        for args in improved:
+            _after_best_improved(*args)
+
+        return [row["uuid"] for row in rows]
+    except Exception as e:
+        db.session.rollback()
+        raise ValueError(f"Error creating records: {str(e)}")
+
+def _apply_bests(attempts):
+    """
+    Actualiza record_best y user_difficulty_total con una serie de intentos,
+    dentro de la transacción en curso.
+
+    Devuelve una tupla (idUser, difficulty, level, bestTime, minErrors) por
+    cada marca que mejoró, para propagarla después del commit.
+    """
+    best = {}
+    for attempt in attempts:
+        if attempt['time'] <= 0:
+            continue
+        key = (attempt['idUser'], attempt['difficulty'], attempt['level'])
+        time, errors = best.get(key, (attempt['time'], attempt['errorCount']))
+        best[key] = (min(time, attempt['time']), min(errors, attempt['errorCount']))
+
+    # Mismo orden de bloqueo en todas las peticiones para evitar deadlocks
+    for id_user, difficulty in sorted({key[:2] for key in best}):
+        _lock_user_difficulty(id_user, difficulty)
+
+    improved = []
+    for (id_user, difficulty, level), (time, errors) in sorted(best.items()):
+        row = _upsert_best(id_user, difficulty, level, time, errors)
+        if row is not None:
+            improved.append((id_user, difficulty, level, row.bestTime, row.minErrors))
+
+    for id_user, difficulty in sorted({args[:2] for args in improved}):
+        _refresh_user_total(id_user, difficulty)
+
+    _bump_versions({
+        key for args in improved for key in _board_keys(args[1], args[2])
+    })
+
+    return improved
+
+def _dialect_insert():
+    """Devuelve el `insert` con soporte ON CONFLICT del dialecto en uso."""
+    dialect = db.session.get_bind(mapper=RecordBest).dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise ValueError(f"Unsupported dialect for record_best upsert: {dialect}")
+    return dialect_insert
+
+def _lock_user_difficulty(id_user, difficulty):
+    """
+    Serializa las escrituras de un mismo usuario en una dificultad hasta el
+    commit, para que _refresh_user_total vea los niveles que otra petición
+    concurrente acaba de mejorar. SQLite ya serializa las escrituras.
+    """
+    if db.session.get_bind(mapper=RecordBest).dialect.name == "postgresql":
+        db.session.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"user_difficulty_total:{id_user}:{difficulty}"}
+        )
+
+def _upsert_best(id_user, difficulty, level, time, error_count):
+    """
+    Inserta o mejora la fila de record_best del usuario para el nivel.
+
+    Igual que el ranking original, el mejor tiempo y el mínimo de errores se
+    llevan por separado. Devuelve la fila (bestTime, minErrors) resultante si
+    el intento mejoró la marca, o None si no cambió nada.
+    """
+    table = RecordBest.__table__
+    stmt = _dialect_insert()(table).values(
+        idUser=id_user,
+        difficulty=difficulty,
+        level=level,
+        bestTime=time,
+        minErrors=error_count,
+        updatedAt=datetime.utcnow()
+    )
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.idUser, table.c.difficulty, table.c.level],
+        set_={
+            "bestTime": case(
+                (excluded.bestTime < table.c.bestTime, excluded.bestTime),
+                else_=table.c.bestTime
+            ),
+            "minErrors": case(
+                (excluded.minErrors < table.c.minErrors, excluded.minErrors),
+                else_=table.c.minErrors
+            ),
+            "updatedAt": excluded.updatedAt,
+        },
+        where=or_(
+            excluded.bestTime < table.c.bestTime,
+            excluded.minErrors < table.c.minErrors
+        )
+    ).returning(table.c.bestTime, table.c.minErrors)
+
+    return db.session.execute(stmt).first()
+
+def _user_totals_select():
+    """Totales por (usuario, dificultad) calculados desde record_best."""
+    return select(
+        RecordBest.idUser,
+        RecordBest.difficulty,
+        func.sum(RecordBest.bestTime),
+        func.sum(RecordBest.minErrors),
+        func.count(RecordBest.level),
+        func.max(RecordBest.updatedAt)
+    ).group_by(RecordBest.idUser, RecordBest.difficulty)
+
+USER_TOTAL_COLUMNS = ["idUser", "difficulty", "totalTime", "totalErrors", "levelsCompleted", "updatedAt"]
+
+def _refresh_user_total(id_user, difficulty):
+    """Recalcula la fila de user_difficulty_total del usuario (a lo sumo un par de niveles)."""
+    table = UserDifficultyTotal.__table__
+    stmt = _dialect_insert()(table).from_select(
+        USER_TOTAL_COLUMNS,
+        _user_totals_select().where(
+            RecordBest.idUser == id_user,
+            RecordBest.difficulty == difficulty
+        )
+    )
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.idUser, table.c.difficulty],
+        set_={
+            "totalTime": excluded.totalTime,
+            "totalErrors": excluded.totalErrors,
+            "levelsCompleted": excluded.levelsCompleted,
+            "updatedAt": excluded.updatedAt,
+        }
+    )
+    db.session.execute(stmt)
+
+def _board_keys(difficulty, level):
+    """Leaderboards que cambian con una marca nueva en (difficulty, level)."""
+    return [("level", difficulty, level), ("global", difficulty)]
+
+def leaderboard_key(key):
+    """Clave de leaderboard_version: ("level", "easy", 1) -> "level:easy:1"."""
+    return ":".join(str(part) for part in key)
+
+def _bump_versions(keys):
+    """Incrementa la versión de los leaderboards dentro de la transacción en curso."""
+    if not keys:
+        return
+    table = LeaderboardVersion.__table__
+    now = datetime.utcnow()
+    # Orden fijo, como los advisory locks, para no cruzar bloqueos de fila
+    for key in sorted(leaderboard_key(key) for key in keys):
+        stmt = _dialect_insert()(table).values(key=key, version=1, updatedAt=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={"version": table.c.version + 1, "updatedAt": now}
+        )
+        db.session.execute(stmt)
+
+def _read_version(key, session=None):
+    return (session or db.session).execute(
+        select(LeaderboardVersion.version).where(LeaderboardVersion.key == leaderboard_key(key))
+    ).scalar() or 0
+
+@read_replica
+def get_leaderboard_version(key):
+    """
+    Versión actual de un leaderboard (0 si nunca cambió), para el ETag de los
+    endpoints de ranking. Devuelve None si no se puede leer.
+    """
+    try:
+        return _read_version(key)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Could not read leaderboard version {key}: {str(e)}")
+        return None
+
+def _after_best_improved(id_user, difficulty, level, best_time, min_errors):
+    """
+    Propaga una mejor marca ya confirmada: invalida exactamente los
+    leaderboards afectados y, con el backend en memoria, la aplica en sitio.
+    """
+    for key in _board_keys(difficulty, level):
+        ranking_cache.invalidate(key)
+
+    if Config.RANKING_BACKEND == "memory" and leaderboard_engine.ready():
+        username = None
+        if not leaderboard_engine.knows_user(id_user):
+            username = db.session.query(User.username).filter_by(uuid=id_user).scalar()
+        leaderboard_engine.apply_best(id_user, username, difficulty, level, best_time, min_errors)
+
+def _best_per_user_select():
+    """Mejor marca por (usuario, dificultad, nivel) calculada desde `record`."""
+    return select(
+        Record.idUser,
+        Record.difficulty,
+        Record.level,
+        func.min(Record.time),
+        func.min(Record.errorCount),
+        func.max(Record.createdAt)
+    ).where(
+        Record.time > 0
+    ).group_by(Record.idUser, Record.difficulty, Record.level)
+
+def rebuild_record_best():
+    """
+    Reconstruye record_best a partir de todo el historial de `record`, y
+    user_difficulty_total a partir de record_best.
+
+    Las tablas son de las migraciones (0002, 0004 y 0005): si falta alguna
+    lanza ValueError en lugar de crearla. Devuelve el número de filas de
+    record_best.
+    """
+    bind = db.session.get_bind(mapper=RecordBest)
+    existing = set(inspect(bind).get_table_names())
+    missing = [
+        model.__tablename__ for model in (RecordBest, UserDifficultyTotal, LeaderboardVersion)
+        if model.__tablename__ not in existing
+    ]
+    if missing:
+        raise ValueError(f"Missing tables {', '.join(missing)}: run `flask db upgrade` first")
+    try:
+
+        if bind.dialect.name == "postgresql":
+            # Evita que un create_record concurrente inserte filas entre el
+            # delete y el insert; sus upserts esperan y se aplican después
+            db.session.execute(text("LOCK TABLE record_best IN EXCLUSIVE MODE"))
+            db.session.execute(text("LOCK TABLE user_difficulty_total IN EXCLUSIVE MODE"))
+
+        db.session.execute(delete(UserDifficultyTotal))
+        db.session.execute(delete(RecordBest))
+
+        db.session.execute(
+            insert(RecordBest).from_select(
+                ["idUser", "difficulty", "level", "bestTime", "minErrors", "updatedAt"],
+                _best_per_user_select()
+            )
+        )
+        db.session.execute(
+            insert(UserDifficultyTotal).from_select(USER_TOTAL_COLUMNS, _user_totals_select())
+        )
+        total = db.session.query(func.count()).select_from(RecordBest).scalar()
+
+        # Nueva versión para todos los leaderboards: los ETag anteriores dejan de valer
+        boards = db.session.execute(
+            select(RecordBest.difficulty, RecordBest.level).distinct()
+        ).all()
+        _bump_versions({key for row in boards for key in _board_keys(row.difficulty, row.level)})
+
+        db.session.commit()
+        ranking_cache.clear()
+        if Config.RANKING_BACKEND == "memory":
+            warm_leaderboard_engine()
+        return total
+    except Exception as e:
+        db.session.rollback()
+        raise ValueError(f"Error rebuilding record_best: {str(e)}")
+
+def load_leaderboard_engine():
+    """Carga el motor de rankings en memoria desde record_best."""
+    bests = db.session.execute(
+        select(
+            RecordBest.idUser,
+            RecordBest.difficulty,
+            RecordBest.level,
+            RecordBest.bestTime,
+            RecordBest.minErrors
+        )
+    ).all()
+    usernames = dict(
+        db.session.execute(
+            select(User.uuid, User.username).where(
+                User.uuid.in_(select(RecordBest.idUser).distinct())
+            )
+        ).all()
+    )
+    leaderboard_engine.load(bests, usernames)
+    db.session.commit()
+
+def warm_leaderboard_engine():
+    """
+    (Re)carga el motor si está desactualizado y nadie más lo está cargando.
+
+    Si la carga falla se mantiene lo que hubiera; mientras el motor no esté
+    listo los rankings se resuelven por SQL.
+    """
+    if not leaderboard_engine.try_begin_reload():
+        return
+    try:
+        load_leaderboard_engine()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Could not load in-memory leaderboards: {str(e)}")
+    finally:
+        leaderboard_engine.end_reload()
+
+def _use_memory_backend():
+    if Config.RANKING_BACKEND != "memory":
+        return False
+    if leaderboard_engine.is_stale():
+        warm_leaderboard_engine()
+    return leaderboard_engine.ready()
+
+def _level_ranking_subquery(difficulty, level):
+    """
+    Ranking completo de un nivel calculado en la base de datos.
+
+    Cada fila trae la posición del jugador (ROW_NUMBER, desempate por idUser
+    para que sea estable) y el total de jugadores (COUNT(*) OVER ()), así el
+    llamador solo necesita traer las filas que va a devolver.
+    """
+    ordering = (
+        RecordBest.bestTime.asc(),
+        RecordBest.minErrors.asc(),
+        RecordBest.idUser.asc()
+    )
+    return select(
+        RecordBest.idUser,
+        RecordBest.bestTime.label('best_time'),
+        RecordBest.minErrors.label('min_errors'),
+        func.row_number().over(order_by=ordering).label('position'),
+        func.count().over().label('total_players')
+    ).where(
+        RecordBest.difficulty == difficulty,
+        RecordBest.level == level
+    ).subquery('level_ranking')
+
+def _top_query(ranked, top_n):
+    """Select del top N de un ranking, con el username de cada jugador."""
+    return select(
+        ranked,
+        User.username
+    ).join(
+        User, User.uuid == ranked.c.idUser
+    ).where(
+        ranked.c.position <= top_n
+    ).order_by(ranked.c.position)
+
+def _cached_board(key, compute, version=None):
+    """
+    Board compartido desde ranking_cache. Si la clave se invalidó hace poco
+    (una marca nueva en este worker), se recalcula en el primario para no
+    guardar en caché una lectura atrasada de la réplica.
+
+    Cada board guarda la versión de leaderboard_version leída antes de
+    calcularlo; si la petición trae una versión más nueva (otro worker
+    escribió), se descarta y se recalcula, para que un ETag nuevo nunca
+    acompañe datos viejos.
+    """
+    def load():
+        if ranking_cache.invalidated_within(key, Config.REPLICA_STICKY_SECONDS):
+            with primary_reads():
+                return _versioned_board(key, compute)
+        return _versioned_board(key, compute)
+
+    board = ranking_cache.get_or_compute(key, load)
+    if _board_outdated(board, version):
+        ranking_cache.invalidate(key)
+        board = ranking_cache.get_or_compute(key, load)
+    return board
+
+def _versioned_board(key, compute, session=None):
+    """Calcula un board con compute(session) y le añade la versión leída antes."""
+    try:
+        board_version = _read_version(key, session)
+    except Exception:
+        (session or db.session).rollback()
+        board_version = None
+    return dict(compute(session), version=board_version)
+
+def _board_outdated(board, version):
+    return version is not None and (board["version"] is None or board["version"] < version)
+
+def _level_board(difficulty, level, session=None):
+    """Parte compartida (cacheable) del ranking de un nivel: top 5 y total."""
+    rows = (session or db.session).execute(
+        _top_query(_level_ranking_subquery(difficulty, level), LEVEL_TOP_N)
+    ).all()
+    return {
+        "top": [
+            {
+                "position": row.position,
+                "userId": str(row.idUser),
+                "username": row.username,
+                "time": row.best_time,
+                "errorCount": row.min_errors
+            }
+            for row in rows
+        ],
+        "totalPlayers": rows[0].total_players if rows else 0
+    }
+
+def _level_user_query(difficulty, level, user_uuid):
+    """Mejor marca del usuario en el nivel, con su username."""
+    return select(
+        RecordBest.bestTime,
+        RecordBest.minErrors,
+        User.username
+    ).join(
+        User, User.uuid == RecordBest.idUser
+    ).where(
+        RecordBest.difficulty == difficulty,
+        RecordBest.level == level,
+        RecordBest.idUser == user_uuid
+    )
+
+def _level_user_entry(difficulty, level, user_uuid, session=None):
+    """Posición del usuario: 1 + jugadores con mejor (tiempo, errores, idUser)."""
+    session = session or db.session
+    mine = session.execute(_level_user_query(difficulty, level, user_uuid)).first()
+    if mine is None:
+        return None
+
+    better = session.execute(
+        select(func.count()).select_from(RecordBest).where(
+            RecordBest.difficulty == difficulty,
+            RecordBest.level == level,
+            tuple_(RecordBest.bestTime, RecordBest.minErrors, RecordBest.idUser)
+            < tuple_(mine.bestTime, mine.minErrors, user_uuid)
+        )
+    ).scalar()
+    return {
+        "position": better + 1,
+        "username": mine.username,
+        "time": mine.bestTime,
+        "errorCount": mine.minErrors,
+        "isCurrentUser": True
+    }
+
+def _memory_level_ranking(difficulty, level, current_user_uuid):
+    """Mismo resultado que get_ranking_by_level, leído de leaderboard_engine."""
+    top, mine, total = leaderboard_engine.snapshot(
+        ("level", difficulty, level), LEVEL_TOP_N, current_user_uuid
+    )
+    top_5 = [
+        {
+            "position": position,
+            "username": username,
+            "time": score[0],
+            "errorCount": score[1],
+            "isCurrentUser": user_id == current_user_uuid
+        }
+        for position, user_id, username, score in top
+    ]
+    current_user_data = None
+    if mine is not None:
+        position, username, score = mine
+        current_user_data = {
+            "position": position,
+            "username": username,
+            "time": score[0],
+            "errorCount": score[1],
+            "isCurrentUser": True
+        }
+    return {
+        "level": level,
+        "difficulty": difficulty,
+        "top5": top_5,
+        "currentUser": current_user_data,
+        "totalPlayers": total
+    }
+
+@read_replica
+def get_ranking_by_level(difficulty, level, current_user_uuid, version=None):
     """
     Obtiene el ranking por nivel específico mostrando:
     - Top 5 usuarios
     - Posición del usuario actual (si no está en el top 5)
+
+    El top 5 y el total salen de ranking_cache; los campos del usuario actual
+    se añaden en cada petición.
     
     Args:
         difficulty (str): Dificultad del nivel
         level (int): Nivel específico
         current_user_uuid (str): UUID del usuario actual
+        version (int): versión del leaderboard ya leída para el ETag; si la
+            caché tiene una más antigua se recalcula
     
     Returns:
         dict: Ranking con top 5 y posición del usuario actual
     """
     try:
-        # Subconsulta para obtener el mejor tiempo por usuario en este nivel/dificultad
-        subquery = db.session.query(
-            Record.idUser,
-            func.min(Record.time).label('best_time'),
-            func.min(Record.errorCount).label('min_errors')
-        ).filter(
-            Record.difficulty == difficulty,
-            Record.level == level,
-            Record.time > 0
-        ).group_by(Record.idUser).subquery()
-        
-        # Query principal para obtener el ranking completo
-        ranking_query = db.session.query(
-            User.uuid,
-            User.username,
-            subquery.c.best_time,
-            subquery.c.min_errors
-        ).join(
-            subquery, User.uuid == subquery.c.idUser
-        ).order_by(
-            subquery.c.best_time.asc(),
-            subquery.c.min_errors.asc()
+        current_user_uuid = str(current_user_uuid)
+        if _use_memory_backend():
+            return _memory_level_ranking(difficulty, level, current_user_uuid)
+
+        board = _cached_board(
+            ("level", difficulty, level),
+            lambda session: _level_board(difficulty, level, session),
+            version
         )
-        
-        # Obtener todos los resultados para calcular posiciones
-        all_results = ranking_query.all()
-        
-        # Top 5
-        top_5 = []
-        for i, result in enumerate(all_results[:5]):
-            is_current = str(result.uuid) == str(current_user_uuid)
-            top_5.append({
-                "position": i + 1,
-                "username": result.username,
-                "time": result.best_time,
-                "errorCount": result.min_errors,
-                "isCurrentUser": is_current
-            })
-        
-        # Buscar la posición del usuario actual
-        current_user_position = None
-        current_user_data = None
-        
-        for i, result in enumerate(all_results):
-            if str(result.uuid) == str(current_user_uuid):
-                current_user_position = i + 1
-                current_user_data = {
-                    "position": current_user_position,
-                    "username": result.username,
-                    "time": result.best_time,
-                    "errorCount": result.min_errors,
-                    "isCurrentUser": True
-                }
-                break
-        
-        return {
-            "level": level,
-            "difficulty": difficulty,
-            "top5": top_5,
-            "currentUser": current_user_data,
-            "totalPlayers": len(all_results)
-        }
+        return _level_ranking_from_board(difficulty, level, board, current_user_uuid)
         
     except Exception as e:
+        db.session.rollback()
         return None
+
+def _level_ranking_from_board(difficulty, level, board, current_user_uuid, session=None):
+    """Respuesta de get_ranking_by_level: el board con los campos del usuario actual."""
+    top_5 = []
+    current_user_data = None
+    for item in board["top"]:
+        is_current = item["userId"] == current_user_uuid
+        entry = {
+            "position": item["position"],
+            "username": item["username"],
+            "time": item["time"],
+            "errorCount": item["errorCount"],
+            "isCurrentUser": is_current
+        }
+        top_5.append(entry)
+        if is_current:
+            current_user_data = dict(entry)
+
+    if current_user_data is None and board["totalPlayers"] > len(board["top"]):
+        current_user_data = _level_user_entry(difficulty, level, current_user_uuid, session)
+
+    return {
+        "level": level,
+        "difficulty": difficulty,
+        "top5": top_5,
+        "currentUser": current_user_data,
+        "totalPlayers": board["totalPlayers"]
+    }
     
 VALID_DIFFICULTIES = {"easy", "medium", "hard"}
 
-def get_global_ranking_by_difficulty(difficulty: str, user_id: str):
+def _global_entry(row, rank, username, user_id):
+    return {
+        "rank": rank,
+        "username": username,
+        "userId": str(row.idUser),
+        "totalTime": int(row.totalTime),
+        "totalErrors": int(row.totalErrors),
+        "levelsCompleted": int(row.levelsCompleted),
+        "isCurrentUser": str(row.idUser) == user_id
+    }
+
+def _global_qualifies(difficulty):
+    """Filtro del índice parcial ix_user_difficulty_total_board."""
+    return (
+        UserDifficultyTotal.difficulty == difficulty,
+        UserDifficultyTotal.levelsCompleted >= GLOBAL_MIN_LEVELS
+    )
+
+def _global_top_query(difficulty):
+    """Top 3 global: recorrido ordenado del índice parcial con LIMIT."""
+    return select(
+        UserDifficultyTotal.idUser,
+        UserDifficultyTotal.totalTime,
+        UserDifficultyTotal.totalErrors,
+        UserDifficultyTotal.levelsCompleted,
+        User.username
+    ).join(
+        User, User.uuid == UserDifficultyTotal.idUser
+    ).where(
+        *_global_qualifies(difficulty)
+    ).order_by(
+        UserDifficultyTotal.totalTime.asc(),
+        UserDifficultyTotal.totalErrors.asc(),
+        UserDifficultyTotal.idUser.asc()
+    ).limit(GLOBAL_TOP_N)
+
+def _global_count_query(difficulty):
+    return select(func.count()).select_from(UserDifficultyTotal).where(
+        *_global_qualifies(difficulty)
+    )
+
+def _global_board(difficulty, session=None):
+    """Parte compartida (cacheable) del ranking global: top 3 y total."""
+    session = session or db.session
+    rows = session.execute(_global_top_query(difficulty)).all()
+    count = session.execute(_global_count_query(difficulty)).scalar() if rows else 0
+    return {
+        "top": [
+            _global_entry(row, position, row.username, None)
+            for position, row in enumerate(rows, start=1)
+        ],
+        "count": count
+    }
+
+def _global_user_query(difficulty, user_id):
+    """Totales del usuario en la dificultad, con su username."""
+    return select(
+        UserDifficultyTotal.idUser,
+        UserDifficultyTotal.totalTime,
+        UserDifficultyTotal.totalErrors,
+        UserDifficultyTotal.levelsCompleted,
+        User.username
+    ).join(
+        User, User.uuid == UserDifficultyTotal.idUser
+    ).where(
+        *_global_qualifies(difficulty),
+        UserDifficultyTotal.idUser == user_id
+    )
+
+def _global_user_entry(difficulty, user_id, session=None):
+    session = session or db.session
+    mine = session.execute(_global_user_query(difficulty, user_id)).first()
+    if mine is None:
+        return None
+
+    better = session.execute(
+        _global_count_query(difficulty).where(
+            tuple_(
+                UserDifficultyTotal.totalTime,
+                UserDifficultyTotal.totalErrors,
+                UserDifficultyTotal.idUser
+            ) < tuple_(mine.totalTime, mine.totalErrors, user_id)
+        )
+    ).scalar()
+    return _global_entry(mine, better + 1, mine.username, user_id)
+
+def _memory_global_ranking(difficulty, user_id):
+    """Mismo resultado que get_global_ranking_by_difficulty, leído de leaderboard_engine."""
+    top, mine, total = leaderboard_engine.snapshot(("global", difficulty), GLOBAL_TOP_N, user_id)
+
+    def entry(rank, entry_user_id, username, score):
+        return {
+            "rank": rank,
+            "username": username,
+            "userId": entry_user_id,
+            "totalTime": int(score[0]),
+            "totalErrors": int(score[1]),
+            "levelsCompleted": leaderboard_engine.levels_completed(difficulty, entry_user_id),
+            "isCurrentUser": entry_user_id == user_id
+        }
+
+    top3 = [entry(*item) for item in top]
+    current_user = None
+    if mine is not None:
+        position, username, score = mine
+        current_user = entry(position, user_id, username, score)
+    return {
+        "difficulty": difficulty,
+        "top3": top3,
+        "currentUser": current_user,
+        "count": total
+    }
+
+@read_replica
+def get_global_ranking_by_difficulty(difficulty: str, user_id: str, version=None):
     """
     Top 3 global por dificultad + fila del usuario.
     Calcula el ranking global basado en la suma de tiempos y errores de todos los niveles.
@@ -122,75 +767,105 @@ def get_global_ranking_by_difficulty(difficulty: str, user_id: str):
         if difficulty not in VALID_DIFFICULTIES:
             raise ValueError(f"Invalid difficulty. Must be one of: {', '.join(sorted(VALID_DIFFICULTIES))}")
 
-        # Subconsulta para obtener el mejor tiempo por usuario por nivel
-        subquery = db.session.query(
-            Record.idUser,
-            Record.level,
-            func.min(Record.time).label('best_time'),
-            func.min(Record.errorCount).label('min_errors')
-        ).filter(
-            Record.difficulty == difficulty,
-            Record.time > 0
-        ).group_by(Record.idUser, Record.level).subquery()
-
-        # Query para obtener la suma total por usuario
-        total_query = db.session.query(
-            subquery.c.idUser,
-            func.sum(subquery.c.best_time).label('total_time'),
-            func.sum(subquery.c.min_errors).label('total_errors'),
-            func.count(subquery.c.level).label('levels_completed')
-        ).group_by(subquery.c.idUser).having(
-            func.count(subquery.c.level) >= 4
-        ).subquery()
-
-        # Query principal con información del usuario
-        ranking_query = db.session.query(
-            User.uuid,
-            User.username,
-            total_query.c.total_time,
-            total_query.c.total_errors,
-            total_query.c.levels_completed
-        ).join(
-            total_query, User.uuid == total_query.c.idUser
-        ).order_by(
-            total_query.c.total_time.asc(),
-            total_query.c.total_errors.asc()
+        if _use_memory_backend():
+            return _memory_global_ranking(difficulty, user_id)
+
+        board = _cached_board(
+            ("global", difficulty),
+            lambda session: _global_board(difficulty, session),
+            version
         )
+        return _global_ranking_from_board(difficulty, board, user_id)
 
-        # Obtener todos los resultados
-        all_results = ranking_query.all()
-        
-        # Formatear resultados
-        formatted_results = []
-        for i, result in enumerate(all_results):
-            formatted_results.append({
-                "rank": i + 1,
-                "username": result.username,
-                "userId": str(result.uuid),
-                "totalTime": int(result.total_time),
-                "totalErrors": int(result.total_errors),
-                "levelsCompleted": int(result.levels_completed),
-                "isCurrentUser": str(result.uuid) == user_id
-            })
-
-        # Separar top 3 y usuario actual
-        top3 = []
-        current_user = None
-        
-        for result in formatted_results:
-            if result["isCurrentUser"]:
-                current_user = result
-            
-            if result["rank"] <= 3:
-                top3.append(result)
+    except Exception as e:
+        db.session.rollback()
+        raise ValueError(f"Error getting global ranking by difficulty: {str(e)}")
 
-        return {
-            "difficulty": difficulty,
-            "top3": top3,
-            "currentUser": current_user,
-            "count": len(all_results)
-        }
+def _global_ranking_from_board(difficulty, board, user_id, session=None):
+    """Respuesta de get_global_ranking_by_difficulty: el board con la fila del usuario."""
+    top3 = []
+    current_user = None
+    for item in board["top"]:
+        entry = dict(item, isCurrentUser=item["userId"] == user_id)
+        top3.append(entry)
+        if entry["isCurrentUser"]:
+            current_user = entry
 
+    if current_user is None and board["count"] > len(board["top"]):
+        current_user = _global_user_entry(difficulty, user_id, session)
+
+    return {
+        "difficulty": difficulty,
+        "top3": top3,
+        "currentUser": current_user,
+        "count": board["count"]
+    }
+
+# Versiones asíncronas de los rankings para asgi.py: mismas consultas,
+# misma ranking_cache, ejecutadas sobre los engines de db_async con
+# AsyncConnection.run_sync. use_replica=False cuando el cliente tiene la
+# cookie de read-your-writes.
+
+async def get_leaderboard_version_async(key, use_replica=True):
+    """get_leaderboard_version sobre el engine asíncrono. None si no se puede leer."""
+    try:
+        async with async_db.read_engine(use_replica).connect() as connection:
+            return await connection.run_sync(lambda conn: _read_version(key, conn))
     except Exception as e:
-        db.session.rollback()
-        raise ValueError(f"Error getting global ranking by difficulty: {str(e)}")
\ No newline at end of file
+        async_db.app.logger.warning(f"Could not read leaderboard version {key}: {str(e)}")
+        return None
+
+async def _cached_board_async(key, compute, version, use_replica):
+    """_cached_board sin bloquear el event loop mientras otro calcula el board."""
+    async def load():
+        engine = async_db.read_engine(
+            use_replica and not ranking_cache.invalidated_within(key, Config.REPLICA_STICKY_SECONDS)
+        )
+        async with engine.connect() as connection:
+            return await connection.run_sync(lambda conn: _versioned_board(key, compute, conn))
+
+    board = await ranking_cache.get_or_compute_async(key, load)
+    if _board_outdated(board, version):
+        ranking_cache.invalidate(key)
+        board = await ranking_cache.get_or_compute_async(key, load)
+    return board
+
+async def get_ranking_by_level_async(difficulty, level, current_user_uuid, version=None, use_replica=True):
+    """get_ranking_by_level para asgi.py."""
+    if Config.RANKING_BACKEND == "memory":
+        return await async_db.run_sync(get_ranking_by_level, difficulty, level, current_user_uuid, version)
+    try:
+        current_user_uuid = str(current_user_uuid)
+        board = await _cached_board_async(
+            ("level", difficulty, level),
+            lambda session: _level_board(difficulty, level, session),
+            version,
+            use_replica
+        )
+        async with async_db.read_engine(use_replica).connect() as connection:
+            return await connection.run_sync(
+                lambda conn: _level_ranking_from_board(difficulty, level, board, current_user_uuid, conn)
+            )
+    except Exception as e:
+        return None
+
+async def get_global_ranking_by_difficulty_async(difficulty, user_id, version=None, use_replica=True):
+    """get_global_ranking_by_difficulty para asgi.py."""
+    if Config.RANKING_BACKEND == "memory":
+        return await async_db.run_sync(get_global_ranking_by_difficulty, difficulty, user_id, version)
+    try:
+        if difficulty not in VALID_DIFFICULTIES:
+            raise ValueError(f"Invalid difficulty. Must be one of: {', '.join(sorted(VALID_DIFFICULTIES))}")
+
+        board = await _cached_board_async(
+            ("global", difficulty),
+            lambda session: _global_board(difficulty, session),
+            version,
+            use_replica
+        )
+        async with async_db.read_engine(use_replica).connect() as connection:
+            return await connection.run_sync(
+                lambda conn: _global_ranking_from_board(difficulty, board, user_id, conn)
+            )
+    except Exception as e:
+        raise ValueError(f"Error getting global ranking by difficulty: {str(e)}")
@@ -1,26 +1,61 @@
 from models.user import User
 from db import db
+from db_routing import read_replica, mark_primary_write
+from services.auth_service import hash_password
+from services.cache import TTLCache
+from config import Config
 from datetime import datetime, timezone
 import uuid
-import bcrypt
+
+# Perfiles de /me (por worker): existencia del usuario y tokens sin claims
+identity_cache = TTLCache(
+    max_entries=Config.IDENTITY_CACHE_MAX_ENTRIES,
+    ttl=Config.IDENTITY_CACHE_TTL_SECONDS
+)
 
 def get_all_users():
     return User.query.all()
 
+@read_replica
 def get_user_by_uuid(user_uuid):
     return User.query.filter_by(uuid=user_uuid).first()
 
+def get_user_profile(user_uuid, claims=None):
+    """
+    Perfil de /me (uuid, username, createdAt). Sale de los claims del JWT si
+    los trae, si no de identity_cache y en último caso de la base de datos.
+    Devuelve None si el usuario no existe.
+
+    Con claims también se comprueba que el usuario sigue existiendo, contra
+    identity_cache (IDENTITY_CACHE_TTL_SECONDS) o la base de datos: un
+    usuario borrado deja de tener perfil como mucho ese tiempo después.
+    """
+    profile = identity_cache.get(user_uuid)
+    if profile is None:
+        user = get_user_by_uuid(user_uuid)
+        if user is None:
+            return None
+        profile = user.to_dict()
+        identity_cache.set(user_uuid, profile)
+
+    if claims and claims.get("username") and claims.get("createdAt"):
+        return {
+            "uuid": user_uuid,
+            "username": claims["username"],
+            "createdAt": claims["createdAt"]
+        }
+    return profile
+
 def create_user(data):
     if "username" not in data:
         raise KeyError("Falta el parámetro 'username' en los datos de entrada.")
-    password_bytes = data["password"].encode("utf-8")
-    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
     new_user = User(
         uuid=str(uuid.uuid4()),
         username=data["username"],
-        password=hashed.decode("utf-8"),
+        password=hash_password(data["password"]),
         createdAt=datetime.now(timezone.utc)
     )
     db.session.add(new_user)
     db.session.commit()
+    mark_primary_write()
     return new_user
\ No newline at end of file
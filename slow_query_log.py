@@ -0,0 +1,324 @@
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event
+from db_pool import on_instrument
+
+# Opción de ejecución de las conexiones del EXPLAIN: no se registran a sí mismas
+SKIP_OPTION = "slow_query_log_skip"
+
+MAX_STATEMENT_CHARS = 10000
+MAX_PARAMETER_CHARS = 200
+MAX_EXECUTEMANY_SETS = 3
+
+# EXPLAIN ANALYZE ejecuta la sentencia: solo SELECT / WITH sin escrituras,
+# bloqueos de filas ni funciones con efectos. Ante la duda, EXPLAIN sin ANALYZE
+_NOT_READ_ONLY = re.compile(
+    r"\b(insert|update|delete|merge|truncate|drop|alter|create|grant|revoke|copy|call|lock|nextval|setval)\b"
+    r"|\bpg_\w*lock\w*\b|\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b",
+    re.IGNORECASE
+)
+
+
+def _analyze_safe(statement):
+    words = statement.lstrip().split(None, 1)
+    return bool(words) and words[0].lower() in ("select", "with") and not _NOT_READ_ONLY.search(statement)
+
+
+def _short(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    # Hashes bcrypt de user_service (registro y rehash): fuera del log
+    if text.startswith(("$2a$", "$2b$", "$2y$")):
+        return "<redacted>"
+    return text if len(text) <= MAX_PARAMETER_CHARS else text[:MAX_PARAMETER_CHARS] + "..."
+
+
+def _display_parameters(parameters, executemany):
+    if executemany:
+        sets = list(parameters or ())
+        return {
+            "sets": len(sets),
+            "first": [_display_parameters(params, False) for params in sets[:MAX_EXECUTEMANY_SETS]],
+        }
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    return [_short(value) for value in parameters or ()]
+
+
+def _caller():
+    """
+    Función de services/ que lanzó la sentencia (módulo.función:línea), o la
+    ruta si la consulta sale directamente de routes/. Solo se recorre la pila
+    de las sentencias lentas.
+    """
+    route = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("services."):
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        if route is None and module.startswith("routes."):
+            route = f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    # Las rutas async de asgi.py ejecutan en otro greenlet: su pila no se ve
+    return route
+
+
+def _plan_rows(result):
+    rows = result.all()
+    if rows and len(rows[0]) == 1:
+        return [row[0] for row in rows]
+    return [dict(row._mapping) for row in rows]
+
+
+class SlowQueryLog:
+    """
+    Registro de sentencias lentas de los engines instrumentados por db_pool.
+
+    Las sentencias de más de `threshold_ms` (también las que fallan tras
+    pasarlo, p. ej. por MAX_EXECUTION_TIME) se escriben en el log con sus
+    parámetros, duración y la función de services/ que las lanzó, y se
+    guardan en un buffer circular de `size` entradas por worker.
+
+    El plan se captura en un hilo aparte, con otra conexión del mismo bind,
+    se guarda en la entrada y se escribe en el log con su id: EXPLAIN
+    (ANALYZE, BUFFERS) para SELECT de PostgreSQL con `analyze` (en una
+    transacción que se descarta, con statement_timeout), EXPLAIN QUERY PLAN
+    en SQLite y EXPLAIN sin ejecutar la consulta en el resto; en MySQL son
+    consultas de jugador. Como mucho `explains_per_minute` planes por minuto
+    y uno por sentencia y minuto; el resto de entradas indica por qué no lo
+    tienen. Las sentencias de los engines async (async_default, async_mysql)
+    se registran sin plan: sus placeholders ($1 en asyncpg) no sirven para
+    repetirlas con el driver síncrono.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self.threshold = 0.0
+        self.explain_enabled = True
+        self.explain_analyze = True
+        self.explains_per_minute = 0
+        self.explain_timeout_ms = 0
+        self._entries = deque()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        # Engine -> bind, y bind -> engine para lanzar los EXPLAIN
+        self._engine_binds = weakref.WeakKeyDictionary()
+        self._bind_engines = {}
+        self._explain_times = deque()
+        self._explained = {}
+        self._queue = None
+        self._thread = None
+
+    def init_app(self, app, threshold_ms, size, explain=True, explains_per_minute=6, explain_timeout_ms=10000,
+                 analyze=True):
+        self.app = app
+        self.threshold = threshold_ms / 1000
+        self._entries = deque(self._entries, maxlen=size)
+        self.explain_enabled = explain and explains_per_minute > 0
+        self.explain_analyze = analyze
+        self.explains_per_minute = explains_per_minute
+        self.explain_timeout_ms = explain_timeout_ms
+        self.enabled = True
+        on_instrument(self._instrument)
+
+    def _instrument(self, bind, engine, stats):
+        """Hook de db_pool.on_instrument: cronometra las sentencias de cada engine."""
+        self._engine_binds[engine] = bind
+        self._bind_engines[bind] = engine
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(engine, "handle_error", _handle_error)
+
+    # -- registro -----------------------------------------------------------
+
+    def record(self, engine, statement, parameters, elapsed, executemany=False, error=None):
+        bind = self._engine_binds.get(engine)
+        if bind is None:
+            return
+        caller = _caller()
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "bind": bind,
+            "durationMs": round(elapsed * 1000, 1),
+            "caller": caller,
+            "endpoint": request.endpoint if has_request_context() else None,
+            "statement": statement[:MAX_STATEMENT_CHARS],
+            "parameters": _display_parameters(parameters, executemany),
+            "error": error,
+            "explain": None,
+            "plan": None,
+        }
+        with self._lock:
+            entry["id"] = self._next_id
+            self._next_id += 1
+            self._entries.append(entry)
+
+        self.app.logger.warning(
+            f"Slow query #{entry['id']} ({entry['durationMs']} ms, {bind}) from {caller or 'unknown'}: "
+            f"{entry['statement']} | parameters: {entry['parameters']}"
+            + (f" | error: {error}" if error else "")
+        )
+        # Después del log de la entrada, para que su plan salga detrás
+        with self._lock:
+            self._schedule_explain(entry, bind, statement, parameters, executemany, error)
+
+    # -- EXPLAIN ------------------------------------------------------------
+
+    def _schedule_explain(self, entry, bind, statement, parameters, executemany, error):
+        """Encola el EXPLAIN de la entrada o deja en entry["explain"] por qué no lo tiene."""
+        # Se llama con el lock tomado: _run no toca la entrada hasta soltarlo
+        entry["explain"] = self._explain_status(bind, statement, executemany, error)
+        if entry["explain"] is not None:
+            return
+
+        # Hilo perezoso: tras un fork de gunicorn el del master no existe
+        if self._thread is None or not self._thread.is_alive():
+            self._queue = queue.Queue(maxsize=self.explains_per_minute)
+            self._thread = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+            self._thread.start()
+        if isinstance(parameters, list):
+            parameters = tuple(parameters)
+        entry["explain"] = "pending"
+        try:
+            self._queue.put_nowait((entry, bind, statement, parameters))
+        except queue.Full:
+            entry["explain"] = "skipped: queue full"
+            return
+        now = time.monotonic()
+        self._explain_times.append(now)
+        self._explained[(bind, statement)] = (now, entry["id"])
+
+    def _explain_status(self, bind, statement, executemany, error):
+        """Motivo para no capturar el plan de la sentencia, o None si se captura."""
+        # Se llama con el lock tomado
+        if not self.explain_enabled:
+            return "disabled"
+        if error is not None:
+            return "skipped: statement failed"
+        if executemany:
+            return "skipped: executemany"
+        if bind.startswith("async_"):
+            return "skipped: async bind"
+
+        now = time.monotonic()
+        for explained, (at, _) in list(self._explained.items()):
+            if now - at >= 60:
+                del self._explained[explained]
+        previous = self._explained.get((bind, statement))
+        if previous is not None:
+            return f"skipped: explained in #{previous[1]}"
+        while self._explain_times and now - self._explain_times[0] >= 60:
+            self._explain_times.popleft()
+        if len(self._explain_times) >= self.explains_per_minute:
+            return "skipped: rate limit"
+        return None
+
+    def _run(self):
+        while True:
+            entry, bind, statement, parameters = self._queue.get()
+            try:
+                mode, plan = self._explain(bind, statement, parameters)
+            except Exception as e:
+                with self._lock:
+                    entry["explain"] = f"error: {str(e)[:300]}"
+                self.app.logger.warning(f"Slow query #{entry['id']}: EXPLAIN failed: {str(e)[:300]}")
+                continue
+            with self._lock:
+                entry["plan"] = plan
+                entry["explain"] = mode
+            lines = "\n".join(f"    {row}" for row in plan)
+            self.app.logger.warning(f"Slow query #{entry['id']} plan ({mode}):\n{lines}")
+
+    def _explain(self, bind, statement, parameters):
+        engine = self._bind_engines[bind]
+        with engine.connect() as connection:
+            connection = connection.execution_options(**{SKIP_OPTION: True})
+            dialect = connection.dialect.name
+            if dialect == "postgresql" and self.explain_analyze and _analyze_safe(statement):
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}")
+                mode, sql = "analyze", f"EXPLAIN (ANALYZE, BUFFERS) {statement}"
+            elif dialect == "sqlite":
+                mode, sql = "explain", f"EXPLAIN QUERY PLAN {statement}"
+            else:
+                mode, sql = "explain", f"EXPLAIN {statement}"
+            plan = _plan_rows(connection.exec_driver_sql(sql, parameters or ()))
+            # Al salir del bloque se hace rollback: ANALYZE no deja nada
+        return mode, plan
+
+    # -- consulta -----------------------------------------------------------
+
+    def entries(self, limit=None, bind=None):
+        """Entradas del buffer, de la más reciente a la más antigua."""
+        with self._lock:
+            entries = [dict(entry) for entry in reversed(self._entries) if bind is None or entry["bind"] == bind]
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._explained.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "slow_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if elapsed < slow_query_log.threshold or context.execution_options.get(SKIP_OPTION):
+        return
+    slow_query_log.record(conn.engine, statement, parameters, elapsed, executemany)
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    started = getattr(context, "slow_query_started", None)
+    if started is None or exception_context.statement is None:
+        return
+    elapsed = time.perf_counter() - started
+    if elapsed < slow_query_log.threshold or context.execution_options.get(SKIP_OPTION):
+        return
+    slow_query_log.record(
+        exception_context.engine, exception_context.statement, exception_context.parameters, elapsed,
+        executemany=bool(getattr(context, "executemany", False)),
+        error=str(exception_context.original_exception)[:500]
+    )
+
+
+def init_slow_query_log(app):
+    """
+    Activa el registro de sentencias lentas si SLOW_QUERY_THRESHOLD_MS > 0.
+    En producción los planes son EXPLAIN sin ANALYZE, que no vuelve a
+    ejecutar la sentencia lenta con una conexión del pool.
+    """
+    config = app.config
+    if config.get('SLOW_QUERY_THRESHOLD_MS', 0) <= 0:
+        return
+    slow_query_log.init_app(
+        app,
+        threshold_ms=config['SLOW_QUERY_THRESHOLD_MS'],
+        size=config['SLOW_QUERY_LOG_SIZE'],
+        explain=config.get('SLOW_QUERY_EXPLAIN', True),
+        explains_per_minute=config['SLOW_QUERY_EXPLAINS_PER_MINUTE'],
+        explain_timeout_ms=config['SLOW_QUERY_EXPLAIN_TIMEOUT_MS'],
+        analyze=os.environ.get("FLASK_ENV") != "production"
+    )
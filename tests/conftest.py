@@ -0,0 +1,57 @@
+"""
+Fixtures de la suite: la app con SQLite en lugar de PostgreSQL y MySQL.
+
+Config lee el entorno al importarse, así que las variables se fijan aquí,
+antes de importar la app. El esquema lo crean las migraciones (0001 a 0005)
+sobre un fichero temporal, como `flask db upgrade` en producción.
+"""
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="unravel-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp_dir, 'app.db')}",
+    "MYSQL_DATABASE_URL": f"sqlite:///{os.path.join(_tmp_dir, 'game.db')}",
+    "DB_POOL_WARM": "false",
+    "RANKING_BACKEND": "sql",
+    "RECORD_WRITE_BEHIND": "false",
+    "SLOW_QUERY_THRESHOLD_MS": "0",
+})
+os.environ.pop("REPLICA_DATABASE_URL", None)
+os.environ.pop("FLASK_ENV", None)
+
+import pytest
+from flask_migrate import Migrate, upgrade
+from sqlalchemy import delete
+from app import create_app
+from db import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+    return app
+
+
+@pytest.fixture
+def migrations_dir():
+    return MIGRATIONS_DIR
+
+
+@pytest.fixture
+def app_context(app):
+    """Contexto de la app; al terminar se vacían las tablas y las cachés de rankings."""
+    from services.record_service import ranking_cache
+
+    with app.app_context():
+        yield app
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(delete(table))
+        db.session.commit()
+        ranking_cache.clear()
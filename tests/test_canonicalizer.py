@@ -0,0 +1,33 @@
+import pytest
+from services.game_service import canonicalize_sql, _validation_key
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT name FROM t WHERE x = 1", "select  `name` from t where x=1;"),
+    ("SELECT a FROM t WHERE b >= 2", "SELECT a FROM t -- comentario\n WHERE b>=2"),
+    ("SELECT a, b FROM t", "SELECT a ,b FROM t"),
+])
+def test_equivalent_queries_share_key(first, second):
+    assert canonicalize_sql(first) == canonicalize_sql(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    # Dos operadores separados no son el operador compuesto
+    ("SELECT a FROM t WHERE a < > 1", "SELECT a FROM t WHERE a <> 1"),
+    ("SELECT a FROM t WHERE b > = 2", "SELECT a FROM t WHERE b >= 2"),
+    # Con IGNORE_SPACE desactivado MySQL no lee `count (*)` como la función
+    ("SELECT count (*) FROM t", "SELECT count(*) FROM t"),
+    # Los literales de texto no se normalizan
+    ("SELECT * FROM t WHERE a = 'X  Y'", "SELECT * FROM t WHERE a = 'X Y'"),
+])
+def test_different_queries_do_not_collide(first, second):
+    assert canonicalize_sql(first) != canonicalize_sql(second)
+
+
+def test_reserved_identifiers_keep_quotes():
+    assert canonicalize_sql("SELECT `select` FROM t") == "select `select` from t"
+
+
+def test_validation_key_keeps_raw_decimal():
+    assert _validation_key("SELECT 1", 3.2) != _validation_key("SELECT 1", "3.2")
+    assert _validation_key("SELECT 1", [3.2]) == ("select 1", "[3.2]")
@@ -0,0 +1,75 @@
+from datetime import datetime
+import pytest
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import inspect, text
+from db import db
+from services.record_service import rebuild_record_best
+
+
+def _revision():
+    return db.session.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def _seed_baseline():
+    """Usuarios y records con el esquema de 0001 (antes de record_best)."""
+    now = datetime(2026, 1, 1)
+    db.session.execute(
+        text('INSERT INTO "user" (uuid, username, password, "createdAt") VALUES (:uuid, :username, \'x\', :now)'),
+        [{"uuid": "u1", "username": "ana", "now": now}, {"uuid": "u2", "username": "bea", "now": now}]
+    )
+    db.session.execute(
+        text(
+            'INSERT INTO record (uuid, time, level, difficulty, "errorCount", "createdAt", "idUser") '
+            'VALUES (:uuid, :time, :level, :difficulty, :errors, :now, :user)'
+        ),
+        [
+            {"uuid": "r1", "time": 50, "level": 1, "difficulty": "easy", "errors": 0, "now": now, "user": "u1"},
+            {"uuid": "r2", "time": 40, "level": 1, "difficulty": "easy", "errors": 3, "now": now, "user": "u1"},
+            {"uuid": "r3", "time": 30, "level": 2, "difficulty": "easy", "errors": 1, "now": now, "user": "u1"},
+            {"uuid": "r4", "time": 0, "level": 3, "difficulty": "easy", "errors": 0, "now": now, "user": "u1"},
+            {"uuid": "r5", "time": 70, "level": 1, "difficulty": "easy", "errors": 2, "now": now, "user": "u2"},
+        ]
+    )
+    db.session.commit()
+
+
+def test_migration_chain_backfills_rankings(app_context, migrations_dir):
+    downgrade(directory=migrations_dir, revision="base")
+    upgrade(directory=migrations_dir, revision="0001_baseline")
+    _seed_baseline()
+
+    upgrade(directory=migrations_dir)
+
+    assert _revision() == "0005_leaderboard_version"
+    inspector = inspect(db.engine)
+    assert {"record_best", "user_difficulty_total", "leaderboard_version"} <= set(inspector.get_table_names())
+    assert "ix_record_board_covering" in {index["name"] for index in inspector.get_indexes("record")}
+
+    # Mejor tiempo y mínimo de errores por separado; los tiempos 0 no cuentan
+    bests = db.session.execute(text(
+        'SELECT "idUser", level, "bestTime", "minErrors" FROM record_best ORDER BY "idUser", level'
+    )).all()
+    assert [tuple(row) for row in bests] == [("u1", 1, 40, 0), ("u1", 2, 30, 1), ("u2", 1, 70, 2)]
+    totals = db.session.execute(text(
+        'SELECT "idUser", "totalTime", "totalErrors", "levelsCompleted" FROM user_difficulty_total ORDER BY "idUser"'
+    )).all()
+    assert [tuple(row) for row in totals] == [("u1", 70, 1, 2), ("u2", 70, 2, 1)]
+
+
+def test_migrations_rerun_over_existing_tables(app_context, migrations_dir):
+    # Tablas ya creadas (p. ej. por un create_all antiguo) sin la revisión
+    db.session.execute(text("UPDATE alembic_version SET version_num = '0003_ranking_indexes'"))
+    db.session.commit()
+
+    upgrade(directory=migrations_dir)
+
+    assert _revision() == "0005_leaderboard_version"
+
+
+def test_rebuild_requires_migrated_tables(app_context, migrations_dir):
+    downgrade(directory=migrations_dir, revision="0001_baseline")
+    try:
+        with pytest.raises(ValueError, match="flask db upgrade"):
+            rebuild_record_best()
+    finally:
+        upgrade(directory=migrations_dir)
@@ -0,0 +1,73 @@
+import random
+import pytest
+from config import Config
+from db import db
+from models.user import User
+from services.record_service import (
+    create_records, get_ranking_by_level, get_global_ranking_by_difficulty,
+    load_leaderboard_engine, ranking_cache
+)
+
+DIFFICULTIES = ("easy", "medium")
+LEVELS = range(1, 6)
+
+
+def _random_records(rng, users, count):
+    # Tiempos y errores de rango corto para que haya empates
+    return [
+        {
+            "time": rng.randint(1, 6) * 10,
+            "level": rng.choice(LEVELS),
+            "difficulty": rng.choice(DIFFICULTIES),
+            "errorCount": rng.randint(0, 3),
+            "idUser": rng.choice(users)
+        }
+        for _ in range(count)
+    ]
+
+
+def _rankings(users):
+    ranking_cache.clear()
+    rankings = {}
+    for difficulty in DIFFICULTIES:
+        for user in users:
+            rankings[("global", difficulty, user)] = get_global_ranking_by_difficulty(difficulty, user)
+            for level in LEVELS:
+                rankings[("level", difficulty, level, user)] = get_ranking_by_level(difficulty, level, user)
+    # get_ranking_by_level devuelve None si la consulta falla
+    assert None not in rankings.values()
+    return rankings
+
+
+@pytest.fixture
+def users(app_context):
+    users = [User(uuid=f"u{n}", username=f"player{n}", password="x") for n in range(12)]
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.uuid for user in users]
+
+
+def test_memory_backend_matches_sql(users, monkeypatch):
+    rng = random.Random(5)
+    create_records(_random_records(rng, users, 300))
+    sql = _rankings(users)
+
+    monkeypatch.setattr(Config, "RANKING_BACKEND", "memory")
+    load_leaderboard_engine()
+    assert _rankings(users) == sql
+
+
+def test_memory_backend_matches_sql_after_updates(users, monkeypatch):
+    rng = random.Random(7)
+    create_records(_random_records(rng, users, 150))
+    monkeypatch.setattr(Config, "RANKING_BACKEND", "memory")
+    load_leaderboard_engine()
+
+    # Marcas nuevas aplicadas en sitio, incluido un mejor tiempo con más
+    # errores: tiempo y errores mínimos se guardan por separado
+    create_records(_random_records(rng, users, 150))
+    create_records([{"time": 5, "level": 1, "difficulty": "easy", "errorCount": 9, "idUser": users[0]}])
+    memory = _rankings(users)
+
+    monkeypatch.setattr(Config, "RANKING_BACKEND", "sql")
+    assert _rankings(users) == memory
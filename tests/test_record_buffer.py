@@ -0,0 +1,88 @@
+import json
+import os
+import pytest
+from db import db
+from models.record import Record
+from models.user import User
+from services.record_buffer import RecordWriteBehind
+
+
+@pytest.fixture
+def user(app_context):
+    user = User(uuid="u1", username="ana", password="x")
+    db.session.add(user)
+    db.session.commit()
+    return user.uuid
+
+
+def _buffer(app, journal_path):
+    """Buffer con journal sin hilo de escritura: los records se quedan en disco."""
+    buffer = RecordWriteBehind()
+    buffer.app = app
+    buffer.max_size = 100
+    buffer.batch_size = 100
+    buffer.enabled = True
+    buffer.journal_path = str(journal_path)
+    buffer.journal_fsync = False
+    buffer._open_journal()
+    return buffer
+
+
+def _replayer(app, tmp_path):
+    """Buffer de un worker que arranca: solo reproduce, sin journal propio."""
+    buffer = RecordWriteBehind()
+    buffer.app = app
+    buffer.journal_path = str(tmp_path / "records")
+    return buffer
+
+
+def _record(user, level, time=40):
+    return {"time": time, "level": level, "difficulty": "easy", "errorCount": 1, "idUser": user}
+
+
+def _record_count():
+    return db.session.query(Record).count()
+
+
+def test_replay_writes_journal_of_dead_worker(app_context, user, tmp_path):
+    crashed = _buffer(app_context, tmp_path / "records")
+    assert crashed.submit(_record(user, 1))
+    assert crashed.submit(_record(user, 2))
+    journal = crashed._journal_file()
+
+    # Mientras el worker vive su journal está bloqueado y no se reproduce
+    _replayer(app_context, tmp_path).replay_journals()
+    assert _record_count() == 0
+
+    # El worker muere con la última línea a medio escribir
+    crashed._journal.write('{"uuid": "trunc')
+    crashed._journal.close()
+    with open(journal, encoding="utf-8") as fileobj:
+        lines = fileobj.read()
+
+    _replayer(app_context, tmp_path).replay_journals()
+    assert _record_count() == 2
+    assert not os.path.exists(journal)
+
+    # Reproducir otra vez el mismo journal (caída antes de borrarlo) no duplica
+    with open(journal, "w", encoding="utf-8") as fileobj:
+        fileobj.write(lines)
+    _replayer(app_context, tmp_path).replay_journals()
+    assert _record_count() == 2
+
+
+def test_replay_dead_letters_poison_records(app_context, user, tmp_path):
+    crashed = _buffer(app_context, tmp_path / "records")
+    crashed.submit(_record(user, 1))
+    crashed.submit(_record(user, 2, time=None))
+    crashed.submit(_record(user, 3))
+    crashed._journal.close()
+
+    _replayer(app_context, tmp_path).replay_journals()
+
+    assert _record_count() == 2
+    assert not list(tmp_path.glob("records.*"))
+    with open(tmp_path / "records-deadletter.log", encoding="utf-8") as fileobj:
+        dead = [json.loads(line) for line in fileobj]
+    assert [entry["record"]["level"] for entry in dead] == [2]
+